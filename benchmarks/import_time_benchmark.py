@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Measure how long it takes to import rdblib modules (each in a new Python
+process, best of several runs) - CDB/IBF-only code should not import
+SQLAlchemy, Pillow or babel.
+
+Usage:
+    python benchmarks/import_time_benchmark.py [<NR_RUNS>]
+"""
+
+import subprocess
+import sys
+from timeit import default_timer as timer
+
+
+STATEMENTS = (
+    'pass',
+    'import srw.rdblib.cdb',
+    'import srw.rdblib.ibf',
+    'from srw.rdblib.cli import find_broken_form_main',
+    'import srw.rdblib.sqlite',
+    'from srw.rdblib import Batch',
+)
+
+def measure(statement, nr_runs):
+    durations = []
+    for _ in range(nr_runs):
+        start = timer()
+        subprocess.run([sys.executable, '-c', statement], check=True)
+        durations.append(timer() - start)
+    return min(durations)
+
+
+def main(argv=sys.argv):
+    nr_runs = int(argv[1]) if (len(argv) > 1) else 5
+    for statement in STATEMENTS:
+        duration = measure(statement, nr_runs)
+        print('%-52s %.3f seconds' % (statement, duration))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Measure the effect of the MMapFile access patterns (madvise/posix_fadvise)
+when reading all images of an IBF (sequential/random order, random 1% sample) and
+when checking a CDB with "open_cdb()".
+
+The page cache for the files is dropped before each run
+("posix_fadvise(POSIX_FADV_DONTNEED)", Linux only) so the numbers reflect a
+cold page cache. The data should be larger than the disk's readahead window
+so use a file system backed by a real disk (not tmpfs).
+
+Usage:
+    python benchmarks/mmap_access_pattern_benchmark.py [<NR_FORMS>] [<TARGET_DIR>]
+"""
+
+import os
+import random
+import shutil
+import sys
+import tempfile
+from timeit import default_timer as timer
+
+from srw.rdblib.cdb import open_cdb
+from srw.rdblib.corpus import default_field_names, write_batch
+from srw.rdblib.ibf import ImageBatch
+from srw.rdblib.mmap_file import MMapFile
+from srw.rdblib.utils import filecontent
+
+
+def drop_page_cache(path):
+    with open(path, 'rb') as fp:
+        os.fsync(fp.fileno())
+        os.posix_fadvise(fp.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+
+
+def read_images(ibf_path, access_pattern, order, fadvise):
+    mmap_file = MMapFile(ibf_path, access='read', access_pattern=access_pattern, fadvise=fadvise)
+    ibf = ImageBatch(mmap_file, access='read')
+    indexes = list(range(ibf.image_count()))
+    if order == 'random':
+        random.Random(42).shuffle(indexes)
+    elif order == 'sample':
+        # e.g. thumbnails for a few forms
+        indexes = random.Random(42).sample(indexes, max(1, len(indexes) // 100))
+    nr_bytes = 0
+    for index in indexes:
+        # touch every page of the image
+        nr_bytes += sum(ibf.get_tiff_image(index)[::4096])
+    ibf.close()
+    return nr_bytes
+
+
+def check_cdb(cdb_path):
+    result = open_cdb(cdb_path, field_names=default_field_names(), access='read')
+    assert result, result.message
+    result.cdb_fp.close()
+
+
+def scan_cdb(cdb_path, access_pattern):
+    mmap_file = MMapFile(cdb_path, access='read', access_pattern=access_pattern)
+    nr_bytes = sum(filecontent(mmap_file)[::4096])
+    mmap_file.close()
+    return nr_bytes
+
+
+def measure(label, path, func, *args, nr_runs=3):
+    durations = []
+    for _ in range(nr_runs):
+        drop_page_cache(path)
+        start = timer()
+        func(path, *args)
+        durations.append(timer() - start)
+    print('%-44s %.3f seconds' % (label, min(durations)))
+
+
+def main(argv=sys.argv):
+    nr_forms = int(argv[1]) if (len(argv) > 1) else 10000
+    base_dir = argv[2] if (len(argv) > 2) else None
+    target_dir = tempfile.mkdtemp(dir=base_dir)
+    try:
+        batch = write_batch(os.path.join(target_dir, '00000001.CDB'), nr_forms=nr_forms, with_db=False)
+        ibf_size = os.stat(batch.ibf).st_size
+        cdb_size = os.stat(batch.cdb).st_size
+        print('%d forms, IBF: %.1f MB, CDB: %.1f MB' % (nr_forms, ibf_size / 1024**2, cdb_size / 1024**2))
+        for order in ('sequential', 'random', 'sample'):
+            for access_pattern in (None, 'sequential', 'random', 'willneed'):
+                for fadvise in (False, True):
+                    if (access_pattern is None) and fadvise:
+                        continue
+                    label = 'IBF %s read, %s%s' % (order, access_pattern, ' + fadvise' if fadvise else '')
+                    measure(label, batch.ibf, read_images, access_pattern, order, fadvise)
+        for access_pattern in (None, 'sequential', 'willneed'):
+            measure('CDB scan, %s' % access_pattern, batch.cdb, scan_cdb, access_pattern)
+        measure('open_cdb()', batch.cdb, check_cdb, nr_runs=1)
+    finally:
+        shutil.rmtree(target_dir)
+
+
+if __name__ == '__main__':
+    main()
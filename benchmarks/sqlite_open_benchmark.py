@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Measure how long it takes to open (query one table) and close many per-batch
+SQLite DBs - with a new engine and new model classes for each DB (previous
+behavior), with the shared engine registry/model cache and when reopening
+recently used DBs (engine still in the registry).
+
+Usage:
+    python benchmarks/sqlite_open_benchmark.py [<NR_DBS>]
+"""
+
+import os
+import sys
+import tempfile
+from timeit import default_timer as timer
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from srw.rdblib.sqlite import engine_registry, ENGINE_CACHE_SIZE, SQLiteDB
+from srw.rdblib.sqlite import model as db_schema
+
+
+def open_dbs(db_paths):
+    start = timer()
+    for db_path in db_paths:
+        db = SQLiteDB.init_with_file(db_path)
+        db.query(db.model.Task).count()
+        db.close()
+    return timer() - start
+
+
+def open_dbs_without_reuse(db_paths):
+    start = timer()
+    for db_path in db_paths:
+        engine = create_engine('sqlite:///' + os.path.abspath(db_path))
+        # building the model classes was part of each "get_model()" call
+        model = getattr(db_schema, db_schema.LATEST)()
+        session = Session(bind=engine)
+        db = SQLiteDB(model.metadata, session, model)
+        db.query(db.model.Task).count()
+        db.close()
+    return timer() - start
+
+
+def main(argv=sys.argv):
+    nr_dbs = int(argv[1]) if (len(argv) > 1) else 1000
+    with tempfile.TemporaryDirectory() as db_dir:
+        db_paths = []
+        for idx in range(nr_dbs):
+            db_path = os.path.join(db_dir, '%08d.db' % idx)
+            SQLiteDB.create_new_db(db_path, create_file=True).close()
+            db_paths.append(db_path)
+        engine_registry.dispose()
+
+        for label, open_func in (('new engine', open_dbs_without_reuse), ('registry', open_dbs)):
+            duration = open_func(db_paths)
+            print('%-10s %d DBs in %.3f seconds (%.0f DBs/second)' % (
+                label, nr_dbs, duration, nr_dbs / duration))
+        # reopening recently used DBs (engine in registry)
+        recent_paths = db_paths[:ENGINE_CACHE_SIZE]
+        reopened_paths = (recent_paths * (nr_dbs // len(recent_paths) + 1))[:nr_dbs]
+        open_dbs(recent_paths)
+        duration = open_dbs(reopened_paths)
+        print('%-10s %d DBs in %.3f seconds (%.0f DBs/second)' % (
+            'reopen', nr_dbs, duration, nr_dbs / duration))
+        engine_registry.dispose()
+
+
+if __name__ == '__main__':
+    main()
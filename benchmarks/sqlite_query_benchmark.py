@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Measure the per-call latency of the most common batch DB lookups
+("Batch.tasks()", "Batch.get_setting()", "DBForm.tasks()",
+"DBForm.get_setting()") on a small in-memory batch DB.
+
+Usage:
+    python benchmarks/sqlite_query_benchmark.py [<NR_CALLS>]
+"""
+
+import sys
+from timeit import default_timer as timer
+
+from srw.rdblib import Batch, DataBunch, TaskStatus, TaskType
+from srw.rdblib.cdb import create_cdb_with_dummy_data
+from srw.rdblib.ibf.testutil import create_ibf
+from srw.rdblib.sqlite import create_sqlite_db
+
+
+NR_FORMS = 100
+
+def create_batch():
+    databunch = DataBunch(
+        cdb=create_cdb_with_dummy_data(nr_forms=NR_FORMS, field_names=('FOO', 'BAR')),
+        ibf=create_ibf(nr_images=NR_FORMS),
+        db=create_sqlite_db(),
+        ask=None,
+    )
+    batch = Batch.init_from_bunch(databunch, create_persistent_db=False)
+    for form_index in range(NR_FORMS):
+        db_form = batch.db_form(form_index)
+        db_form.add_task(type_=TaskType.VERIFICATION, field_name='FOO')
+        db_form.store_setting('foo', str(form_index))
+    batch.store_setting('bar', 'baz')
+    batch.commit()
+    return batch
+
+
+def measure(label, func, nr_calls):
+    # warm up (first call pays the SQL compilation)
+    func(0)
+    start = timer()
+    for idx in range(nr_calls):
+        func(idx % NR_FORMS)
+    duration = timer() - start
+    print('%-22s %6.1f µs/call' % (label, duration / nr_calls * 1e6))
+
+
+def main(argv=sys.argv):
+    nr_calls = int(argv[1]) if (len(argv) > 1) else 5000
+    batch = create_batch()
+    lookups = (
+        ('Batch.tasks()', lambda idx: batch.tasks(type_=TaskType.VERIFICATION, status=TaskStatus.NEW, form_index=idx)),
+        ('Batch.get_setting()', lambda idx: batch.get_setting('bar')),
+        ('DBForm.tasks()', lambda idx: batch.db_form(idx).tasks(type_=TaskType.VERIFICATION)),
+        ('DBForm.get_setting()', lambda idx: batch.db_form(idx).get_setting('foo')),
+    )
+    for label, func in lookups:
+        measure(label, func, nr_calls)
+    batch.close()
+
+
+if __name__ == '__main__':
+    main()
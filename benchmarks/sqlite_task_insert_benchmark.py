@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Measure task insert/commit throughput of a per-batch SQLite DB for all
+connection tuning profiles.
+
+Usage:
+    python benchmarks/sqlite_task_insert_benchmark.py [<NR_TASKS>] [<TASKS_PER_COMMIT>]
+"""
+
+import os
+import sys
+import tempfile
+from timeit import default_timer as timer
+
+from srw.rdblib import TaskType
+from srw.rdblib.sqlite import PRAGMA_PROFILES, SQLiteDB
+
+
+def insert_tasks(profile, nr_tasks, tasks_per_commit, db_dir):
+    db_path = os.path.join(db_dir, '%s.db' % (profile or 'default'))
+    db = SQLiteDB.create_new_db(db_path, create_file=True, profile=profile)
+    Task = db.model.Task
+    start = timer()
+    for idx in range(nr_tasks):
+        task = Task(form_index=idx % 300, type_=TaskType.FORM_VALIDATION, field_name='FIELD%d' % (idx % 61))
+        db.session.add(task)
+        if (idx + 1) % tasks_per_commit == 0:
+            db.commit()
+    db.commit()
+    duration = timer() - start
+    db.close()
+    return duration
+
+
+def main(argv=sys.argv):
+    nr_tasks = int(argv[1]) if (len(argv) > 1) else 2000
+    tasks_per_commit = int(argv[2]) if (len(argv) > 2) else 1
+    profiles = (None,) + tuple(PRAGMA_PROFILES)
+    with tempfile.TemporaryDirectory() as db_dir:
+        for profile in profiles:
+            duration = insert_tasks(profile, nr_tasks, tasks_per_commit, db_dir)
+            commits_per_second = (nr_tasks / tasks_per_commit) / duration
+            print('%-8s %d tasks in %.3f seconds (%.0f tasks/second, %.0f commits/second)' % (
+                profile or 'default', nr_tasks, duration, nr_tasks / duration, commits_per_second))
+
+
+if __name__ == '__main__':
+    main()
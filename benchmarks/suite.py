@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark suite for the CDB/IBF/TIFF/SQLite hot paths.
+
+Every benchmark runs for each batch size (number of forms), the test batches
+are created with "srw.rdblib.corpus". The reported value is the best time per
+call (seconds) of several repetitions.
+
+"--save" stores the results as baseline (JSON), "--compare" checks the
+results against the stored baseline and exits with a non-zero return code
+if a benchmark is slower than "baseline * threshold". Baselines are machine
+specific so store them on the machine used for the comparison (the default
+baseline file is ignored by git).
+
+Usage:
+    benchmarks/suite.py [options] [<NAME>...]
+
+Options:
+    --sizes=<SIZES>         batch sizes (number of forms) [default: 10,100,300]
+    --repeat=<N>            repetitions per benchmark [default: 5]
+    --baseline=<PATH>       baseline file [default: benchmarks/baselines.json]
+    --save                  store results as new baseline
+    --compare               compare results with the baseline
+    --threshold=<FACTOR>    allowed slowdown when comparing [default: 1.25]
+    --list                  only list the available benchmarks
+    -h, --help              Show this screen
+"""
+
+from collections import namedtuple
+from datetime import datetime as DateTime
+import json
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+
+from docopt import docopt
+
+from srw.rdblib import open_cdb, Batch, DataBunch, FormBatch, ImageBatch, TiffHandler
+from srw.rdblib.corpus import default_field_names, write_batch
+from srw.rdblib.pic_search import form_index_for_pic
+from srw.rdblib.tiff import WaltherTiff
+
+
+BenchmarkResult = namedtuple('BenchmarkResult', ('name', 'size', 'seconds'))
+
+# name -> function(batch_paths) which returns the callable to measure
+# (or None if the benchmark can not run in this environment). Benchmarks
+# which keep files/DBs open return "(callable, teardown)" instead.
+BENCHMARKS = {}
+
+def benchmark(name):
+    def decorator(func):
+        BENCHMARKS[name] = func
+        return func
+    return decorator
+
+
+BatchPaths = namedtuple('BatchPaths', ('cdb', 'ibf', 'db', 'size', 'field_names'))
+
+
+@benchmark('formbatch_open')
+def bench_formbatch_open(paths):
+    def open_formbatch():
+        FormBatch(paths.cdb, access='read').close()
+    return open_formbatch
+
+@benchmark('formbatch_commit')
+def bench_formbatch_commit(paths):
+    field_name = paths.field_names[0]
+    def modify_and_commit():
+        form_batch = FormBatch(paths.cdb, access='write')
+        field = form_batch.forms[0].fields[field_name]
+        field.value = field.value
+        form_batch.close(commit=True)
+    return modify_and_commit
+
+@benchmark('open_cdb')
+def bench_open_cdb(paths):
+    def check_cdb():
+        result = open_cdb(paths.cdb, field_names=paths.field_names, access='read')
+        result.cdb_fp.close()
+    return check_cdb
+
+@benchmark('imagebatch_get_tiff_image')
+def bench_imagebatch(paths):
+    def read_all_images():
+        ibf = ImageBatch(paths.ibf, access='read')
+        for idx in range(ibf.image_count()):
+            ibf.get_tiff_image(idx)
+        ibf.close()
+    return read_all_images
+
+@benchmark('tiff_handler')
+def bench_tiff_handler(paths):
+    ibf = ImageBatch(paths.ibf, access='read')
+    def parse_all_tiffs():
+        for idx in range(ibf.image_count()):
+            TiffHandler(ibf, idx).long_data.rec.page_name
+    return parse_all_tiffs, ibf.close
+
+@benchmark('form_index_for_pic')
+def bench_form_index_for_pic(paths):
+    batch = Batch.init_from_bunch(_bunch(paths), access='read')
+    pics = [batch.pic_for_form(idx) for idx in range(len(batch.forms()))]
+    def find_all_pics():
+        # bad index hint (always 0) so every search has to scan the CDB
+        for pic in pics:
+            form_index_for_pic(batch, pic=pic, index_hint=0)
+    return find_all_pics, batch.close
+
+@benchmark('walther_tiff_to_bytes')
+def bench_walther_tiff_to_bytes(paths):
+    tiff_img = WaltherTiff.create(
+        width    = 1248,
+        height   = 829,
+        pic      = '12345600100024',
+        img_data = b'\x00' * 1600,
+        dt       = DateTime(2022, 6, 1, 12, 30),
+    )
+    def serialize_tiffs():
+        for _ in range(paths.size):
+            tiff_img.to_bytes()
+    return serialize_tiffs
+
+@benchmark('pil_image_as_walther_tiff')
+def bench_pil_image_as_walther_tiff(paths):
+    try:
+        from PIL import Image
+        from srw.rdblib.tiff.tiff_creation import pil_image_as_walther_tiff
+    except ImportError:
+        return None
+    if not getattr(Image.core, 'libtiff_support_custom_tags', False):
+        # Pillow was built without (a recent) libtiff
+        return None
+    img = Image.new('L', (1248, 829), color=255)
+    def convert_images():
+        # conversion is slow so a single image per ~100 forms is enough
+        for _ in range(max(1, paths.size // 100)):
+            pil_image_as_walther_tiff(img, pic='12345600100024')
+    return convert_images
+
+@benchmark('batch_init_from_bunch')
+def bench_batch_init_from_bunch(paths):
+    def open_batch():
+        Batch.init_from_bunch(_bunch(paths), access='read').close()
+    return open_batch
+
+@benchmark('batch_tasks')
+def bench_batch_tasks(paths):
+    batch = Batch.init_from_bunch(_bunch(paths), access='read')
+    session = batch.db.session
+    def load_tasks():
+        session.expunge_all()
+        batch.tasks()
+    return load_tasks, batch.close
+
+
+def _bunch(paths):
+    return DataBunch(cdb=paths.cdb, ibf=paths.ibf, db=paths.db, ask=None)
+
+
+def create_batches(base_dir, sizes):
+    field_names = default_field_names()
+    batches = {}
+    for size in sizes:
+        cdb_path = os.path.join(base_dir, 'batch%d' % size, '%08d.CDB' % size)
+        os.makedirs(os.path.dirname(cdb_path))
+        batch = write_batch(cdb_path, nr_forms=size, field_names=field_names, task_rate=0.5, customer_nr=size)
+        batches[size] = BatchPaths(batch.cdb, batch.ibf, batch.db, size, field_names)
+    return batches
+
+
+def measure(func, repeat):
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    timings = timer.repeat(repeat=repeat, number=number)
+    return min(timings) / number
+
+
+def run_benchmarks(names, sizes, *, repeat=5, output=sys.stdout):
+    base_dir = tempfile.mkdtemp(prefix='srw-benchmarks-')
+    results = []
+    try:
+        batches = create_batches(base_dir, sizes)
+        for name in names:
+            for size in sizes:
+                func = BENCHMARKS[name](batches[size])
+                if func is None:
+                    print('%-28s %5d  skipped' % (name, size), file=output)
+                    continue
+                func, teardown = func if isinstance(func, tuple) else (func, None)
+                try:
+                    seconds = measure(func, repeat)
+                finally:
+                    if teardown is not None:
+                        teardown()
+                results.append(BenchmarkResult(name, size, seconds))
+                print('%-28s %5d  %10.3f ms' % (name, size, seconds * 1000), file=output)
+    finally:
+        shutil.rmtree(base_dir, ignore_errors=True)
+    return results
+
+
+def result_key(result):
+    return '%s[%d]' % (result.name, result.size)
+
+def load_baseline(baseline_path):
+    with open(baseline_path, 'r') as baseline_fp:
+        return json.load(baseline_fp)['results']
+
+def save_baseline(baseline_path, results):
+    baseline = {
+        'python': sys.version.split()[0],
+        'created': DateTime.now().isoformat(timespec='seconds'),
+        'results': {result_key(result): result.seconds for result in results},
+    }
+    with open(baseline_path, 'w') as baseline_fp:
+        json.dump(baseline, baseline_fp, indent=2, sort_keys=True)
+        baseline_fp.write('\n')
+
+def find_regressions(results, baseline, threshold):
+    """Return (result, baseline seconds) for all results which are slower
+    than "baseline * threshold"."""
+    regressions = []
+    for result in results:
+        baseline_seconds = baseline.get(result_key(result))
+        if baseline_seconds is None:
+            continue
+        if result.seconds > baseline_seconds * threshold:
+            regressions.append((result, baseline_seconds))
+    return regressions
+
+
+def main(argv=sys.argv):
+    arguments = docopt(__doc__, argv=argv[1:])
+    if arguments['--list']:
+        for name in BENCHMARKS:
+            print(name)
+        return 0
+    names = arguments['<NAME>'] or list(BENCHMARKS)
+    unknown_names = set(names) - set(BENCHMARKS)
+    if unknown_names:
+        sys.stderr.write('unknown benchmark(s): %s\n' % ', '.join(sorted(unknown_names)))
+        return 2
+    sizes = [int(size) for size in arguments['--sizes'].split(',')]
+    repeat = int(arguments['--repeat'])
+    baseline_path = arguments['--baseline']
+    threshold = float(arguments['--threshold'])
+
+    results = run_benchmarks(names, sizes, repeat=repeat)
+    if arguments['--save']:
+        save_baseline(baseline_path, results)
+        print('baseline stored in %s' % baseline_path)
+    if arguments['--compare']:
+        if not os.path.exists(baseline_path):
+            sys.stderr.write('no baseline found (%s)\n' % baseline_path)
+            return 2
+        regressions = find_regressions(results, load_baseline(baseline_path), threshold)
+        for result, baseline_seconds in regressions:
+            print('REGRESSION %s: %.3f ms (baseline: %.3f ms, %.2fx)' % (
+                result_key(result), result.seconds * 1000, baseline_seconds * 1000,
+                result.seconds / baseline_seconds))
+        if regressions:
+            return 1
+        print('no regressions (threshold: %.2fx)' % threshold)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
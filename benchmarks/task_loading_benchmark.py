@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Measure how long it takes to load many tasks from a batch DB: all columns
+(including "data", "created" and "last_modified") vs. the default task query
+(details deferred). Also compares the JSON codecs used by "JSONType".
+
+Usage:
+    python benchmarks/task_loading_benchmark.py [<NR_TASKS>]
+"""
+
+import json
+import sys
+from timeit import default_timer as timer
+
+from srw.rdblib import Batch, DataBunch, TaskType
+from srw.rdblib.cdb import create_cdb_with_dummy_data
+from srw.rdblib.ibf.testutil import create_ibf
+from srw.rdblib.lib import jsontype_column
+from srw.rdblib.sqlite import create_sqlite_db
+
+
+def create_batch(nr_tasks):
+    databunch = DataBunch(
+        cdb=create_cdb_with_dummy_data(nr_forms=1, field_names=('FOO',)),
+        ibf=create_ibf(nr_images=1),
+        db=create_sqlite_db(),
+        ask=None,
+    )
+    batch = Batch.init_from_bunch(databunch, create_persistent_db=False)
+    task_data = {'field_value': '12345678', 'errors': ['invalid_checksum'], 'user': 'foo'}
+    rows = [{'form_index': idx % 300, 'type_': TaskType.VERIFICATION, 'field_name': 'FIELD%d' % (idx % 61), 'data': task_data}
+            for idx in range(nr_tasks)]
+    batch.db.bulk_add_tasks(rows)
+    batch.commit()
+    return batch
+
+
+def measure(label, func, nr_items, session):
+    session.expunge_all()
+    start = timer()
+    func()
+    duration = timer() - start
+    print('%-28s %.3f seconds (%.0f items/second)' % (label, duration, nr_items / duration))
+    session.expunge_all()
+
+
+def main(argv=sys.argv):
+    nr_tasks = int(argv[1]) if (len(argv) > 1) else 50000
+    batch = create_batch(nr_tasks)
+    session = batch.db.session
+    Task = batch.db.model.Task
+    measure('all columns', lambda: session.query(Task).all(), nr_tasks, session)
+    measure('Batch.tasks()', lambda: batch.tasks(), nr_tasks, session)
+    measure('with_details=True + .data', lambda: [t.data for t in batch.tasks(with_details=True)], nr_tasks, session)
+
+    json_str = json.dumps({'field_value': '12345678', 'errors': ['invalid_checksum'], 'user': 'foo'})
+    codecs = [('json.loads', json.loads)]
+    if jsontype_column.orjson is not None:
+        codecs.append(('orjson.loads', jsontype_column.orjson.loads))
+    for label, loads in codecs:
+        measure(label, lambda: [loads(json_str) for _ in range(nr_tasks)], nr_tasks, session)
+    batch.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Measure how many Walther TIFF IFDs (27 tags + long data) can be serialized
+per second.
+
+Usage:
+    python benchmarks/tiff_ifd_benchmark.py [<NR_ITERATIONS>]
+"""
+
+from datetime import datetime as DateTime
+import sys
+import timeit
+
+from srw.rdblib.tiff import WaltherTiff
+
+
+def main(argv=sys.argv):
+    nr_iterations = int(argv[1]) if (len(argv) > 1) else 20000
+    tiff_img = WaltherTiff.create(
+        width    = 1248,
+        height   = 829,
+        pic      = '12345600100024',
+        img_data = b'\x00' * 1600,
+        dt       = DateTime(2022, 6, 1, 12, 30),
+    )
+    duration = timeit.timeit(tiff_img.to_bytes, number=nr_iterations)
+    print('%d IFDs in %.3f seconds (%.0f IFDs/second)' % (nr_iterations, duration, nr_iterations / duration))
+
+
+if __name__ == '__main__':
+    main()
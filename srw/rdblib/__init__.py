@@ -1,11 +1,45 @@
 
-from .batch import *
 from .cdb import *
 from .ibf import *
+from .lazy_imports import lazy_exports
+from .mapping_pool import *
 from .mmap_file import *
 from .paths import *
-from .sqlite import *
 from .task import *
 from .tiff import *
 from .tool import *
 from .utils import *
+
+# "async_batch", "batch" and "sqlite" need SQLAlchemy (and babel) which are
+# pretty slow to import. These are only imported when needed so CDB/IBF-only
+# scripts start faster.
+_LAZY_EXPORTS = {
+    '.async_batch': ('AsyncBatch', 'TaskRow'),
+    '.batch': ('Batch',),
+    '.sqlite': (
+        'cached_select',
+        'create_sqlite_db',
+        'db_schema',
+        'engine_registry',
+        'get_model',
+        'get_or_add',
+        'null_attrs',
+        'DBForm',
+        'DBVersion',
+        'DEFAULT_REVISION',
+        'DELETE',
+        'EngineRegistry',
+        'FormDataCache',
+        'SQLiteDB',
+        'ENGINE_CACHE_SIZE',
+        'LATEST',
+        'PRAGMA_PROFILES',
+        'TASK_DETAIL_COLUMNS',
+        'UPGRADES',
+    ),
+}
+__getattr__, __dir__ = lazy_exports(__name__, _LAZY_EXPORTS)
+__all__ = sorted(
+    [name for name in globals() if not name.startswith('_')]
+    + [name for names in _LAZY_EXPORTS.values() for name in names]
+)
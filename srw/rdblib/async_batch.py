@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+asyncio support for batches: All file and DB operations of a Batch are
+executed in a dedicated thread (one per batch) so the event loop is never
+blocked. SQLite connections must only be used by the thread which created
+them so all operations (including opening/closing the batch) use the same
+thread.
+
+Results are plain data (e.g. "TaskRow", dicts with the CDB field values):
+ORM instances and CDB forms are bound to the batch (lazy loading, shared
+Session/mmap) and must not be used in the event loop thread.
+"""
+
+import asyncio
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import copy
+import functools
+
+from .batch import Batch
+
+
+__all__ = ['AsyncBatch', 'TaskRow']
+
+# maximum number of submitted (not yet finished) operations per batch
+DEFAULT_MAX_PENDING = 16
+
+# read-only copy of a "Task" (all columns) which can be used in any thread
+TaskRow = namedtuple('TaskRow',
+    ('id', 'form_index', 'type_', 'field_name', 'status', 'data', 'created', 'last_modified'))
+
+class AsyncBatch(object):
+    """
+    asyncio wrapper for a Batch, use "await AsyncBatch.open(databunch)".
+
+    At most <max_pending> operations are queued for the batch thread, further
+    callers wait until a slot is free (backpressure). Operations which were
+    not started yet are dropped if the caller is cancelled. The batch (mmap
+    and locks) is always closed, even if the caller of ".open()"/".close()"
+    is cancelled.
+    """
+    def __init__(self, batch, executor, *, max_pending=DEFAULT_MAX_PENDING):
+        self.batch = batch
+        self._executor = executor
+        self._pending = asyncio.Semaphore(max_pending)
+        self._closed = False
+
+    @classmethod
+    async def open(cls, databunch, *, max_pending=DEFAULT_MAX_PENDING, **kwargs):
+        """Open the batch (see "Batch.init_from_bunch()" for <kwargs>)."""
+        executor = _batch_executor()
+        open_batch = functools.partial(Batch.init_from_bunch, databunch, **kwargs)
+        future = executor.submit(open_batch)
+        try:
+            batch = await asyncio.wrap_future(future)
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                # "Batch.init_from_bunch()" might be running already
+                future.add_done_callback(_close_batch)
+            executor.shutdown(wait=False)
+            raise
+        return cls(batch, executor, max_pending=max_pending)
+
+    async def run(self, func, *args, **kwargs):
+        """Call <func> in the batch thread and return the result.
+
+        The result must not reference ORM instances or CDB forms (see module
+        docstring)."""
+        if self._closed:
+            raise ValueError('batch already closed')
+        await self._pending.acquire()
+        loop = asyncio.get_running_loop()
+        try:
+            future = self._executor.submit(functools.partial(func, *args, **kwargs))
+        except BaseException:
+            self._pending.release()
+            raise
+        # The slot is only free after the operation finished (even if the
+        # caller was cancelled in the meantime).
+        future.add_done_callback(lambda _: _call_soon_threadsafe(loop, self._pending.release))
+        return await asyncio.wrap_future(future)
+
+    async def form(self, i):
+        """Return the field values of form <i> (field name -> value)."""
+        return await self.run(_form_values, self.batch, i)
+
+    async def update_form(self, i, values):
+        """Set the given field values of form <i> (written by ".commit()")."""
+        return await self.run(_update_form, self.batch, i, values)
+
+    async def pic(self, form_index):
+        return await self.run(self.batch.pic_for_form, form_index)
+
+    async def tiff(self, i):
+        return await self.run(self.batch.ibf.get_tiff_image, i)
+
+    async def thumbnail(self, i, size, *, page=1):
+        return await self.run(self.batch.ibf.thumbnail, i, size, page=page)
+
+    async def tasks(self, *args, **kwargs):
+        """Return "TaskRow" copies of all matching tasks (see "Batch.tasks()")."""
+        return await self.run(_task_rows, self.batch, *args, **kwargs)
+
+    async def commit(self):
+        return await self.run(self.batch.commit)
+
+    async def close(self, commit=False):
+        """Close the batch after all submitted operations are finished."""
+        if self._closed:
+            return
+        self._closed = True
+        future = self._executor.submit(self.batch.close, commit=commit)
+        self._executor.shutdown(wait=False)
+        # closing must not be interrupted by cancellation (release locks)
+        await asyncio.shield(asyncio.wrap_future(future))
+
+    @property
+    def closed(self):
+        return self._closed
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, tb):
+        await self.close()
+
+
+def _batch_executor():
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix='AsyncBatch')
+
+def _form_values(batch, i):
+    form = batch.form(i)
+    return dict((field_name, form[field_name].value) for field_name in form.field_names)
+
+def _update_form(batch, i, values):
+    form = batch.form(i)
+    for field_name, value in values.items():
+        form[field_name].value = value
+
+def _task_rows(batch, *args, **kwargs):
+    # load all columns at once, deferred columns would be loaded via the
+    # Session of the batch thread
+    kwargs['with_details'] = True
+    task_rows = []
+    for task in batch.tasks(*args, **kwargs):
+        values = [getattr(task, name) for name in TaskRow._fields]
+        # "task.data" is a "MutableDict" which references the ORM instance
+        data = copy.deepcopy(dict(task.data))
+        task_rows.append(TaskRow(*values)._replace(data=data))
+    return task_rows
+
+def _close_batch(future):
+    # runs in the batch thread (or immediately if the task was cancelled)
+    if future.cancelled() or (future.exception() is not None):
+        return
+    future.result().close()
+
+def _call_soon_threadsafe(loop, callback):
+    if not loop.is_closed():
+        loop.call_soon_threadsafe(callback)
@@ -11,50 +11,73 @@ hides all implementation details (as much as possible/sensible).
 """
 from __future__ import division, absolute_import, print_function, unicode_literals
 
+from concurrent.futures import ThreadPoolExecutor
+import logging
 import os
+from timeit import default_timer as timer
 import warnings
 
 from schwarz.log_utils import l_
-from sqlalchemy import and_
 
 from .batch_form import BatchForm
 from .ibf import ImageBatch, TiffHandler
+from .lru_cache import LRUCache
 from .paths import assemble_new_path, guess_path, safe_move, simple_bunch, DataBunch
 from .utils import create_backup
-from .sqlite import get_or_add, DELETE, DBForm, SQLiteDB
+from .sqlite import cached_select, get_or_add, DELETE, DBForm, SQLiteDB, TASK_DETAIL_COLUMNS
 from .task import TaskStatus, TaskType
 from .tool import FormBatch
 
 
 __all__ = ['Batch']
 
+# Each TiffHandler keeps parsed copies of the TIFF headers so long-running
+# processes should not keep handlers for all images of all batches.
+TIFF_HANDLER_CACHE_SIZE = 64
+
 class Batch(object):
-    def __init__(self, cdb, ibf, db, *, meta=None, bunch=None):
+    def __init__(self, cdb, ibf, db, *, meta=None, bunch=None,
+                 tiff_handler_cache_size=TIFF_HANDLER_CACHE_SIZE):
         self.cdb = cdb
         self.ibf = ibf
         self.db = db
         self.meta = meta or {}
         self.bunch = bunch
-        self._tiff_handlers = None
+        self._tiff_handlers = LRUCache(maxsize=tiff_handler_cache_size)
 
     @property
     def tiff_handlers(self):
-        if self._tiff_handlers is None:
-            self._tiff_handlers = [None] * self.ibf.image_count()
+        """LRU cache (form index -> TiffHandler), check ".stats()" for the
+        hit/miss ratio."""
         return self._tiff_handlers
 
     def tiff_handler(self, form_index):
-        th = self.tiff_handlers[form_index]
+        th = self._tiff_handlers.get(form_index)
         if th is None:
             th = TiffHandler(self.ibf, form_index)
-            self._tiff_handlers[form_index] = th
+            self._tiff_handlers.put(form_index, th)
         return th
 
     @classmethod
     def init_from_bunch(cls, databunch, create_persistent_db=False,
-                        delay_load=False, access='write', log=None, *, field_names=None):
+                        delay_load=False, access='write', log=None, *, field_names=None,
+                        tiff_handler_cache_size=TIFF_HANDLER_CACHE_SIZE, db_profile=None,
+                        fast_open=False, db_in_memory=False):
         """
         Return a new Batch instance based on the given databunch.
+
+        "db_profile" selects the SQLite connection tuning (see
+        "sqlite.PRAGMA_PROFILES").
+
+        "fast_open=True" is meant for (read-only) batch scanning: CDB, IBF and
+        DB are opened concurrently, the DB version is checked on first DB
+        access and the remaining verification tasks are only logged if the
+        logger has debug logging enabled. The time needed for each phase is
+        logged (debug level).
+
+        "db_in_memory=True" loads an existing DB file into memory (see
+        "SQLiteDB.open_in_memory()"), use "batch.db.snapshot()" to store the
+        changes.
         """
         # If delay_load is True, we can not access the form data via
         # cdb_tool.FormBatch.forms (the list contains only callables then).
@@ -64,24 +87,49 @@ class Batch(object):
         if field_names is not None:
             # see "FormBatch.__init__()" for more information
             warnings.warn('".init_from_bunch()": deprecated parameter "field_names" used', DeprecationWarning)
-        cdb = FormBatch(databunch.cdb, delay_load=False, access=access, log=log)
-        ibf = ImageBatch(databunch.ibf, delay_load=delay_load, access=access, log=log)
         db_path = databunch.db
-        if db_path is None:
+        create_db = (db_path is None)
+        if create_db:
             is_readonly = (access == 'read')
             if create_persistent_db:
                 assert not is_readonly
-                if db_path is None:
-                    db_path = guess_path(databunch.cdb, type_='db')
+                db_path = guess_path(databunch.cdb, type_='db')
             databunch = DataBunch.merge(databunch, db=db_path)
-            sqlite_db = SQLiteDB.create_new_db(db_path, create_file=create_persistent_db, log=log)
-        elif isinstance(db_path, SQLiteDB):
-            sqlite_db = db_path
+
+        open_cdb = lambda: FormBatch(databunch.cdb, delay_load=False, access=access, log=log)
+        open_ibf = lambda: ImageBatch(databunch.ibf, delay_load=delay_load, access=access, log=log)
+        def open_db():
+            if create_db:
+                return SQLiteDB.create_new_db(db_path, create_file=create_persistent_db, log=log, profile=db_profile)
+            elif isinstance(db_path, SQLiteDB):
+                return db_path
+            elif db_in_memory:
+                return SQLiteDB.open_in_memory(db_path, log=log)
+            return SQLiteDB.init_with_file(db_path, profile=db_profile, defer_version_check=fast_open)
+
+        openers = (('cdb', open_cdb), ('ibf', open_ibf), ('db', open_db))
+        timings = {}
+        if fast_open:
+            # SQLAlchemy uses one connection per thread for in-memory DBs so
+            # these must be created in the calling thread (otherwise the
+            # caller would see an empty DB). DB instances passed by the
+            # caller need no opening at all.
+            db_is_file = not (isinstance(db_path, SQLiteDB) or (create_db and not create_persistent_db))
+            local_names = () if db_is_file else ('db',)
+            results = _open_concurrently(openers, timings, local_names=local_names)
         else:
-            sqlite_db = SQLiteDB.init_with_file(db_path)
-        batch = Batch(cdb, ibf, sqlite_db, bunch=simple_bunch(databunch))
+            results = [_timed(name, opener, timings) for name, opener in openers]
+        cdb, ibf, sqlite_db = results
+        batch = Batch(cdb, ibf, sqlite_db, bunch=simple_bunch(databunch),
+            tiff_handler_cache_size=tiff_handler_cache_size)
 
+        # without a logger the task list would be discarded anyway
+        log_tasks = (not fast_open) or ((log is not None) and log.isEnabledFor(logging.DEBUG))
         log = l_(log)
+        phases = ', '.join('%s %.3fs' % (name, timings[name]) for name, _ in openers)
+        log.debug('opened batch (%s)', phases)
+        if not log_tasks:
+            return batch
         verification_tasks = batch.tasks(type_=TaskType.VERIFICATION, status=TaskStatus.NEW)
         forms_with_errors = []
         for task in verification_tasks:
@@ -146,22 +194,23 @@ class Batch(object):
         self.cdb = FormBatch(target_path, log=log)
 
     # --- accessing data ------------------------------------------------------
-    def tasks(self, type_=None, status=None, form_index=None):
-        Task = self.db.Task
-        query_all = self.db.query(Task)
+    def tasks(self, type_=None, status=None, form_index=None, *, with_details=False):
+        """
+        Return all tasks matching the given conditions.
 
-        conditions = []
+        The task details ("sqlite.TASK_DETAIL_COLUMNS") are loaded on first
+        access (one query per task) unless "with_details=True" is passed.
+        """
+        Task = self.db.Task
         attrs = (
             ('form_index', form_index),
             ('type_', type_),
             ('status', status)
         )
-        for attr, value in attrs:
-            if value is not None:
-                conditions.append(getattr(Task, attr) == value)
-        if not conditions:
-            return query_all.all()
-        return query_all.filter(and_(*conditions)).all()
+        params = dict((attr, value) for attr, value in attrs if (value is not None))
+        deferred = () if with_details else TASK_DETAIL_COLUMNS
+        statement = cached_select(Task, tuple(params), deferred=deferred)
+        return self.db.session.execute(statement, params).scalars().all()
 
     def new_tasks(self, type_=None, **kwargs):
         return self.tasks(type_=type_, status=TaskStatus.NEW, **kwargs)
@@ -178,14 +227,38 @@ class Batch(object):
     def batch_form(self, form_index):
         return BatchForm(self, form_index)
 
+    def delete_forms(self, form_indices):
+        """Mark all specified forms as deleted (CDB, IBF index and TIFF).
+
+        Contrary to "BatchForm.delete()" the CDB and the IBF are only flushed
+        once after all forms were updated.
+        """
+        self._set_deletion_state(form_indices, set_as_deleted=True)
+
+    def undelete_forms(self, form_indices):
+        self._set_deletion_state(form_indices, set_as_deleted=False)
+
+    def _set_deletion_state(self, form_indices, *, set_as_deleted):
+        for form_index in form_indices:
+            batch_form = self.batch_form(form_index)
+            batch_form._set_deletion_state(set_as_deleted, flush=False)
+        self.cdb.flush()
+        self.ibf.flush()
+
     def db_form(self, form_index):
         session = self.db.session
-        return DBForm(session, form_index, self.db.model)
+        return DBForm(session, form_index, self.db.model, db=self.db)
+
+    def preload_db(self):
+        """Load all tasks, ignored warnings and form settings at once so
+        "DBForm" lookups (see ".db_form()") do not need extra queries."""
+        self.db.preload_form_data()
 
     def get_setting(self, key, value_only=True):
         session = self.db.session
         BatchData = self.db.model.BatchData
-        option = session.query(BatchData).filter(BatchData.key == key).first()
+        statement = cached_select(BatchData, ('key',), first=True)
+        option = session.execute(statement, {'key': key}).scalars().first()
         if not value_only:
             return option
         return option.value if (option is not None) else None
@@ -199,3 +272,35 @@ class Batch(object):
             return None
         setting = get_or_add(BatchData, self.db.session, {'key': key})
         setting.value = value
+
+
+def _timed(name, opener, timings):
+    start = timer()
+    result = opener()
+    timings[name] = timer() - start
+    return result
+
+def _open_concurrently(openers, timings, *, local_names=()):
+    """Run the <openers> in a thread pool, openers listed in <local_names>
+    are run in the calling thread afterwards. If an opener fails all objects
+    opened by this function are closed."""
+    pooled_openers = [(name, opener) for name, opener in openers if name not in local_names]
+    with ThreadPoolExecutor(max_workers=len(pooled_openers)) as executor:
+        futures = {name: executor.submit(_timed, name, opener, timings) for name, opener in pooled_openers}
+        # make sure all files are opened (or failed) before raising an error
+        errors = [future.exception() for future in futures.values()]
+        results = {name: future.result() for name, future in futures.items() if future.exception() is None}
+        if any(errors):
+            for result in results.values():
+                result.close()
+            raise next(error for error in errors if error)
+    try:
+        for name, opener in openers:
+            if name in local_names:
+                results[name] = _timed(name, opener, timings)
+    except BaseException:
+        for name, result in results.items():
+            if name not in local_names:
+                result.close()
+        raise
+    return [results[name] for name, _ in openers]
@@ -80,7 +80,9 @@ class BatchForm(object):
     def undelete(self):
         self._set_deletion_state(False)
 
-    def _set_deletion_state(self, set_as_deleted):
+    def _set_deletion_state(self, set_as_deleted, *, flush=True):
+        # flush=False: only modify the mapped files, the caller must flush
+        # the CDB and IBF afterwards (see "Batch.delete_forms()").
         cdb_form = self.batch.cdb.forms[self.form_index]
         ibf_data = self.ibf.image_entries[self.form_index]
         tiff_handler = self.batch.tiff_handler(self.form_index)
@@ -110,11 +112,11 @@ class BatchForm(object):
         #
         # First, we actualize the form data:
         # - move the data in memory back to the structure on disk.
-        cdb_form.write_back()
+        cdb_form.write_back(flush=flush)
         # Then we update the index info in the IBF:
-        self.ibf.update_entry(ibf_data)
+        self.ibf.update_entry(ibf_data, flush=flush)
         # And as the last step, we also ask the tiff handler to write its data to disk.
-        tiff_handler.update()
+        tiff_handler.update(flush=flush)
 
     def pic(self):
         image_data = self.ibf.image_entries[self.form_index]
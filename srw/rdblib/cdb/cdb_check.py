@@ -8,6 +8,7 @@ import re
 import bitmath
 from schwarz.log_utils import l_
 
+from ..instrumentation import metrics
 from ..lib.filesize import format_filesize
 from ..lib.result import Result
 from ..mmap_file import MMapFile
@@ -22,18 +23,22 @@ MAX_RDB_SIZE = bitmath.MiB(100)
 DEFAULT_NUMBER_FIELDS = 61
 re_fieldname = re.compile('^[A-Za-z\-_0-9]+$')
 
-def open_cdb(cdb_path, *, field_names=None, required_fields=None, access='write', log=None, ignore_size=False):
+@metrics.timed('cdb.open_cdb')
+def open_cdb(cdb_path, *, field_names=None, required_fields=None, access='write', log=None, ignore_size=False,
+             lock_timeout=None):
     log = l_(log)
     warnings = []
     is_pathlike = isinstance(cdb_path, (str, os.PathLike))
     if is_pathlike:
         filesize = bitmath.Byte(os.stat(cdb_path).st_size)
-        filesize_str = format_filesize(filesize, locale='de')
         if filesize >= MAX_RDB_SIZE and (not ignore_size):
+            filesize_str = format_filesize(filesize, locale='de')
             return _error('Die CDB-Datei ist defekt (%s groß)' % filesize_str, warnings=warnings, key='file.too_big')
 
         try:
-            cdb_fp = MMapFile(cdb_path, access=access, log=log)
+            # all forms are checked so the kernel should read ahead
+            cdb_fp = MMapFile(cdb_path, access=access, log=log, access_pattern='sequential',
+                              lock_timeout=lock_timeout)
         except OSError:
             return _error('Die CDB-Datei ist vermutlich noch in Bearbeitung.', warnings=warnings, key='file.is_locked')
 
@@ -52,6 +57,7 @@ def open_cdb(cdb_path, *, field_names=None, required_fields=None, access='write'
     min_bytes = BatchHeader.size + FormHeader.size + Field.size
     if filesize < min_bytes:
         min_size_str = format_filesize(min_bytes, locale='de')
+        filesize_str = format_filesize(filesize, locale='de')
         msg = 'Die CDB-Datei ist zu klein: %s, mindestens %s erwartet' % (min_size_str, filesize_str)
         cdb_fp.close()
         return _error(msg, warnings=warnings, key='file.too_small')
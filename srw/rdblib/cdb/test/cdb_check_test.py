@@ -3,6 +3,7 @@ from __future__ import division, absolute_import, print_function, unicode_litera
 
 from io import BytesIO
 import os
+import threading
 
 from ddt import ddt as DataDrivenTestCase, data
 from pythonic_testcase import *
@@ -15,7 +16,7 @@ from .. import (
 )
 from ..cdb_check import calculate_bytes_per_form, calculate_filesize
 from ..cdb_fixtures import CDBFile, CDBForm
-from ...locking import acquire_lock
+from ...locking import acquire_lock, unlock
 from ...tool.cdb_tool import FormBatch
 from ...testutil import valid_prescription_values, VALIDATED_FIELDS
 
@@ -84,6 +85,19 @@ class CDBCheckTest(PythonicTestCase):
 
         cdb_fp.close()
 
+    def test_can_wait_for_locked_cdb_files(self):
+        cdb_path = os.path.join(self.env_dir, 'foo.cdb')
+        cdb_fp = create_cdb_with_dummy_data(nr_forms=1, filename=cdb_path, field_names=VALIDATED_FIELDS)
+        lock_fp = open(cdb_path, 'rb')
+        self.addCleanup(lock_fp.close)
+        acquire_lock(lock_fp, exclusive_lock=True)
+        threading.Timer(0.05, unlock, args=(lock_fp,)).start()
+
+        result = open_cdb(cdb_path, field_names=VALIDATED_FIELDS, lock_timeout=5)
+        assert_true(result)
+        result.cdb_fp.close()
+        cdb_fp.close()
+
     @data(True, False)
     def test_can_detect_cdb_files_with_trailing_junk(self, explicit_fieldnames):
         cdb_path = self._create_cdb(nr_forms=1, nr_junk_bytes=100)
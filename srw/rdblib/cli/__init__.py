@@ -1,5 +1,14 @@
 
-from .delete_image import *
-from .extract_image import *
-from .find_broken_form import *
-from .inject_pic_in_tiff_img import *
+from ..lazy_imports import lazy_exports
+
+# The console scripts are only imported when used: "srw-extract-image" needs
+# Pillow, "srw-generate-corpus" SQLAlchemy.
+_LAZY_EXPORTS = {
+    '.delete_image': ('delete_image_main',),
+    '.extract_image': ('extract_image_main',),
+    '.find_broken_form': ('find_broken_form_main',),
+    '.generate_corpus': ('generate_corpus_main',),
+    '.inject_pic_in_tiff_img': ('inject_pic_in_tiff_img_main',),
+}
+__getattr__, __dir__ = lazy_exports(__name__, _LAZY_EXPORTS)
+__all__ = [name for names in _LAZY_EXPORTS.values() for name in names]
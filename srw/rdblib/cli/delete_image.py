@@ -8,6 +8,10 @@ Es können auch mehrere Images auf einmal angegeben werden (z.B. "5-7").
 
 Usage:
     srw-delete-image [--undelete] <IBF> <IMG>
+
+Profiling:
+    --profile[=<MODE>]  Profiling-Daten speichern ("cprofile" oder "tracemalloc")
+    --timings           Laufzeit nach Phasen (open, lock, parse, work, flush) ausgeben
 """
 
 from pathlib import Path
@@ -17,10 +21,12 @@ import sys
 from docopt import docopt
 
 from ..ibf import ImageBatch, TiffHandler
+from ..instrumentation import instrumented_main
 
 
 __all__ = ['delete_image_main']
 
+@instrumented_main('srw-delete-image', output_args=('<IBF>',))
 def delete_image_main(argv=sys.argv):
     arguments = docopt(__doc__, argv=argv[1:])
     img_str = arguments['<IMG>']
@@ -64,6 +70,9 @@ def delete_image_main(argv=sys.argv):
                 continue
             print(f'loesche Image #{img} (PIC {current_pic})')
             th.long_data.update_rec(page_name='DELETED')
-        th.update()
+        # Only modify the mapped file here: Flushing after every image is
+        # pretty slow when deleting a range of images.
+        th.update(flush=False)
+    ibf.flush()
     ibf.close()
 
@@ -13,6 +13,10 @@ Options:
     --all           Extract all images
     --tiff          Store images as tiff (same as in IBF)
     -h, --help      Show this screen
+
+Profiling:
+    --profile[=<MODE>]  Profiling-Daten speichern ("cprofile" oder "tracemalloc")
+    --timings           Laufzeit nach Phasen (open, lock, parse, work, flush) ausgeben
 """
 
 from io import BytesIO
@@ -23,6 +27,7 @@ from docopt import docopt
 from PIL import Image
 
 from ..ibf import ImageBatch
+from ..instrumentation import instrumented_main
 
 
 __all__ = ['extract_image_main']
@@ -39,6 +44,7 @@ def _store_image(ibf, form_idx, target_path, use_tiff=False):
         img.close()
 
 
+@instrumented_main('srw-extract-image', output_args=('<OUTPUT_PATH>',))
 def extract_image_main(argv=sys.argv):
     arguments = docopt(__doc__, argv=argv[1:])
     extract_all_images = arguments['--all']
@@ -79,7 +85,8 @@ def extract_image_main(argv=sys.argv):
 
     get_target_path = lambda form_nr: os.path.join(output_dir, output_filename or 'form-%03d.%s' % (form_nr, img_extension))
 
-    ibf = ImageBatch(ibf_path, delay_load=False, access='read')
+    access_pattern = 'sequential' if extract_all_images else None
+    ibf = ImageBatch(ibf_path, delay_load=False, access='read', access_pattern=access_pattern)
     nr_forms = ibf.image_count()
     if not extract_all_images:
         if nr_forms < form_nr:
@@ -8,6 +8,10 @@ Options:
     --ignore-size   ignore file size and try to find broken form anyway
     --try-repair    try repair (restore overwritten fields)
     -h, --help      Show this screen
+
+Profiling:
+    --profile[=<MODE>]  Profiling-Daten speichern ("cprofile" oder "tracemalloc")
+    --timings           Laufzeit nach Phasen (open, lock, parse, work, flush) ausgeben
 """
 import os
 import sys
@@ -15,6 +19,7 @@ import sys
 from docopt import docopt
 
 from ..cdb import open_cdb, BatchHeader, Field, FormHeader, CDB_ENCODING
+from ..instrumentation import instrumented_main
 from ..mmap_file import MMapFile
 
 
@@ -76,6 +81,7 @@ def check_for_broken_form(cdb_path, field_names=None, try_repair=False, ignore_s
     return
 
 
+@instrumented_main('find-broken-form', output_args=('<RDB>',))
 def find_broken_form_main(argv=sys.argv):
     arguments = docopt(__doc__, argv=argv[1:])
     cdb_fn = arguments['<RDB>']
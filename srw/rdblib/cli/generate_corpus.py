@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""srw-generate-corpus
+
+Erzeugt synthetische Stapel (CDB, IBF mit Walther-TIFFs und SQLite-DB) z.B.
+für Lasttests. Optional kann ein Teil der Belege/Bilder absichtlich
+beschädigt werden (Liste in "corpus.json").
+
+Usage:
+    srw-generate-corpus [options] <TARGET_DIR> <NR_BATCHES>
+
+Options:
+    --forms=<N>             Belege pro Stapel [default: 300]
+    --fields=<N>            Felder pro Beleg [default: 61]
+    --corruption-rate=<R>   Anteil beschädigter Belege/Bilder [default: 0]
+    --task-rate=<R>         Anteil der Belege mit Prüfaufgabe [default: 0.1]
+    --seed=<SEED>           Zufallswert (für reproduzierbare Daten)
+    --scan-date=<DATUM>     Scan-Datum (Jahr/Monat der PICs) [default: 2024-01-01]
+    --no-db                 keine SQLite-DB erzeugen
+    -h, --help              Show this screen
+
+Profiling:
+    --profile[=<MODE>]  Profiling-Daten speichern ("cprofile" oder "tracemalloc")
+    --timings           Laufzeit nach Phasen (open, lock, parse, work, flush) ausgeben
+"""
+
+from datetime import date as Date
+import os
+import sys
+from timeit import default_timer as timer
+
+from docopt import docopt
+
+from ..corpus import default_field_names, generate_corpus
+from ..instrumentation import instrumented_main
+
+
+__all__ = ['generate_corpus_main']
+
+@instrumented_main('srw-generate-corpus', output_args=('<TARGET_DIR>',))
+def generate_corpus_main(argv=sys.argv):
+    arguments = docopt(__doc__, argv=argv[1:])
+    target_dir = arguments['<TARGET_DIR>']
+    nr_batches = int(arguments['<NR_BATCHES>'])
+    seed = arguments['--seed']
+
+    start = timer()
+    batches = generate_corpus(
+        target_dir,
+        nr_batches,
+        nr_forms=int(arguments['--forms']),
+        field_names=default_field_names(int(arguments['--fields'])),
+        corruption_rate=float(arguments['--corruption-rate']),
+        task_rate=float(arguments['--task-rate']),
+        with_db=not arguments['--no-db'],
+        seed=int(seed) if (seed is not None) else None,
+        scan_date=Date.fromisoformat(arguments['--scan-date']),
+    )
+    duration = timer() - start
+
+    total_size = 0
+    for batch in batches:
+        for path in (batch.cdb, batch.ibf, batch.db):
+            if path:
+                total_size += os.path.getsize(path)
+    mb = total_size / (1024 * 1024)
+    print(f'{nr_batches} Stapel ({mb:.1f} MB) in {duration:.1f} Sekunden erzeugt ({mb / duration:.1f} MB/s)')
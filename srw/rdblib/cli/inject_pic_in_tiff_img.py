@@ -3,6 +3,10 @@
 
 Usage:
     srw-inject-pic-into-tiff [--replace] <TIFF> <PIC> [<TARGET>]
+
+Profiling:
+    --profile[=<MODE>]  Profiling-Daten speichern ("cprofile" oder "tracemalloc")
+    --timings           Laufzeit nach Phasen (open, lock, parse, work, flush) ausgeben
 """
 
 from pathlib import Path
@@ -10,11 +14,13 @@ import sys
 
 from docopt import docopt
 
+from ..instrumentation import instrumented_main
 from ..tiff import inject_pic_in_tiff
 
 
 __all__ = ['inject_pic_in_tiff_img_main']
 
+@instrumented_main('srw-inject-pic-into-tiff', output_args=('<TARGET>', '<TIFF>'))
 def inject_pic_in_tiff_img_main(argv=sys.argv):
     arguments = docopt(__doc__, argv=argv[1:])
     tiff_path = Path(arguments['<TIFF>'])
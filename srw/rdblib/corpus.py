@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+"""
+Generate large synthetic batch corpora (CDB, IBF with Walther TIFFs and the
+SQLite DB) on disk, e.g. for load testing and benchmarks.
+
+The test fixtures (see "cdb.CDBFile", "ibf.IBFFile") build every field with a
+separate "struct.pack()" call which is fine for a few forms but way too slow
+for gigabytes of data. The generator packs a single form/index entry/TIFF
+once and only patches the variable parts (form number, PIC, offsets) for
+each form ("struct.pack_into()" on a preallocated buffer).
+
+Corrupted data (if requested) mimics the defects seen in production:
+  - CDB: overwritten field name (see "find-broken-form")
+  - IBF: destroyed TIFF header (invalid byte order marker)
+"""
+
+from collections import namedtuple
+from datetime import date as Date
+import json
+import os
+import random
+import struct
+
+from schwarz.log_utils import l_
+
+from .cdb import CDBFormat, CDB_ENCODING
+from .ibf.ibf_format import IBFFormat, IMAGES_PER_BLOCK, INDEX_PADDING
+from .paths import guess_path
+from .sqlite import SQLiteDB
+from .task import TaskType
+from .tiff.sample_tiff import create_dual_page_tiff_file
+
+
+__all__ = ['default_field_names', 'generate_corpus', 'write_batch', 'CorpusBatch']
+
+# some fields with the values used by "testutil.valid_prescription_values()"
+FIELD_VALUES = {
+    'ABGABEDATUM': '01012024',
+    'AUSSTELLUNGSDATUM': '01.01.2024',
+    'BSNR': '179999900',
+    'GEBURTSDATUM': '30.08.1950',
+    'LANR': '240000601',
+}
+# The legacy software uses 61 fields per form.
+NR_FIELDS = 61
+FORMS_PER_BATCH = 300
+MANIFEST_FILENAME = 'corpus.json'
+# year/month of the PICs (matches the dates in "FIELD_VALUES")
+SCAN_DATE = Date(2024, 1, 1)
+
+CorpusBatch = namedtuple('CorpusBatch', ('cdb', 'ibf', 'db', 'corrupted_forms', 'corrupted_images'))
+
+def default_field_names(nr_fields=NR_FIELDS):
+    field_names = sorted(FIELD_VALUES)[:nr_fields]
+    for idx in range(len(field_names), nr_fields):
+        field_names.append('FELD%02d' % (idx + 1))
+    return tuple(field_names)
+
+
+def generate_corpus(target_dir, nr_batches, *, nr_forms=FORMS_PER_BATCH, field_names=None,
+                    corruption_rate=0.0, task_rate=0.1, with_db=True, seed=None, scan_date=SCAN_DATE,
+                    log=None):
+    """
+    Write <nr_batches> batches (CDB, IBF and optionally the SQLite DB) to
+    <target_dir> (IBFs in the usual "00000001" subdirectory).
+
+    "corruption_rate" is the probability that a form (CDB) or an image (IBF)
+    is corrupted (independently), "task_rate" the probability that a form has
+    a verification task. All corrupted forms/images are listed in the manifest
+    ("corpus.json"). "scan_date" determines the year/month of the PICs.
+    Passing a "seed" generates the same corpus every time.
+
+    Returns a list of CorpusBatch.
+    """
+    log = l_(log)
+    if field_names is None:
+        field_names = default_field_names()
+    rng = random.Random(seed)
+    templates = BatchTemplates(field_names)
+    os.makedirs(target_dir, exist_ok=True)
+    batches = []
+    for batch_idx in range(nr_batches):
+        cdb_path = os.path.join(target_dir, '%08d.CDB' % (batch_idx + 1))
+        batch = write_batch(cdb_path, nr_forms=nr_forms, templates=templates,
+            corruption_rate=corruption_rate, task_rate=task_rate, with_db=with_db,
+            customer_nr=batch_idx, rng=rng, scan_date=scan_date)
+        batches.append(batch)
+        log.debug('created batch %s', cdb_path)
+
+    manifest = {
+        'nr_forms': nr_forms,
+        'field_names': list(field_names),
+        'corruption_rate': corruption_rate,
+        'scan_date': scan_date.isoformat(),
+        'batches': [batch._asdict() for batch in batches],
+    }
+    manifest_path = os.path.join(target_dir, MANIFEST_FILENAME)
+    with open(manifest_path, 'w') as manifest_fp:
+        json.dump(manifest, manifest_fp, indent=2)
+    log.info('created %d batches in %s', nr_batches, target_dir)
+    return batches
+
+
+def write_batch(cdb_path, *, nr_forms=FORMS_PER_BATCH, field_names=None, templates=None,
+                corruption_rate=0.0, task_rate=0.1, with_db=True, customer_nr=0, rng=None,
+                scan_date=SCAN_DATE):
+    """Write a single batch, see "generate_corpus()"."""
+    if templates is None:
+        templates = BatchTemplates(field_names or default_field_names())
+    if rng is None:
+        rng = random.Random()
+    pics = [generate_corpus_pic(customer_nr, form_index, nr_forms=nr_forms, scan_date=scan_date)
+            for form_index in range(nr_forms)]
+    corrupted_forms = [idx for idx in range(nr_forms) if (rng.random() < corruption_rate)]
+    corrupted_images = [idx for idx in range(nr_forms) if (rng.random() < corruption_rate)]
+
+    cdb_data = templates.cdb_bytes(pics, corrupted_forms=corrupted_forms, rng=rng)
+    with open(cdb_path, 'wb') as cdb_fp:
+        cdb_fp.write(cdb_data)
+
+    ibf_path = guess_path(cdb_path, type_='ibf')
+    os.makedirs(os.path.dirname(ibf_path), exist_ok=True)
+    with open(ibf_path, 'wb') as ibf_fp:
+        ibf_fp.writelines(templates.ibf_chunks(pics, corrupted_images=corrupted_images))
+
+    db_path = None
+    if with_db:
+        db_path = guess_path(cdb_path, type_='db')
+        if os.path.exists(db_path):
+            os.unlink(db_path)
+        db = SQLiteDB.create_new_db(db_path, create_file=True)
+        task_rows = []
+        for form_index in range(nr_forms):
+            if rng.random() < task_rate:
+                field_name = rng.choice(templates.field_names)
+                task_rows.append({'form_index': form_index, 'type_': TaskType.VERIFICATION, 'field_name': field_name})
+        for form_index in corrupted_forms:
+            task_rows.append({'form_index': form_index, 'type_': TaskType.FORM_VALIDATION})
+        db.bulk_add_tasks(task_rows)
+        db.close(commit=True)
+    return CorpusBatch(cdb_path, ibf_path, db_path, corrupted_forms, corrupted_images)
+
+
+def generate_corpus_pic(customer_nr, form_index, *, nr_forms=FORMS_PER_BATCH, scan_date=SCAN_DATE):
+    # same structure/length as "testutil.generate_pic()" (year/month,
+    # customer, scan number, suffix). The customer and scan number digits are
+    # used as a single serial number so the PICs of up to 10^8 forms (e.g.
+    # 300,000 batches with 300 forms) are unique.
+    serial = customer_nr * nr_forms + form_index + 1
+    if serial >= 10**8:
+        raise ValueError('too many forms for unique PICs (serial %d)' % serial)
+    date_prefix = str(scan_date.year)[-1] + ('%02d' % scan_date.month)
+    return '%s%08d024' % (date_prefix, serial)
+
+
+class BatchTemplates(object):
+    """Pre-packed binary data for CDB forms, IBF index entries and TIFFs."""
+    def __init__(self, field_names):
+        self.field_names = tuple(field_names)
+        self._init_cdb_templates()
+        self._init_tiff_template()
+        self.index_entry = _StructLayout(IBFFormat.index_entry)
+        self.ibf_header = _StructLayout(IBFFormat.batch_header)
+
+    # --- CDB -----------------------------------------------------------------
+    def _init_cdb_templates(self):
+        self.batch_header = _StructLayout(CDBFormat.batch_header)
+        self.form_header = _StructLayout(CDBFormat.form_header)
+        self.field = _StructLayout(CDBFormat.field)
+        form_template = bytearray(self.form_header.size + len(self.field_names) * self.field.size)
+        self.form_header.pack_into(form_template, 0, field_count=len(self.field_names), status=1, valid=1)
+        for field_idx, field_name in enumerate(self.field_names):
+            value = FIELD_VALUES.get(field_name, '')
+            self.field.pack_into(form_template, self._field_offset(field_idx),
+                number=field_idx + 1,
+                status=1,
+                name=field_name.encode(CDB_ENCODING),
+                recognizer_result=value.encode(CDB_ENCODING),
+                corrected_result=value.encode(CDB_ENCODING),
+                valid=1,
+            )
+        self.form_template = bytes(form_template)
+
+    def _field_offset(self, field_idx):
+        return self.form_header.size + field_idx * self.field.size
+
+    def cdb_bytes(self, pics, *, corrupted_forms=(), rng=None):
+        nr_forms = len(pics)
+        form_size = len(self.form_template)
+        header_size = self.batch_header.size
+        cdb_data = bytearray(header_size) + (self.form_template * nr_forms)
+        self.batch_header.pack_into(cdb_data, 0, form_count=nr_forms)
+        set_number = self.form_header.setter('number_in_batch')
+        set_pic = self.form_header.setter('imprint_line_short')
+        for form_index, pic in enumerate(pics):
+            form_offset = header_size + form_index * form_size
+            set_number(cdb_data, form_offset, form_index)
+            set_pic(cdb_data, form_offset, pic.encode(CDB_ENCODING))
+
+        rng = rng or random.Random()
+        name_offset = self.field.offsets['name']
+        for form_index in corrupted_forms:
+            field_idx = rng.randrange(len(self.field_names))
+            field_offset = header_size + form_index * form_size + self._field_offset(field_idx)
+            # overwritten field: garbage instead of "number", "status" and name
+            cdb_data[field_offset:field_offset + name_offset + 20] = bytes(rng.randrange(128, 256) for _ in range(name_offset + 20))
+        return bytes(cdb_data)
+
+    # --- IBF -----------------------------------------------------------------
+    def _init_tiff_template(self):
+        placeholder = 'X' * len(generate_corpus_pic(0, 0))
+        tiff_data = create_dual_page_tiff_file(placeholder).to_bytes()
+        b_placeholder = placeholder.encode('ascii')
+        pic_offsets = []
+        offset = tiff_data.find(b_placeholder)
+        while offset >= 0:
+            pic_offsets.append(offset)
+            offset = tiff_data.find(b_placeholder, offset + len(b_placeholder))
+        assert pic_offsets, 'PIC placeholder not found in TIFF'
+        self.tiff_template = tiff_data
+        self.tiff_pic_offsets = tuple(pic_offsets)
+
+    def tiff_bytes(self, pic):
+        b_pic = pic.encode('ascii')
+        tiff_data = bytearray(self.tiff_template)
+        for offset in self.tiff_pic_offsets:
+            tiff_data[offset:offset + len(b_pic)] = b_pic
+        return tiff_data
+
+    def ibf_chunks(self, pics, *, corrupted_images=()):
+        """Return the IBF data as a list of byte strings (to avoid copying
+        all TIFFs into a single buffer)."""
+        nr_images = len(pics)
+        corrupted_images = set(corrupted_images)
+        tiff_size = len(self.tiff_template)
+        entry_size = self.index_entry.size
+        index_size = IMAGES_PER_BLOCK * entry_size + INDEX_PADDING
+        nr_blocks = max(1, -(-nr_images // IMAGES_PER_BLOCK))
+
+        chunks = [None]
+        offset = self.ibf_header.size
+        offset_first_index = offset
+        offset_last_index = offset
+        for block_idx in range(nr_blocks):
+            block_offset = offset
+            offset_last_index = block_offset
+            first_img = block_idx * IMAGES_PER_BLOCK
+            block_pics = pics[first_img:first_img + IMAGES_PER_BLOCK]
+            block_size = index_size + len(block_pics) * tiff_size
+            is_last_block = (block_idx == nr_blocks - 1)
+            index_data = bytearray(index_size)
+            image_offset = block_offset + index_size
+            for entry_idx, pic in enumerate(block_pics):
+                is_first = (entry_idx == 0)
+                self.index_entry.pack_into(index_data, entry_idx * entry_size,
+                    is_first_index_entry=int(is_first),
+                    offset_next_indexblock=(block_offset + block_size) if (is_first and not is_last_block) else 0,
+                    images_in_indexblock=len(block_pics) if is_first else 0,
+                    _ign2=1,
+                    image_nr=first_img + entry_idx + 1,
+                    image_offset=image_offset + entry_idx * tiff_size,
+                    image_size=tiff_size,
+                    identifier=b'REZEPT',
+                    codnr=pic.encode('ascii'),
+                )
+            chunks.append(bytes(index_data))
+            for img_idx, pic in enumerate(block_pics, start=first_img):
+                tiff_data = self.tiff_bytes(pic)
+                if img_idx in corrupted_images:
+                    tiff_data[:4] = b'\x00\x00\x00\x00'
+                chunks.append(tiff_data)
+            offset = block_offset + block_size
+
+        header = bytearray(self.ibf_header.size)
+        self.ibf_header.pack_into(header, 0,
+            identifier=b'WIBF',
+            _ign1=1,
+            _ign2=1,
+            offset_first_index=offset_first_index,
+            offset_last_index=offset_last_index,
+            image_count=nr_images,
+            file_size=offset,
+        )
+        chunks[0] = bytes(header)
+        return chunks
+
+
+class _StructLayout(object):
+    """Field offsets of a binary structure so single fields can be written
+    into a buffer with "struct.pack_into()"."""
+    def __init__(self, bin_structure):
+        self.offsets = {}
+        self.structs = {}
+        offset = 0
+        for name, format_ in bin_structure:
+            field_struct = struct.Struct('<' + format_)
+            self.offsets[name] = offset
+            self.structs[name] = field_struct
+            offset += field_struct.size
+        self.size = offset
+
+    def pack_into(self, buffer_, offset, **values):
+        for name, value in values.items():
+            self.structs[name].pack_into(buffer_, offset + self.offsets[name], value)
+
+    def setter(self, name):
+        pack_into = self.structs[name].pack_into
+        field_offset = self.offsets[name]
+        return lambda buffer_, offset, value: pack_into(buffer_, offset + field_offset, value)
@@ -1,16 +1,23 @@
 # -*- coding: utf-8 -*-
 
-from timeit import default_timer as timer
+import hashlib
+from io import BytesIO
+import os
 
 from schwarz.log_utils import l_
 
+from ..instrumentation import metrics
+from ..lru_cache import LRUCache
 from ..meta import WithBinaryMeta
 from ..mmap_file import MMapFile
 from ..utils import filecontent
 from .ibf_format import IBFFormat
 
 
-__all__ = ['ImageBatch']
+__all__ = ['ImageBatch', 'render_thumbnail']
+
+# number of rendered thumbnails kept in memory (per ImageBatch)
+THUMBNAIL_CACHE_SIZE = 500
 
 class ImageBatchHeader(WithBinaryMeta):
     _struc = IBFFormat.batch_header
@@ -22,16 +29,31 @@ class Image(WithBinaryMeta):
 
 class ImageBatch(object):
 
-    def __init__(self, image_job, delay_load=False, access='write', log=None):
+    def __init__(self, image_job, delay_load=False, access='write', log=None,
+                 *, thumbnail_cache_size=THUMBNAIL_CACHE_SIZE, thumbnail_dir=None,
+                 access_pattern=None, mapping_pool=None):
+        # "access_pattern" (see "MMapFile"): "sequential" helps when reading
+        # all images. "random" disables readahead which was considerably
+        # slower even for random access (benchmarks/mmap_access_pattern_benchmark.py)
+        # so by default the kernel heuristics are used.
+        # "mapping_pool": share the (read-only) mapping with other users of
+        # the same IBF in this process (see "MappingPool").
         if hasattr(image_job, 'close'):
             self.mmap_file = image_job
+        elif mapping_pool is not None:
+            assert access == 'read'
+            self.mmap_file = mapping_pool.open(image_job, log=log, access_pattern=access_pattern)
         else:
-            self.mmap_file = MMapFile(image_job, access=access, log=log)
+            self.mmap_file = MMapFile(image_job, access=access, log=log, access_pattern=access_pattern)
 
         self.log = l_(log)
         self.header = None
         self.image_entries = None
         self._load_delayed = delay_load
+        self._thumbnails = LRUCache(maxsize=thumbnail_cache_size)
+        # optional on-disk cache for rendered thumbnails (shared between
+        # processes/ImageBatch instances)
+        self.thumbnail_dir = thumbnail_dir
         self.load_header()
         self.load_directories()
 
@@ -39,10 +61,9 @@ class ImageBatch(object):
         self.mmap_file.close()
 
     def load_header(self):
-        start = timer()
-        self.header = ImageBatchHeader(self.filecontent)
-        duration = timer() - start
-        self.log.debug('loading IBF header took %.5f seconds', duration)
+        with metrics.span('ibf.load_header') as span:
+            self.header = ImageBatchHeader(self.filecontent)
+        self.log.debug('loading IBF header took %.5f seconds', span.duration)
 
     @property
     def filecontent(self):
@@ -62,26 +83,64 @@ class ImageBatch(object):
                 offset += len(entry)
             return entries, offset_next_index
 
-        start = timer()
-        offset = self.header.rec.offset_first_index
-        self.image_entries = []
-        while offset != 0:
-            directory, offset = _get_subindex(offset)
-            self.image_entries += directory
-        duration = timer() - start
-        self.log.debug('loading %d image entries from IBF took %.5f seconds', len(self.image_entries), duration)
+        with metrics.span('ibf.load_directories') as span:
+            offset = self.header.rec.offset_first_index
+            self.image_entries = []
+            while offset != 0:
+                directory, offset = _get_subindex(offset)
+                self.image_entries += directory
+        self.log.debug('loading %d image entries from IBF took %.5f seconds', len(self.image_entries), span.duration)
 
     def get_tiff_image(self, index):
+        metrics.incr('ibf.images_read')
         entry = self.image_entries[index]
         return self.filecontent[entry.rec.image_offset:
                                 entry.rec.image_offset + entry.rec.image_size]
 
+    def thumbnail(self, index, size, *, page=1):
+        """Return a (cached) Pillow image of the specified TIFF page which fits
+        into <size> (width, height).
+
+        Rendered thumbnails are kept in a bounded LRU cache and (if
+        "thumbnail_dir" was set) also stored on disk so the full-resolution
+        scan must only be decoded once. Errors when reading/writing the disk
+        cache are only logged (unreadable files are removed). Callers must not
+        modify the returned image.
+        """
+        entry = self.image_entries[index]
+        width, height = size
+        cache_key = (entry.rec.image_offset, entry.rec.image_size, page, width, height)
+        thumbnail = self._thumbnails.get(cache_key)
+        if thumbnail is not None:
+            return thumbnail
+
+        thumbnail_path = None
+        if self.thumbnail_dir:
+            thumbnail_path = self._thumbnail_path(cache_key)
+            thumbnail = _load_thumbnail(thumbnail_path, log=self.log)
+        if thumbnail is None:
+            thumbnail = render_thumbnail(self.get_tiff_image(index), size, page=page)
+            if thumbnail_path:
+                _store_thumbnail(thumbnail, thumbnail_path, log=self.log)
+        self._thumbnails.put(cache_key, thumbnail)
+        return thumbnail
+
+    def _thumbnail_path(self, cache_key):
+        # The IBF header identifies the batch even if the file was moved
+        # (also works for in-memory IBFs), the image offset/size identifies
+        # the image within the batch.
+        hrec = self.header.rec
+        ibf_identity = (hrec.identifier, hrec.filename, hrec.scan_date, hrec.image_count, hrec.file_size)
+        key_str = repr(ibf_identity + cache_key)
+        key_hash = hashlib.sha1(key_str.encode('utf-8')).hexdigest()
+        return os.path.join(self.thumbnail_dir, key_hash + '.png')
+
     def image_count(self):
         return len(self.image_entries)
 
     # XXX this is right now a bit ugly, since we need to go though this structure
     # and not the image struc, directly. Will change...
-    def update_entry(self, entry):
+    def update_entry(self, entry, flush=True):
         ''' write a changed index entry '''
         assert isinstance(entry, Image)
         buffer = self.filecontent
@@ -90,4 +149,69 @@ class ImageBatch(object):
             offset = entry.offset
             buffer[offset:offset + len(data)] = data
             entry.edited_fields.clear()
+            if flush:
+                self.mmap_file.flush()
+
+    def flush(self):
+        with metrics.span('ibf.flush'):
             self.mmap_file.flush()
+
+
+def render_thumbnail(tiff_bytes, size, *, page=1):
+    """Decode the given TIFF page and return a Pillow image which fits into
+    <size> (width, height).
+
+    Pillow uses "draft()" (JPEG only) and "reduce()" (integer downscaling)
+    before the actual resampling so the expensive filter only runs on a
+    small image.
+    """
+    # pillow is only required for thumbnails so other users of the IBF code
+    # do not have to pay the import cost.
+    from PIL import Image
+
+    with Image.open(BytesIO(tiff_bytes)) as img:
+        if page:
+            img.seek(page)
+        img.draft('L', size)
+        # bilevel images ("1") can only be resampled using "NEAREST" which
+        # looks pretty bad for scanned text
+        gray_img = img.convert('L')
+    gray_img.thumbnail(size, reducing_gap=2.0)
+    return gray_img
+
+def _load_thumbnail(path, log):
+    from PIL import Image
+
+    try:
+        with Image.open(path) as img:
+            img.load()
+            return img.copy()
+    except FileNotFoundError:
+        return None
+    except (OSError, SyntaxError, ValueError) as e:
+        # Pillow raises different exceptions for broken/truncated files
+        log.warning('removing unreadable thumbnail %s: %s', path, e)
+        _remove_file(path)
+        return None
+
+def _store_thumbnail(thumbnail, path, log):
+    # write to a temporary file first so concurrent readers never see a
+    # partially written thumbnail
+    tmp_path = '%s.%d.tmp' % (path, os.getpid())
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        thumbnail.save(tmp_path, format='PNG')
+        os.replace(tmp_path, path)
+    except OSError as e:
+        # the disk cache is optional (e.g. disk full, read-only directory)
+        log.warning('unable to store thumbnail %s: %s', path, e)
+        _remove_file(tmp_path)
+    except BaseException:
+        _remove_file(tmp_path)
+        raise
+
+def _remove_file(path):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
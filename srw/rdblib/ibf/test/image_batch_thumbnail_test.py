@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+import os
+from unittest import mock
+
+from pythonic_testcase import *
+from schwarz.fakefs_helpers import TempFS
+
+from srw.rdblib.tiff.testutil import create_dual_page_tiff_file
+from ..testutil import create_ibf_with_tiffs
+from .. import ImageBatch
+
+
+
+class ImageBatchThumbnailTest(PythonicTestCase):
+    def setUp(self):
+        self.fs = TempFS.set_up(test=self)
+
+    def test_can_render_thumbnail(self):
+        ibf = self._create_image_batch(nr_images=2)
+        thumbnail = ibf.thumbnail(0, (200, 200))
+        width, height = thumbnail.size
+        assert_true(width <= 200)
+        assert_true(height <= 200)
+        assert_equals(200, max(width, height))
+
+    def test_caches_thumbnails_in_memory(self):
+        ibf = self._create_image_batch(nr_images=2, thumbnail_cache_size=1)
+        thumbnail = ibf.thumbnail(0, (100, 100))
+        assert_is(thumbnail, ibf.thumbnail(0, (100, 100)))
+        assert_is_not(thumbnail, ibf.thumbnail(0, (50, 50)))
+
+        ibf.thumbnail(1, (100, 100))
+        assert_equals(1, len(ibf._thumbnails))
+        assert_is_not(thumbnail, ibf.thumbnail(0, (100, 100)),
+            message='cache is bounded, first thumbnail should be evicted')
+
+    def test_can_store_thumbnails_on_disk(self):
+        thumbnail_dir = os.path.join(self.fs.root, 'thumbnails')
+        ibf = self._create_image_batch(nr_images=1, thumbnail_dir=thumbnail_dir)
+        thumbnail = ibf.thumbnail(0, (100, 100))
+        assert_length(1, os.listdir(thumbnail_dir))
+
+        ibf2 = self._create_image_batch(nr_images=1, thumbnail_dir=thumbnail_dir)
+        disk_thumbnail = ibf2.thumbnail(0, (100, 100))
+        assert_equals(thumbnail.size, disk_thumbnail.size)
+        assert_equals(thumbnail.tobytes(), disk_thumbnail.tobytes())
+
+    def test_returns_thumbnail_if_storing_thumbnail_fails(self):
+        thumbnail_dir = os.path.join(self.fs.root, 'thumbnails')
+        ibf = self._create_image_batch(nr_images=1, thumbnail_dir=thumbnail_dir)
+        image = ibf.thumbnail(0, (100, 100))
+        os.unlink(os.path.join(thumbnail_dir, os.listdir(thumbnail_dir)[0]))
+
+        def save_partially(path, **kwargs):
+            with open(path, 'wb') as fp:
+                fp.write(b'\x89PNG')
+            raise OSError('No space left on device')
+        with mock.patch.object(image, 'save', side_effect=save_partially):
+            with mock.patch('srw.rdblib.ibf.image_batch.render_thumbnail', return_value=image):
+                ibf._thumbnails.clear()
+                assert_is(image, ibf.thumbnail(0, (100, 100)))
+        assert_equals([], os.listdir(thumbnail_dir))
+
+    def test_renders_thumbnail_if_stored_thumbnail_is_unreadable(self):
+        thumbnail_dir = os.path.join(self.fs.root, 'thumbnails')
+        ibf = self._create_image_batch(nr_images=1, thumbnail_dir=thumbnail_dir)
+        thumbnail = ibf.thumbnail(0, (100, 100))
+        thumbnail_path, = [os.path.join(thumbnail_dir, name) for name in os.listdir(thumbnail_dir)]
+        with open(thumbnail_path, 'wb') as fp:
+            fp.write(b'\x89PNG broken')
+
+        ibf2 = self._create_image_batch(nr_images=1, thumbnail_dir=thumbnail_dir)
+        assert_equals(thumbnail.tobytes(), ibf2.thumbnail(0, (100, 100)).tobytes())
+        # the broken file was replaced
+        ibf3 = self._create_image_batch(nr_images=1, thumbnail_dir=thumbnail_dir)
+        with mock.patch('srw.rdblib.ibf.image_batch.render_thumbnail') as render:
+            assert_equals(thumbnail.tobytes(), ibf3.thumbnail(0, (100, 100)).tobytes())
+        assert_false(render.called)
+
+    # --- internal helpers ----------------------------------------------------
+    def _create_image_batch(self, *, nr_images, **ibf_kwargs):
+        tiffs = []
+        for idx in range(nr_images):
+            pic_str = '1234560010%04d' % idx
+            tiff_bytes = create_dual_page_tiff_file(pic_str).to_bytes()
+            tiffs.append((pic_str, tiff_bytes))
+        ibf_fp = create_ibf_with_tiffs(tiffs)
+        return ImageBatch(ibf_fp, **ibf_kwargs)
@@ -31,6 +31,16 @@ class TiffHandlerTest(PythonicTestCase):
         assert_equals(27, th.ifd2.rec.num_tags)
         assert_equals('REZEPT', th.long_data2.rec.document_name)
 
+    def test_parses_second_tiff_header_only_on_demand(self):
+        ibf_path = self._create_ibf(n_images=1)
+        imbatch = ImageBatch(str(ibf_path), access='read')
+        th = TiffHandler(imbatch, 0)
+        assert_none(th._long_data2)
+
+        assert_equals('REZEPT', th.long_data2.rec.document_name)
+        assert_true(th._long_data2 is not None)
+        imbatch.close()
+
     @data('write', 'copy')
     def test_tiff_write(self, access):
         pic1 = PIC(year=2022, month=6, customer_id_short=123, counter=42)
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 
+from ..instrumentation import metrics
 from ..meta import WithBinaryMeta
 from .ibf_format import Tiff
 
@@ -23,6 +24,7 @@ class TiffHandler(object):
 
 
     def __init__(self, image_batch, index):
+        metrics.incr('tiff_handler.parsed')
         self.filecontent = image_batch.filecontent
         entry = image_batch.image_entries[index]
         self.offset = entry.rec.image_offset
@@ -43,13 +45,30 @@ class TiffHandler(object):
         ext_ofs = ifd_ofs + self.ifd.record_size
         self.long_data = self.__class__.LongData(self.filecontent, ext_ofs)
 
-        # The second tiff header:
-        ifd2_ofs = self.offset + self.ifd.rec.next_ifd
-        self.ifd2 = self.__class__.IfdStruc(self.filecontent, ifd2_ofs)
-        ext_ofs2 = ifd2_ofs + self.ifd2.record_size
-        self.long_data2 = self.__class__.LongData(self.filecontent, ext_ofs2)
+        # The second tiff header is only needed to restore deleted images so
+        # it is parsed lazily (see "ifd2"/"long_data2").
+        self._ifd2 = None
+        self._long_data2 = None
 
-    def update(self):
+    def _load_second_header(self):
+        ifd2_ofs = self.offset + self.ifd.rec.next_ifd
+        self._ifd2 = self.__class__.IfdStruc(self.filecontent, ifd2_ofs)
+        ext_ofs2 = ifd2_ofs + self._ifd2.record_size
+        self._long_data2 = self.__class__.LongData(self.filecontent, ext_ofs2)
+
+    @property
+    def ifd2(self):
+        if self._ifd2 is None:
+            self._load_second_header()
+        return self._ifd2
+
+    @property
+    def long_data2(self):
+        if self._long_data2 is None:
+            self._load_second_header()
+        return self._long_data2
+
+    def update(self, flush=True):
         ''' write changed tiff data '''
         #
         # Note:
@@ -66,11 +85,13 @@ class TiffHandler(object):
         buffer = self.filecontent
         long_data = self.long_data
         if long_data.edited_fields:
+            metrics.incr('tiff_handler.updated')
             data = long_data._get_binary()
             offset = long_data.offset
             buffer[offset:offset + len(data)] = data
             long_data.edited_fields.clear()
-            self.filecontent.flush()
+            if flush:
+                self.filecontent.flush()
 
 def pic_str_from_image_batch(ibf, *, img_idx):
     th0 = TiffHandler(ibf, img_idx)
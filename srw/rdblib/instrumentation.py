@@ -0,0 +1,350 @@
+# -*- coding: utf-8 -*-
+"""
+Lightweight metrics: counters, histograms (durations in seconds) and timing
+spans.
+
+Metrics are disabled until a sink is added (then "metrics.enabled" is True).
+When disabled counters and histograms return immediately, spans only measure
+the duration (so callers can still log it).
+
+Sinks can be configured via the "SRW_METRICS" environment variable (see
+"configure_metrics()"), e.g.
+    SRW_METRICS="log,prometheus:/var/lib/node_exporter/srw.prom"
+"""
+
+import functools
+import logging
+import os
+import socket
+import sys
+import tempfile
+import threading
+from timeit import default_timer as timer
+
+from schwarz.log_utils import l_
+
+
+__all__ = [
+    'configure_metrics',
+    'instrumented_main',
+    'metrics',
+    'InMemorySink',
+    'LogSink',
+    'Metrics',
+    'MetricsSink',
+    'PrometheusTextfileSink',
+    'StatsDSink',
+    'METRICS_ENV',
+]
+
+METRICS_ENV = 'SRW_METRICS'
+# upper bounds (seconds) of the histogram buckets
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+
+class Metrics(object):
+    def __init__(self, sinks=()):
+        self.sinks = list(sinks)
+        self.enabled = bool(self.sinks)
+        # currently active spans (per thread) to compute the time spent in
+        # a span itself (excluding nested spans)
+        self._local = threading.local()
+        # "self.sinks" is never modified in place (copy-on-write) so other
+        # threads can iterate over it without locking
+        self._sinks_lock = threading.Lock()
+
+    def add_sink(self, sink):
+        with self._sinks_lock:
+            self.sinks = self.sinks + [sink]
+            self.enabled = True
+        return sink
+
+    def remove_sink(self, sink):
+        with self._sinks_lock:
+            sinks = list(self.sinks)
+            sinks.remove(sink)
+            self.sinks = sinks
+            self.enabled = bool(sinks)
+
+    def incr(self, name, value=1):
+        if not self.enabled:
+            return
+        for sink in self.sinks:
+            sink.counter(name, value)
+
+    def observe(self, name, seconds):
+        if not self.enabled:
+            return
+        for sink in self.sinks:
+            sink.histogram(name, seconds)
+
+    def span(self, name):
+        """Context manager which records the duration of the "with" block
+        (histogram). The duration is available as "span.duration"."""
+        return Span(self, name)
+
+    def timed(self, name):
+        """Decorator which records the duration of each call (histogram)."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with Span(self, name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def flush(self):
+        for sink in self.sinks:
+            sink.flush()
+
+    def _active_spans(self):
+        spans = getattr(self._local, 'spans', None)
+        if spans is None:
+            spans = []
+            self._local.spans = spans
+        return spans
+
+    def _record_span(self, span):
+        self_duration = span.duration - span.child_duration
+        for sink in self.sinks:
+            sink.span(span.name, span.duration, self_duration)
+
+
+class Span(object):
+    __slots__ = ('metrics', 'name', 'start', 'duration', 'child_duration', '_active_spans')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+        self.start = None
+        self.duration = None
+        self.child_duration = 0.0
+        self._active_spans = None
+
+    def __enter__(self):
+        if self.metrics.enabled:
+            self._active_spans = self.metrics._active_spans()
+            self._active_spans.append(self)
+        self.start = timer()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.duration = timer() - self.start
+        active_spans = self._active_spans
+        if active_spans is None:
+            return
+        self._active_spans = None
+        if active_spans and (active_spans[-1] is self):
+            active_spans.pop()
+            if active_spans:
+                active_spans[-1].child_duration += self.duration
+        if self.metrics.enabled:
+            self.metrics._record_span(self)
+
+
+# --- sinks -------------------------------------------------------------------
+class MetricsSink(object):
+    def counter(self, name, value):
+        pass
+
+    def histogram(self, name, seconds):
+        pass
+
+    def span(self, name, seconds, self_seconds):
+        """Called for finished spans, "self_seconds" excludes the time spent
+        in nested spans."""
+        self.histogram(name, seconds)
+
+    def flush(self):
+        pass
+
+
+class LogSink(MetricsSink):
+    def __init__(self, log=None, level=logging.DEBUG):
+        self.log = l_(log)
+        self.level = level
+
+    def counter(self, name, value):
+        self.log.log(self.level, 'metric %s +%s', name, value)
+
+    def histogram(self, name, seconds):
+        self.log.log(self.level, 'metric %s: %.5f seconds', name, seconds)
+
+
+class Histogram(object):
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.min = value if (self.min is None) else min(self.min, value)
+        self.max = value if (self.max is None) else max(self.max, value)
+        for idx, upper_bound in enumerate(self.buckets):
+            if value <= upper_bound:
+                self.bucket_counts[idx] += 1
+                break
+
+
+class InMemorySink(MetricsSink):
+    """Aggregates all counters/histograms in memory (e.g. for tests or to
+    print a summary)."""
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counters = {}
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name, value):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def histogram(self, name, seconds):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = Histogram(self.buckets)
+                self.histograms[name] = histogram
+            histogram.add(seconds)
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+
+class PrometheusTextfileSink(InMemorySink):
+    """
+    Writes all metrics (Prometheus text format) to <path> on ".flush()", e.g.
+    for the node_exporter textfile collector. The file is replaced atomically
+    so the collector never reads a partial file.
+    """
+    def __init__(self, path, *, prefix='srw_', buckets=DEFAULT_BUCKETS):
+        super().__init__(buckets=buckets)
+        self.path = path
+        self.prefix = prefix
+
+    def _metric_name(self, name):
+        return self.prefix + name.replace('.', '_').replace('-', '_')
+
+    def as_text(self):
+        lines = []
+        with self._lock:
+            for name, value in sorted(self.counters.items()):
+                metric_name = self._metric_name(name) + '_total'
+                lines.append('# TYPE %s counter' % metric_name)
+                lines.append('%s %s' % (metric_name, value))
+            for name, histogram in sorted(self.histograms.items()):
+                metric_name = self._metric_name(name) + '_seconds'
+                lines.append('# TYPE %s histogram' % metric_name)
+                cumulative_count = 0
+                for upper_bound, count in zip(histogram.buckets, histogram.bucket_counts):
+                    cumulative_count += count
+                    lines.append('%s_bucket{le="%s"} %d' % (metric_name, upper_bound, cumulative_count))
+                lines.append('%s_bucket{le="+Inf"} %d' % (metric_name, histogram.count))
+                lines.append('%s_sum %.6f' % (metric_name, histogram.total))
+                lines.append('%s_count %d' % (metric_name, histogram.count))
+        return '\n'.join(lines) + '\n'
+
+    def flush(self):
+        target_dir = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=target_dir, prefix='.srw-metrics-')
+        try:
+            with os.fdopen(fd, 'w') as tmp_fp:
+                tmp_fp.write(self.as_text())
+            os.replace(tmp_path, self.path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+
+class StatsDSink(MetricsSink):
+    """Sends each counter/histogram value as StatsD UDP packet. Send errors
+    are ignored (metrics must never break the application)."""
+    def __init__(self, host='127.0.0.1', port=8125, *, prefix='srw.'):
+        self.address = (host, int(port))
+        self.prefix = prefix
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.setblocking(False)
+
+    def counter(self, name, value):
+        self._send('%s%s:%s|c' % (self.prefix, name, value))
+
+    def histogram(self, name, seconds):
+        self._send('%s%s:%.3f|ms' % (self.prefix, name, seconds * 1000))
+
+    def _send(self, data):
+        try:
+            self._socket.sendto(data.encode('ascii'), self.address)
+        except OSError:
+            pass
+
+
+metrics = Metrics()
+
+def configure_metrics(spec, *, log=None, metrics=metrics):
+    """
+    Add the sinks given in <spec> (comma separated):
+        "log", "memory", "prometheus:<path>", "statsd[:<host>[:<port>]]"
+
+    Returns the list of added sinks.
+    """
+    sinks = []
+    for sink_spec in spec.split(','):
+        sink_type, _, options = sink_spec.strip().partition(':')
+        if sink_type == 'log':
+            sink = LogSink(log=log)
+        elif sink_type == 'memory':
+            sink = InMemorySink()
+        elif sink_type == 'prometheus':
+            if not options:
+                raise ValueError('metrics sink "prometheus" requires a path (e.g. "prometheus:/tmp/srw.prom")')
+            sink = PrometheusTextfileSink(options)
+        elif sink_type == 'statsd':
+            sink = StatsDSink(*options.split(':')) if options else StatsDSink()
+        else:
+            raise ValueError('unknown metrics sink "%s"' % sink_type)
+        sinks.append(sink)
+    for sink in sinks:
+        metrics.add_sink(sink)
+    return sinks
+
+
+def instrumented_main(name, *, output_args=()):
+    """
+    Decorator for console scripts: adds the sinks from the "SRW_METRICS"
+    environment variable, records the run time ("cli.<name>") and flushes
+    all sinks when the script is done (also after "sys.exit()").
+
+    Also handles the profiling options "--profile[=cprofile|tracemalloc]" and
+    "--timings" (see "srw.rdblib.profiling"). Profiling data is stored next
+    to the path given in the first of the <output_args> (docopt arguments).
+    """
+    def decorator(main_func):
+        def run_main(argv):
+            spec = os.environ.get(METRICS_ENV)
+            sinks = configure_metrics(spec) if spec else ()
+            try:
+                with metrics.span('cli.' + name):
+                    return main_func(argv)
+            finally:
+                metrics.flush()
+                for sink in sinks:
+                    metrics.remove_sink(sink)
+
+        @functools.wraps(main_func)
+        def wrapper(argv=None):
+            if argv is None:
+                argv = sys.argv
+            if any((arg.startswith('--profile') or (arg == '--timings')) for arg in argv[1:]):
+                # profiling code is only imported when needed
+                from .profiling import profiled_main
+                return profiled_main(name, main_func, run_main, argv, output_args=output_args)
+            return run_main(argv)
+        return wrapper
+    return decorator
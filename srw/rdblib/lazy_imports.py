@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+Lazy attribute loading for packages (PEP 562).
+
+Some parts of rdblib need expensive imports (SQLAlchemy, Pillow, babel)
+while other users (e.g. CDB/IBF-only scripts) only need struct parsing. A
+package can list the names of its expensive submodules and the submodule is
+only imported when one of its names is accessed first.
+"""
+
+import importlib
+import sys
+
+
+__all__ = ['lazy_exports']
+
+def lazy_exports(package_name, exports):
+    """
+    Return "__getattr__" and "__dir__" functions for the package
+    <package_name>. <exports> maps (relative) submodule names to the names
+    exported by that submodule, e.g.
+        {'.batch': ('Batch',)}
+
+    The submodules themselves are also available as package attributes.
+    """
+    module_for_name = {}
+    for module_name, names in exports.items():
+        module_for_name[module_name.lstrip('.')] = module_name
+        for name in names:
+            module_for_name[name] = module_name
+
+    def __getattr__(name):
+        module_name = module_for_name.get(name)
+        if module_name is None:
+            raise AttributeError('module %r has no attribute %r' % (package_name, name))
+        module = importlib.import_module(module_name, package_name)
+        if name == module_name.lstrip('.'):
+            return module
+        value = getattr(module, name)
+        # "__getattr__" is only called for missing attributes so the next
+        # access does not need any lookups.
+        setattr(sys.modules[package_name], name, value)
+        return value
+
+    def __dir__():
+        package = sys.modules[package_name]
+        return sorted(set(vars(package)) | set(module_for_name))
+
+    return __getattr__, __dir__
@@ -9,8 +9,6 @@ from __future__ import division
 
 from decimal import Decimal
 
-from babel import Locale
-from babel.numbers import format_decimal
 try:
     import bitmath
     has_bitmath = True
@@ -36,6 +34,11 @@ def human_readable_size(value):
 # -----------------------------------------------------------------------------
 
 def format_filesize(size, locale='en'):
+    # babel is pretty slow to import and only needed for formatting so
+    # importing the module is cheap (e.g. for "open_cdb()").
+    from babel import Locale
+    from babel.numbers import format_decimal
+
     if has_bitmath and isinstance(size, bitmath.Bitmath):
         size = int(size.to_Byte())
     value, unit = human_readable_size(size)
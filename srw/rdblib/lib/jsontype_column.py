@@ -2,6 +2,8 @@
 #
 # v1.1 / 2016-09-01 (fs)
 #   - MutableDict should inherit from AttrDict
+# v1.2
+#   - use orjson (if available), enable SQLAlchemy statement caching
 
 from .attribute_dict import AttrDict
 
@@ -15,20 +17,34 @@ __all__ = ['JSONType']
 import json
 from sqlalchemy.ext.mutable import Mutable
 from sqlalchemy.types import Text, TypeDecorator
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    # orjson returns bytes and rejects non-string keys by default (the stdlib
+    # converts these to strings)
+    json_dumps = lambda value: orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    json_loads = orjson.loads
+else:
+    json_dumps = json.dumps
+    json_loads = json.loads
 
 class JSONEncodedDict(TypeDecorator):
     "Represents an immutable structure as a json-encoded string."
 
     impl = Text
+    cache_ok = True
 
     def process_bind_param(self, value, dialect):
         if value is not None:
-            value = json.dumps(value)
+            value = json_dumps(value)
         return value
 
     def process_result_value(self, value, dialect):
         if value is not None:
-            value = json.loads(value)
+            value = json_loads(value)
         return value
 
 
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+
+from pythonic_testcase import *
+from sqlalchemy import Column, Integer, MetaData, Table
+from sqlalchemy.engine import create_engine
+from sqlalchemy.sql import select
+
+from ..jsontype_column import JSONType
+
+
+class JSONTypeTest(PythonicTestCase):
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:')
+        self.metadata = MetaData()
+        self.table = Table('json_data', self.metadata,
+            Column('id', Integer(), primary_key=True, autoincrement=True),
+            Column('data', JSONType)
+        )
+        self.metadata.create_all(self.engine)
+        self.db = self.engine.connect()
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+
+    def test_can_store_and_load_dict(self):
+        data = {'foo': 'bär', 'nested': {'items': [1, 2.5, None, True]}, 1: 'int key'}
+        insertion = self.db.execute(self.table.insert().values(data=data))
+        item_id = insertion.inserted_primary_key[0]
+
+        result = self.db.execute(select(self.table.c.data).where(self.table.c.id == item_id)).scalar()
+        expected = {'foo': 'bär', 'nested': {'items': [1, 2.5, None, True]}, '1': 'int key'}
+        assert_equals(expected, result)
+
+    def test_can_store_none(self):
+        insertion = self.db.execute(self.table.insert().values(data=None))
+        item_id = insertion.inserted_primary_key[0]
+        result = self.db.execute(select(self.table.c.data).where(self.table.c.id == item_id)).scalar()
+        assert_none(result)
@@ -3,8 +3,6 @@
 # The source code in this file is is dual licensed under the MIT license or
 # the GPLv3 or (at your option) any later version.
 
-from datetime import datetime
-
 from babel.dates import UTC
 from sqlalchemy.types import DateTime, TypeDecorator
 
@@ -19,9 +17,12 @@ __all__ = ['UTCDateTime']
 
 class UTCDateTime(TypeDecorator):
     impl = DateTime
+    # "strip_tz" is part of the cache key (constructor argument) so SQLAlchemy
+    # can cache compiled statements using this type.
+    cache_ok = True
 
-    def __init__(self, *args, **kwargs):
-        self._strip_tz = kwargs.pop('strip_tz', True)
+    def __init__(self, *args, strip_tz=True, **kwargs):
+        self.strip_tz = strip_tz
         super(UTCDateTime, self).__init__(*args, **kwargs)
 
     def process_bind_param(self, value, dialect):
@@ -30,8 +31,8 @@ class UTCDateTime(TypeDecorator):
                 # since Python 3.6 ".astimetzone()" also works on naive datetime
                 # instances so we have to check this separately.
                 raise ValueError('naive datetime instance passed: %r' % value)
-            utc_dt = value.astimezone(UTC)
-            if not self._strip_tz:
+            utc_dt = value if (value.tzinfo is UTC) else value.astimezone(UTC)
+            if not self.strip_tz:
                 return utc_dt
             return utc_dt.replace(tzinfo=None)
         return None
@@ -39,8 +40,6 @@ class UTCDateTime(TypeDecorator):
     def process_result_value(self, value, dialect):
         if value is None:
             return None
-        return datetime(value.year, value.month, value.day,
-                        value.hour, value.minute, value.second,
-                        value.microsecond, tzinfo=UTC)
+        return value.replace(tzinfo=UTC)
 # -----------------------------------------------------------------------------
 
@@ -3,10 +3,14 @@ from __future__ import division, absolute_import, print_function, unicode_litera
 
 import os
 import platform
+import struct
+import time
 
 from schwarz.log_utils import l_
 import six
 
+from .instrumentation import metrics
+
 
 is_windows = (platform.system() == 'Windows')
 
@@ -18,13 +22,26 @@ if not six.PY3:
     from io import BlockingIOError
     PermissionError = IOError
 
+# Byte-range locks are "open file description" locks (Linux): Contrary to
+# POSIX record locks ("lockf()") these belong to the open file (not to the
+# process) so closing some other file descriptor for the same file (e.g.
+# "create_backup()") does not release them.
+F_OFD_SETLK = None if is_windows else getattr(fcntl, 'F_OFD_SETLK', None)
+has_range_locks = (F_OFD_SETLK is not None)
+
+
+__all__ = ['acquire_lock', 'acquire_lock_async', 'acquire_range_lock', 'has_range_locks',
+    'unlock', 'unlock_range']
 
-__all__ = ['acquire_lock', 'unlock']
+# seconds
+DEFAULT_BACKOFF = 0.005
+DEFAULT_MAX_BACKOFF = 0.25
 
 # -----------------------------------------------------------------------------
 # initial locking code copied from Durus (durus/file.py) but with custom
 # modifications
-def acquire_lock(file_, exclusive_lock=True, raise_on_error=True, log=None):
+def acquire_lock(file_, exclusive_lock=True, raise_on_error=True, log=None,
+                 *, timeout=None, backoff=DEFAULT_BACKOFF, max_backoff=DEFAULT_MAX_BACKOFF):
     """Lock the given file-like object to prevent other processes from
     accessing is.
 
@@ -38,10 +55,88 @@ def acquire_lock(file_, exclusive_lock=True, raise_on_error=True, log=None):
       log [default None]
           logger instance used for optional log messages (if None nothing will
           be logging)
+      timeout [default: None]
+          retry for up to <timeout> seconds if the file is locked by another
+          process (if None: fail immediately)
+      backoff, max_backoff [default: 0.005, 0.25]
+          initial/maximum delay (seconds) between retries, the delay is doubled
+          after each try
     """
     log = l_(log)
     log_type = 'exclusive ' if exclusive_lock else ''
     log.debug('acquire %slock for "%s" [PID %d]', log_type, file_.name, os.getpid())
+    waiter = _LockWaiter(file_, timeout, backoff, max_backoff)
+    while True:
+        error = _try_lock(file_, exclusive_lock)
+        delay = waiter.next_delay(error)
+        if delay is None:
+            break
+        time.sleep(delay)
+    return waiter.result(error, raise_on_error=raise_on_error, log=log)
+
+async def acquire_lock_async(file_, exclusive_lock=True, raise_on_error=True, log=None,
+                             *, timeout=None, backoff=DEFAULT_BACKOFF, max_backoff=DEFAULT_MAX_BACKOFF):
+    """Like "acquire_lock()" but wait with "asyncio.sleep()" between retries
+    so the event loop is not blocked (the lock is never requested in blocking
+    mode)."""
+    import asyncio
+    log = l_(log)
+    log_type = 'exclusive ' if exclusive_lock else ''
+    log.debug('acquire %slock for "%s" [PID %d]', log_type, file_.name, os.getpid())
+    waiter = _LockWaiter(file_, timeout, backoff, max_backoff)
+    while True:
+        error = _try_lock(file_, exclusive_lock)
+        delay = waiter.next_delay(error)
+        if delay is None:
+            break
+        await asyncio.sleep(delay)
+    return waiter.result(error, raise_on_error=raise_on_error, log=log)
+
+
+class _LockWaiter(object):
+    """Retry bookkeeping (bounded exponential backoff) and metrics for
+    "acquire_lock()"/"acquire_lock_async()"."""
+    def __init__(self, file_, timeout, backoff, max_backoff):
+        self.file_ = file_
+        self.start = time.monotonic()
+        self.deadline = self.start + (timeout or 0)
+        self.delay = backoff
+        self.max_backoff = max_backoff
+        self.tries = 0
+
+    def next_delay(self, error):
+        """Return the number of seconds to wait before the next try (None if
+        the lock was acquired or the timeout expired)."""
+        self.tries += 1
+        if error is None:
+            return None
+        remaining = self.deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        delay = min(self.delay, self.max_backoff, remaining)
+        self.delay = min(self.delay * 2, self.max_backoff)
+        return delay
+
+    def result(self, error, *, raise_on_error, log):
+        wait_time = time.monotonic() - self.start
+        if self.tries > 1:
+            metrics.incr('locking.contended')
+            metrics.observe('locking.wait', wait_time)
+        if error is None:
+            if self.tries > 1:
+                log.debug('acquired lock for "%s" after %.3f seconds (%d tries) [PID %d]',
+                    self.file_.name, wait_time, self.tries, os.getpid())
+            return True
+        metrics.incr('locking.failed')
+        log.warn('error while trying to lock "%s": %r [PID %d]', self.file_.name, error, os.getpid())
+        if raise_on_error:
+            raise error
+        return False
+
+
+def _try_lock(file_, exclusive_lock):
+    """Try to lock <file_> without blocking, return the exception if the
+    file could not be locked (None otherwise)."""
     if is_windows:
         fd = win32file._get_osfhandle(file_.fileno())
         if exclusive_lock:
@@ -51,10 +146,7 @@ def acquire_lock(file_, exclusive_lock=True, raise_on_error=True, log=None):
         try:
             win32file.LockFileEx(fd, lock_flags, 0, -65536, pywintypes.OVERLAPPED())
         except pywintypes.error as e:
-            log.warn('error while trying to lock "%s": %r [PID %d]', file_.name, e, os.getpid())
-            if raise_on_error:
-                raise OSError(e)
-            return False
+            return OSError(e)
     else:
         if exclusive_lock:
             lock_flags = (fcntl.LOCK_EX | fcntl.LOCK_NB)
@@ -63,11 +155,8 @@ def acquire_lock(file_, exclusive_lock=True, raise_on_error=True, log=None):
         try:
             fcntl.flock(file_, lock_flags)
         except (BlockingIOError, PermissionError) as e:
-            log.warn('error while trying to lock "%s": %r [PID %d]', file_.name, e, os.getpid())
-            if raise_on_error:
-                raise
-            return False
-    return True
+            return e
+    return None
 
 def unlock(file_, log=None):
     log = l_(log)
@@ -79,3 +168,49 @@ def unlock(file_, log=None):
         fcntl.flock(file_, fcntl.LOCK_UN)
 # -----------------------------------------------------------------------------
 
+
+
+def acquire_range_lock(file_, offset, length, exclusive_lock=True, raise_on_error=True, log=None,
+                       *, timeout=None, backoff=DEFAULT_BACKOFF, max_backoff=DEFAULT_MAX_BACKOFF):
+    """Lock <length> bytes of the given file-like object (starting at
+    <offset>) via an "open file description" lock ("F_OFD_SETLK"), see
+    "acquire_lock()" for the other parameters. An exclusive lock requires a
+    file opened for writing.
+
+    The lock belongs to the open file (shared with "dup()"-ed descriptors,
+    e.g. by "mmap"): It conflicts with locks taken via other open files, also
+    in the same process, and is released when the last descriptor of that
+    open file is closed. Byte-range locks and "flock()" locks are independent
+    of each other.
+    """
+    if not has_range_locks:
+        # Windows: "LockFileEx()" locks are mandatory so writing via the mmap
+        # would fail for ranges locked by other handles.
+        raise NotImplementedError('byte-range locks are not supported on this platform')
+    log = l_(log)
+    log_type = 'exclusive ' if exclusive_lock else ''
+    log.debug('acquire %slock for "%s" (bytes %d-%d) [PID %d]',
+        log_type, file_.name, offset, offset + length, os.getpid())
+    lock_type = fcntl.F_WRLCK if exclusive_lock else fcntl.F_RDLCK
+    waiter = _LockWaiter(file_, timeout, backoff, max_backoff)
+    while True:
+        try:
+            _set_range_lock(file_, lock_type, offset, length)
+            error = None
+        except (BlockingIOError, PermissionError) as e:
+            error = e
+        delay = waiter.next_delay(error)
+        if delay is None:
+            break
+        time.sleep(delay)
+    return waiter.result(error, raise_on_error=raise_on_error, log=log)
+
+def unlock_range(file_, offset, length, log=None):
+    log = l_(log)
+    log.debug('unlocking "%s" (bytes %d-%d) [PID %d]', file_.name, offset, offset + length, os.getpid())
+    _set_range_lock(file_, fcntl.F_UNLCK, offset, length)
+
+def _set_range_lock(file_, lock_type, offset, length):
+    # struct flock: l_type, l_whence, l_start, l_len, l_pid (must be 0)
+    flock_data = struct.pack('hhqqi', lock_type, os.SEEK_SET, offset, length, 0)
+    fcntl.fcntl(file_, F_OFD_SETLK, flock_data)
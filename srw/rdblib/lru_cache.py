@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+from collections import OrderedDict
+
+
+__all__ = ['LRUCache']
+
+class LRUCache(object):
+    """
+    Simple dict-like cache which keeps at most <maxsize> items (the least
+    recently used items are evicted first). "maxsize=None" means the cache is
+    unbounded, "maxsize=0" disables caching completely.
+
+    The cache counts hits/misses so callers can check if the configured size
+    fits their access patterns. "on_evict(key, value)" is called for each
+    evicted item (e.g. to release resources).
+    """
+    def __init__(self, maxsize=128, *, on_evict=None):
+        self.maxsize = maxsize
+        self.on_evict = on_evict
+        self._items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        if key not in self._items:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self._items.move_to_end(key)
+        return self._items[key]
+
+    def put(self, key, value):
+        if self.maxsize == 0:
+            return
+        self._items[key] = value
+        self._items.move_to_end(key)
+        if self.maxsize is None:
+            return
+        while len(self._items) > self.maxsize:
+            evicted_key, evicted_value = self._items.popitem(last=False)
+            self.evictions += 1
+            if self.on_evict is not None:
+                self.on_evict(evicted_key, evicted_value)
+
+    def pop(self, key, default=None):
+        return self._items.pop(key, default)
+
+    def clear(self):
+        self._items.clear()
+
+    def keys(self):
+        return tuple(self._items.keys())
+
+    def values(self):
+        return tuple(self._items.values())
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._items),
+            'maxsize': self.maxsize,
+        }
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __len__(self):
+        return len(self._items)
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+
+import os
+import threading
+
+from schwarz.log_utils import l_
+
+from .instrumentation import metrics
+from .mmap_file import MMapFile
+
+
+__all__ = ['mapping_pool', 'MappingPool', 'SharedMapping']
+
+class MappingPool(object):
+    """
+    Shares read-only mappings of the same file (same path, inode, mtime and
+    size) within a process, e.g. for a threaded web server which opens the
+    same IBF concurrently.
+
+    ".open()" returns a SharedMapping (reference counted view). The
+    underlying MMapFile (including the file descriptor and the shared lock)
+    is closed when the last view is closed. If the file was replaced or
+    modified, new views use a new mapping.
+    """
+    def __init__(self):
+        self._mappings = {}
+        self._lock = threading.Lock()
+
+    def open(self, filename, *, log=None, access_pattern=None):
+        path = os.path.abspath(filename)
+        key = _file_key(path, os.stat(path))
+        with self._lock:
+            entry = self._mappings.get(key)
+            if entry is None:
+                metrics.incr('mapping_pool.misses')
+                mmap_file = MMapFile(path, access='read', log=log, access_pattern=access_pattern)
+                # the file might have changed after "os.stat()"
+                key = _file_key(path, os.fstat(mmap_file._file.fileno()))
+                entry = self._mappings.setdefault(key, _PoolEntry(mmap_file))
+                if entry.mmap_file is not mmap_file:
+                    mmap_file.close()
+            else:
+                metrics.incr('mapping_pool.hits')
+            entry.users += 1
+        l_(log).debug('shared mapping for %s (%d users)', path, entry.users)
+        return SharedMapping(self, key, entry.mmap_file)
+
+    def _release(self, key):
+        with self._lock:
+            entry = self._mappings[key]
+            entry.users -= 1
+            if entry.users > 0:
+                return
+            del self._mappings[key]
+        entry.mmap_file.close()
+
+    def __len__(self):
+        return len(self._mappings)
+
+
+class _PoolEntry(object):
+    __slots__ = ('mmap_file', 'users')
+
+    def __init__(self, mmap_file):
+        self.mmap_file = mmap_file
+        self.users = 0
+
+
+class SharedMapping(object):
+    """Read-only view of a pooled MMapFile which can be used instead of an
+    MMapFile (e.g. for "ImageBatch"/"FormBatch")."""
+    def __init__(self, pool, key, mmap_file):
+        self._pool = pool
+        self._key = key
+        self._mmap_file = mmap_file
+        self._closed = False
+
+    @property
+    def mapping(self):
+        if self._closed:
+            raise ValueError('mapping of %s already closed' % self.name)
+        return self._mmap_file
+
+    def flush(self):
+        # read-only so there is nothing to flush
+        pass
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._pool._release(self._key)
+
+    @property
+    def closed(self):
+        return self._closed
+
+    @property
+    def name(self):
+        return self._mmap_file.name
+
+
+def _file_key(path, stat_result):
+    return (path, stat_result.st_dev, stat_result.st_ino, stat_result.st_mtime_ns, stat_result.st_size)
+
+
+mapping_pool = MappingPool()
@@ -5,17 +5,24 @@ import io
 import mmap
 import os
 import sys
-from timeit import default_timer as timer
-
 from schwarz.log_utils import l_
 
-from .locking import acquire_lock
+from .instrumentation import metrics
+from .locking import acquire_lock, acquire_range_lock, has_range_locks, unlock_range
 
 
 __all__ = ['MMapFile']
 
 FORCE_LOAD = False  # set to True to effectively disable mmap
 
+# access pattern -> (madvise flag, posix_fadvise flag), flags which are not
+# available on the current platform are ignored.
+ACCESS_PATTERNS = {
+    'sequential': ('MADV_SEQUENTIAL', 'POSIX_FADV_SEQUENTIAL'),
+    'random':     ('MADV_RANDOM',     'POSIX_FADV_RANDOM'),
+    'willneed':   ('MADV_WILLNEED',   'POSIX_FADV_WILLNEED'),
+}
+
 class MMapFile(mmap.mmap):
     """
     memory-like file, based on mmap.
@@ -24,7 +31,8 @@ class MMapFile(mmap.mmap):
     """
 
     #----------------------------------------------------------------------
-    def __new__(cls, filename, access, log=None):
+    def __new__(cls, filename, access, log=None, *, access_pattern=None, fadvise=False,
+                lock_timeout=None, byte_range_locks=False):
         """
         Simplified constructor
         ----------------------
@@ -38,49 +46,68 @@ class MMapFile(mmap.mmap):
 
         "copy" means copy_on_write: Data is written to memory, only.
 
+        access_pattern ("sequential", "random" or "willneed") is passed to
+        the kernel as a hint for readahead ("madvise()", with "fadvise=True"
+        also "posix_fadvise()" for the file's page cache).
+
+        lock_timeout: retry for up to <lock_timeout> seconds if the file is
+        locked by another process (see "acquire_lock()").
+
+        byte_range_locks: (only for "write" access) take a shared lock on the
+        whole file so other processes can open the file with
+        "byte_range_locks" as well. Writers must lock the modified parts of
+        the file via ".lock_range()" (Linux only, ValueError otherwise).
         """
+        if (access_pattern is not None) and (access_pattern not in ACCESS_PATTERNS):
+            raise ValueError('unknown access pattern %r' % access_pattern)
         access = access.upper()
         if access != 'DONTCARE':
             access_mode = getattr(mmap, 'ACCESS_' + access)
         else:
             access_mode = mmap.ACCESS_WRITE
+        if byte_range_locks and (access_mode != mmap.ACCESS_WRITE):
+            raise ValueError('byte-range locks require write access')
+        if byte_range_locks and not has_range_locks:
+            raise ValueError('byte-range locks are not supported on this platform')
         if access_mode == mmap.ACCESS_READ:
             aflags = 'rb'
         else:
             aflags = 'r+b'
         log = l_(log)
 
-        start = timer()
-
-        # Locking requires file descriptors/handles. mmap.mmap creates an
-        # internal file descriptor which we can not access. Therefore we have
-        # to save a reference to the underlying file ourself.
-        f = io.open(filename, aflags)
-        if access != 'DONTCARE':
-            try:
-                acquire_lock(f, exclusive_lock=(access_mode == mmap.ACCESS_WRITE), log=log)
-            except:
-                # On Windows we can not move/rename open files so leaving the
-                # file open would mean we might trigger other exceptions later
-                # on.
-                f.close()
-                raise
-        self = super(MMapFile, cls).__new__(cls, f.fileno(), 0, access=access_mode)
-        self._file = f
-        self._name = filename
-        self._closed = False
-        self._access = access_mode
-
-        duration = timer() - start
-        log.debug('opened file %s in %.5f seconds', filename, duration)
+        with metrics.span('mmap_file.open') as open_span:
+            # Locking requires file descriptors/handles. mmap.mmap creates an
+            # internal file descriptor which we can not access. Therefore we have
+            # to save a reference to the underlying file ourself.
+            f = io.open(filename, aflags)
+            if access != 'DONTCARE':
+                try:
+                    with metrics.span('mmap_file.lock'):
+                        exclusive_lock = (access_mode == mmap.ACCESS_WRITE) and not byte_range_locks
+                        acquire_lock(f, exclusive_lock=exclusive_lock, log=log, timeout=lock_timeout)
+                except:
+                    # On Windows we can not move/rename open files so leaving the
+                    # file open would mean we might trigger other exceptions later
+                    # on.
+                    f.close()
+                    raise
+            self = super(MMapFile, cls).__new__(cls, f.fileno(), 0, access=access_mode)
+            self._file = f
+            self._name = filename
+            self._closed = False
+            self._access = access_mode
+            self._byte_range_locks = byte_range_locks
+            self._log = log
+        log.debug('opened file %s in %.5f seconds', filename, open_span.duration)
+        if access_pattern is not None:
+            self._advise(access_pattern, fadvise=fadvise, log=log)
 
         if FORCE_LOAD:
-            start = timer()
-            # just to check the effect of mmap
-            self[:]
-            duration = timer() - start
+            with metrics.span('mmap_file.force_load') as load_span:
+                # just to check the effect of mmap
+                self[:]
             basename = os.path.basename(filename)
-            log.debug('force loading of %s tool %.5f seconds', basename, duration)
+            log.debug('force loading of %s tool %.5f seconds', basename, load_span.duration)
         return self
 
     if sys.platform == 'win32':
@@ -99,6 +126,35 @@ class MMapFile(mmap.mmap):
                 raise WindowsError('something went wrong in flush().')
             return ret
 
+    def _advise(self, access_pattern, *, fadvise, log):
+        madvise_name, fadvise_name = ACCESS_PATTERNS[access_pattern]
+        # hints only: errors (e.g. unsupported flags) must not prevent
+        # opening the file
+        madvise_flag = getattr(mmap, madvise_name, None)
+        if madvise_flag is not None:
+            try:
+                super(MMapFile, self).madvise(madvise_flag)
+            except OSError as e:
+                log.debug('madvise(%s) failed for %s: %s', madvise_name, self._name, e)
+        fadvise_flag = getattr(os, fadvise_name, None)
+        if fadvise and (fadvise_flag is not None):
+            try:
+                os.posix_fadvise(self._file.fileno(), 0, 0, fadvise_flag)
+            except OSError as e:
+                log.debug('posix_fadvise(%s) failed for %s: %s', fadvise_name, self._name, e)
+
+    def lock_range(self, offset, length, *, timeout=None):
+        """Exclusively lock <length> bytes starting at <offset> (see
+        "acquire_range_lock()"), raises an OSError if the range is locked by
+        another process."""
+        if not self._byte_range_locks:
+            raise ValueError('file %s was not opened with byte_range_locks' % self._name)
+        with metrics.span('mmap_file.lock_range'):
+            acquire_range_lock(self._file, offset, length, log=self._log, timeout=timeout)
+
+    def unlock_range(self, offset, length):
+        unlock_range(self._file, offset, length, log=self._log)
+
     def close(self):
         super(MMapFile, self).close()
         # Closing the file will also release the lock implicitely...
@@ -114,8 +170,13 @@ class MMapFile(mmap.mmap):
     def name(self):
         return self._name
 
+    @property
+    def byte_range_locks(self):
+        return self._byte_range_locks
+
     def __getattribute__(self, name):
-        if name in ('flush', 'close', 'closed', 'name') or name.startswith('_'):
+        public_names = ('flush', 'close', 'closed', 'name', 'byte_range_locks', 'lock_range', 'unlock_range')
+        if name in public_names or name.startswith('_'):
             return super(MMapFile, self).__getattribute__(name)
         raise AttributeError("type object '{}' has no attribute '{}'"
                              .format(self.__class__.__name__, name))
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+Profiling support for the console scripts (see "instrumented_main()"):
+
+    --profile[=cprofile|tracemalloc]
+        store profiling data (".pstats" or tracemalloc snapshot) next to the
+        output and print the top entries to stderr
+    --timings
+        print the time spent in each phase (open, lock, parse, work, flush)
+        to stderr
+"""
+
+import cProfile
+from datetime import datetime as DateTime
+import os
+import pstats
+import sys
+import tracemalloc
+
+from docopt import docopt, DocoptExit
+
+from .instrumentation import metrics, MetricsSink
+from .lib.filesize import format_filesize
+
+
+__all__ = [
+    'pop_profiling_options',
+    'profile_call',
+    'profiled_main',
+    'PhaseTimingsSink',
+    'PHASES',
+    'PROFILE_MODES',
+]
+
+PROFILE_MODES = ('cprofile', 'tracemalloc')
+# number of entries in the summary printed to stderr
+TOP_N = 20
+TRACEMALLOC_FRAMES = 25
+# phase -> span names (time in nested spans is not counted twice), the time
+# not spent in any of these spans is "work"
+PHASES = (
+    ('open',  ('mmap_file.open', 'sqlite.open', 'sqlite.load_in_memory')),
+    ('lock',  ('mmap_file.lock',)),
+    ('parse', ('cdb.open_cdb', 'cdb.load_forms', 'ibf.load_header', 'ibf.load_directories')),
+    ('flush', ('cdb.commit', 'cdb.flush', 'ibf.flush', 'sqlite.commit', 'sqlite.snapshot')),
+)
+
+
+def pop_profiling_options(argv):
+    """
+    Return (argv, profile_mode, timings) with all profiling options removed
+    from argv. Raises ValueError for unknown profile modes.
+    """
+    remaining_args = []
+    profile_mode = None
+    timings = False
+    args = iter(argv)
+    for arg in args:
+        if arg == '--':
+            remaining_args.append(arg)
+            remaining_args.extend(args)
+        elif arg == '--profile':
+            profile_mode = 'cprofile'
+        elif arg.startswith('--profile='):
+            profile_mode = arg.split('=', 1)[1]
+            if profile_mode not in PROFILE_MODES:
+                raise ValueError('unknown profile mode "%s" (possible values: %s)' % (profile_mode, ', '.join(PROFILE_MODES)))
+        elif arg == '--timings':
+            timings = True
+        else:
+            remaining_args.append(arg)
+    return remaining_args, profile_mode, timings
+
+
+class PhaseTimingsSink(MetricsSink):
+    """Collects the time spent in each span (excluding nested spans) to
+    print a phase breakdown."""
+    def __init__(self, phases=PHASES):
+        self.phase_for_span = {}
+        for phase, span_names in phases:
+            for span_name in span_names:
+                self.phase_for_span[span_name] = phase
+        self.phases = [phase for phase, _ in phases]
+        self.phase_seconds = dict.fromkeys(self.phases + ['work'], 0.0)
+        self.total = 0.0
+
+    def span(self, name, seconds, self_seconds):
+        phase = self.phase_for_span.get(name, 'work')
+        self.phase_seconds[phase] += self_seconds
+        if name.startswith('cli.'):
+            self.total += seconds
+
+    def format_report(self):
+        total = self.total or sum(self.phase_seconds.values())
+        lines = ['Laufzeit nach Phasen:']
+        for phase in self.phases + ['work']:
+            seconds = self.phase_seconds[phase]
+            percentage = (100 * seconds / total) if total else 0
+            lines.append('    %-6s %9.4f s  %5.1f %%' % (phase, seconds, percentage))
+        lines.append('    %-6s %9.4f s' % ('gesamt', total))
+        return '\n'.join(lines) + '\n'
+
+
+def profile_call(func, mode, *, profile_path, stream=None, top_n=TOP_N):
+    """
+    Call <func> with the given profiler ("cprofile" or "tracemalloc"), store
+    the profiling data in <profile_path> and write a summary (top N entries)
+    to <stream> (default: stderr).
+    """
+    stream = stream if (stream is not None) else sys.stderr
+    if mode == 'cprofile':
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(func)
+        finally:
+            profiler.dump_stats(profile_path)
+            stats = pstats.Stats(profiler, stream=stream)
+            stats.sort_stats('cumulative').print_stats(top_n)
+            stream.write('Profiling-Daten gespeichert: %s\n' % profile_path)
+    elif mode == 'tracemalloc':
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        try:
+            return func()
+        finally:
+            snapshot = tracemalloc.take_snapshot()
+            current_size, peak_size = tracemalloc.get_traced_memory()
+            if not was_tracing:
+                tracemalloc.stop()
+            snapshot = snapshot.filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+                tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+            ))
+            snapshot.dump(profile_path)
+            stream.write('Speicherverbrauch: %s (Maximum: %s)\n' % (format_filesize(current_size), format_filesize(peak_size)))
+            for statistic in snapshot.statistics('lineno')[:top_n]:
+                stream.write('%s\n' % statistic)
+            stream.write('Speicher-Snapshot gespeichert: %s\n' % profile_path)
+    else:
+        raise ValueError('unknown profile mode "%s"' % mode)
+
+
+def profiled_main(name, main_func, run_main, argv, *, output_args=()):
+    """Run <run_main> with the profiling options in <argv> (see
+    "instrumented_main()")."""
+    try:
+        argv, profile_mode, timings = pop_profiling_options(argv)
+    except ValueError as e:
+        sys.stderr.write('%s\n' % e)
+        sys.exit(2)
+
+    timings_sink = metrics.add_sink(PhaseTimingsSink()) if timings else None
+    try:
+        if profile_mode is None:
+            return run_main(argv)
+        extension = 'pstats' if (profile_mode == 'cprofile') else 'tracemalloc'
+        output_dir = guess_output_dir(main_func, argv, output_args)
+        timestamp = DateTime.now().strftime('%Y%m%d-%H%M%S')
+        profile_path = os.path.join(output_dir, '%s-%s.%s' % (name, timestamp, extension))
+        return profile_call(lambda: run_main(argv), profile_mode, profile_path=profile_path)
+    finally:
+        if timings_sink is not None:
+            metrics.remove_sink(timings_sink)
+            sys.stderr.write(timings_sink.format_report())
+
+
+def guess_output_dir(main_func, argv, output_args):
+    """Return the directory of the first given path in <output_args> (docopt
+    arguments of <main_func>'s module) or the current working directory."""
+    doc = getattr(sys.modules.get(main_func.__module__), '__doc__', None)
+    if doc and output_args:
+        try:
+            arguments = docopt(doc, argv=argv[1:], help=False)
+        except DocoptExit:
+            arguments = {}
+        for arg_name in output_args:
+            path = arguments.get(arg_name)
+            if not path:
+                continue
+            path = os.path.abspath(path)
+            output_dir = path if os.path.isdir(path) else os.path.dirname(path)
+            if os.path.isdir(output_dir):
+                return output_dir
+    return os.getcwd()
+
@@ -2,5 +2,7 @@
 from . import model as db_schema
 from .dbform import *
 from .db_utils import *
+from .engine_registry import *
 from .model import *
 from .sqlite_db import *
+from .statement_cache import *
@@ -12,14 +12,19 @@ hides all implementation details (as much as possible/sensible).
 
 from __future__ import division, absolute_import, print_function, unicode_literals
 
+from collections import defaultdict
+
 from sqlalchemy import and_
+from sqlalchemy.orm import defer
 
 from ..lib import merge_dicts
 from .db_utils import DELETE
+from .model import TASK_DETAIL_COLUMNS
+from .statement_cache import cached_select, null_attrs
 from ..task import TaskStatus
 
 
-__all__ = ['get_or_add', 'DBForm']
+__all__ = ['get_or_add', 'DBForm', 'FormDataCache']
 
 def get_or_add(orm_class, session, primary_keys, other_values=None):
     conditions = []
@@ -36,25 +41,83 @@ def get_or_add(orm_class, session, primary_keys, other_values=None):
     return db_item
 
 
+class FormDataCache(object):
+    """
+    Per-form dictionaries of all tasks, ignored warnings and form settings of
+    a batch DB (loaded with three queries, see "Batch.preload_db()").
+
+    DBForm instances using this cache do not query the DB for reading and
+    update the cache when adding tasks/warnings/settings. Changes which
+    bypass the DBForm API (e.g. "session.delete(task)") are not reflected so
+    the cache must be reloaded in that case. "SQLiteDB" drops the cache after
+    a rollback, reloads it after bulk inserts and does not expire the cached
+    instances on commit.
+    """
+    def __init__(self, tasks, ignored_warnings, settings):
+        self.tasks = tasks
+        self.ignored_warnings = ignored_warnings
+        self.settings = settings
+
+    @classmethod
+    def load(cls, session, model):
+        Task = model.Task
+        IgnoredWarning = model.IgnoredWarning
+        FormData = model.FormData
+
+        tasks = defaultdict(list)
+        task_query = session.query(Task).options(*[defer(getattr(Task, name)) for name in TASK_DETAIL_COLUMNS])
+        for task in task_query.order_by(Task.id):
+            tasks[task.form_index].append(task)
+        ignored_warnings = defaultdict(list)
+        for warning in session.query(IgnoredWarning).order_by(IgnoredWarning.id):
+            ignored_warnings[warning.form_index].append(warning)
+        settings = defaultdict(dict)
+        for setting in session.query(FormData):
+            settings[setting.form_index][setting.key] = setting
+        return FormDataCache(tasks, ignored_warnings, settings)
+
+    def instances(self):
+        for form_tasks in self.tasks.values():
+            yield from form_tasks
+        for form_warnings in self.ignored_warnings.values():
+            yield from form_warnings
+        for form_settings in self.settings.values():
+            yield from form_settings.values()
+
+
 class DBForm(object):
-    def __init__(self, session, form_index, model):
+    def __init__(self, session, form_index, model, *, db=None):
         self.session = session
         self.form_index = form_index
         self.model = model
+        # "SQLiteDB" providing the preloaded form data (if any)
+        self.db = db
+
+    @property
+    def cache(self):
+        # The DB drops/reloads its cache (e.g. after a rollback) so the
+        # current cache is used for each lookup.
+        return self.db.form_cache if (self.db is not None) else None
 
     def query_tasks(self):
         Task = self.model.Task
         return self.session.query(Task).filter(Task.form_index == self.form_index)
 
-    def tasks(self, **kw_conditions):
+    def tasks(self, *, with_details=False, **kw_conditions):
+        # see "Batch.tasks()" for "with_details"
+        if self.cache is not None:
+            return tuple(self._filter(self.cache.tasks[self.form_index], kw_conditions))
         Task = self.model.Task
-        conditions = []
-        for attr_name, filter_value in kw_conditions.items():
-            c = (getattr(Task, attr_name) == filter_value)
-            conditions.append(c)
-        if not conditions:
-            return tuple(self.query_tasks())
-        return tuple(self.query_tasks().filter(and_(*conditions)))
+        params = dict(kw_conditions, form_index=self.form_index)
+        deferred = () if with_details else TASK_DETAIL_COLUMNS
+        statement = cached_select(Task, tuple(sorted(params)), deferred=deferred, null_attrs=null_attrs(params))
+        return tuple(self.session.execute(statement, params).scalars())
+
+    def _filter(self, items, kw_conditions):
+        conditions = tuple(kw_conditions.items())
+        for item in items:
+            if all((getattr(item, attr_name) == value) for (attr_name, value) in conditions):
+                yield item
 
     def new_tasks(self, type_=None, **kwargs):
         params = merge_dicts({'status': TaskStatus.NEW, 'type_': type_}, kwargs)
@@ -64,6 +127,8 @@ class DBForm(object):
         Task = self.model.Task
         task = Task(form_index=self.form_index, **kwargs)
         self.session.add(task)
+        if self.cache is not None:
+            self.cache.tasks[self.form_index].append(task)
         return task
 
     def query_ignored_warnings(self):
@@ -71,7 +136,10 @@ class DBForm(object):
         return self.session.query(IgnoredWarning).filter(IgnoredWarning.form_index == self.form_index)
 
     def ignored_warnings(self, as_ignore_key=False):
-        warnings_ = tuple(self.query_ignored_warnings())
+        if self.cache is not None:
+            warnings_ = tuple(self.cache.ignored_warnings[self.form_index])
+        else:
+            warnings_ = tuple(self.query_ignored_warnings())
         if not as_ignore_key:
             return warnings_
         to_ignore_key = lambda i: (i.field_name, i.error_key, i.field_value)
@@ -85,15 +153,24 @@ class DBForm(object):
             error_key=error_key,
             field_value=field_value
         )
-        return get_or_add(IgnoredWarning, self.session, key_attrs)
+        if self.cache is None:
+            return get_or_add(IgnoredWarning, self.session, key_attrs)
+
+        cached_warnings = self.cache.ignored_warnings[self.form_index]
+        for warning in self._filter(cached_warnings, key_attrs):
+            return warning
+        warning = IgnoredWarning(**key_attrs)
+        self.session.add(warning)
+        cached_warnings.append(warning)
+        return warning
 
     def get_setting(self, key, value_only=True):
-        FormData = self.model.FormData
-        c = and_(
-            FormData.key == key,
-            FormData.form_index == self.form_index,
-        )
-        option = self.session.query(FormData).filter(c).first()
+        if self.cache is not None:
+            option = self.cache.settings[self.form_index].get(key)
+        else:
+            statement = cached_select(self.model.FormData, ('key', 'form_index'), first=True)
+            params = {'key': key, 'form_index': self.form_index}
+            option = self.session.execute(statement, params).scalars().first()
         if not value_only:
             return option
         return option.value if (option is not None) else None
@@ -104,7 +181,15 @@ class DBForm(object):
             setting_ = self.get_setting(key, value_only=False)
             if setting_:
                 self.session.delete(setting_)
+                if self.cache is not None:
+                    del self.cache.settings[self.form_index][key]
             return None
-        setting = get_or_add(FormData, self.session, {'key': key, 'form_index': self.form_index})
+        if self.cache is None:
+            setting = get_or_add(FormData, self.session, {'key': key, 'form_index': self.form_index})
+        else:
+            setting = self.get_setting(key, value_only=False)
+            if setting is None:
+                setting = FormData(key=key, form_index=self.form_index)
+                self.session.add(setting)
+                self.cache.settings[self.form_index][key] = setting
         setting.value = value
-
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+import os
+import threading
+
+from ..lru_cache import LRUCache
+
+
+__all__ = ['EngineRegistry', 'ENGINE_CACHE_SIZE']
+
+ENGINE_CACHE_SIZE = 32
+
+class EngineRegistry(object):
+    """
+    Keeps SQLAlchemy engines for SQLite files (keyed by absolute path and
+    connection profile) so reopening a DB file does not need a new engine
+    (including pool and dialect initialization).
+
+    Only the <maxsize> most recently used engines are kept, evicted engines
+    are disposed. ".release()" disposes the engine's pooled connections once
+    the last user closed the DB so the file is not kept open (Windows) but the
+    engine can be reused later.
+    """
+    def __init__(self, engine_factory, maxsize=ENGINE_CACHE_SIZE):
+        self.engine_factory = engine_factory
+        self._engines = LRUCache(maxsize=maxsize, on_evict=self._on_evict)
+        self._users = {}
+        # batches might be opened concurrently (see "Batch.init_from_bunch()")
+        self._lock = threading.Lock()
+
+    def acquire(self, filename, *, profile=None):
+        key = (os.path.abspath(filename), profile)
+        with self._lock:
+            engine = self._engines.get(key)
+            if engine is None:
+                engine = self.engine_factory(key[0], profile=profile)
+                self._engines.put(key, engine)
+            self._users[engine] = self._users.get(engine, 0) + 1
+        return engine
+
+    def release(self, engine):
+        with self._lock:
+            nr_users = self._users.get(engine, 0) - 1
+            if nr_users > 0:
+                self._users[engine] = nr_users
+                return
+            self._users.pop(engine, None)
+        engine.dispose()
+
+    def dispose(self, filename=None):
+        """Dispose all engines (or all engines for the given file) and remove
+        them from the registry."""
+        with self._lock:
+            if filename is None:
+                keys = self._engines.keys()
+            else:
+                path = os.path.abspath(filename)
+                keys = [key for key in self._engines.keys() if key[0] == path]
+            engines = [self._engines.pop(key) for key in keys]
+        for engine in engines:
+            engine.dispose()
+
+    def stats(self):
+        return self._engines.stats()
+
+    def __len__(self):
+        return len(self._engines)
+
+    def _on_evict(self, key, engine):
+        # Disposing only closes the pooled connections: Active sessions can
+        # still use the engine (a new pool is created).
+        engine.dispose()
@@ -4,7 +4,7 @@ from __future__ import division, absolute_import, print_function, unicode_litera
 from babel.util import LOCALTZ
 from datetime import datetime as DateTime_
 
-from sqlalchemy import Column, Integer, String, UnicodeText
+from sqlalchemy import Column, Index, Integer, String, UnicodeText
 from sqlalchemy.ext.declarative import declarative_base
 
 from ..lib import AttrDict
@@ -13,11 +13,22 @@ from ..lib.utc_datetime_column import UTCDateTime
 from ..task import TaskStatus
 
 
-__all__ = ['get_model', 'DBVersion', 'LATEST']
+__all__ = ['get_model', 'DBVersion', 'DEFAULT_REVISION', 'LATEST', 'TASK_DETAIL_COLUMNS', 'UPGRADES']
 
-LATEST = 'v201609'
+# New databases are created with "DEFAULT_REVISION": rdblib versions which
+# only know "v201609" can not open "v202610" databases (version check) even
+# though the tables are the same. "v202610" databases must be requested
+# explicitly ("SQLiteDB.create_new_db(..., revision=LATEST)") or existing
+# databases can be upgraded (see "UPGRADES").
+DEFAULT_REVISION = 'v201609'
+LATEST = 'v202610'
 
-def get_model(revision=LATEST):
+# Task columns which are not loaded by the task queries (e.g.
+# "Batch.tasks()") as most callers do not need them. The values are loaded
+# on first access.
+TASK_DETAIL_COLUMNS = ('data', 'created', 'last_modified')
+
+def get_model(revision=DEFAULT_REVISION):
     """
     Return the model classes for the given revision.
 
@@ -26,14 +37,27 @@ def get_model(revision=LATEST):
     level of indirection actually helps us to represent different DB layouts
     (of course also other parts of pydica must be able to deal with the
     differences but this is the first step).
+    Some revisions can be upgraded explicitly (opt-in), see "UPGRADES".
+
+    The model classes are created only once per revision (declaring the
+    classes is quite expensive) so all databases share the same mapped
+    classes/metadata.
     """
+    model = _models.get(revision)
+    if model is not None:
+        return model
     revisions = {
         'v201609': v201609,
+        'v202610': v202610,
     }
     if revision not in revisions:
         revision_list = ', '.join(revisions)
         raise ValueError('Unknown revision %r -- should be one of %s' % (revision, revision_list))
-    return revisions[revision]()
+    model = revisions[revision]()
+    _models[revision] = model
+    return model
+
+_models = {}
 
 # -----------------------------------------------------------------------------
 # We need a way to identify the DB schema for arbitrary databases in a reliable
@@ -113,3 +137,28 @@ def v201609():
     )
 
 
+# -----------------------------------------------------------------------------
+def v202610():
+    """
+    Same tables as "v201609" but with indexes for the per-form lookups
+    ("Batch.tasks()", "DBForm.tasks()", "DBForm.query_ignored_warnings()").
+    """
+    model = v201609()
+    model.id = 'v202610'
+
+    Task = model.Task
+    IgnoredWarning = model.IgnoredWarning
+    # Creating the Index with bound columns attaches it to the table.
+    Index('ix_tasks_form_index_type_status',
+        Task.form_index, Task.type_, Task.status)
+    Index('ix_ignored_warnings_form_index_field_name_error_key',
+        IgnoredWarning.form_index, IgnoredWarning.field_name, IgnoredWarning.error_key)
+    return model
+
+
+# Schema upgrades which can be applied to existing databases without changing
+# the data (see "SQLiteDB.upgrade_schema()"): target revision -> set of
+# revisions which can be upgraded.
+UPGRADES = {
+    'v202610': {'v201609'},
+}
@@ -2,76 +2,156 @@
 from __future__ import division, absolute_import, print_function, unicode_literals
 
 import os
+import shutil
+import sqlite3
+import tempfile
 
 from schwarz.log_utils import l_
-from sqlalchemy import create_engine, event
-from sqlalchemy.orm import Session
+from sqlalchemy import create_engine, event, inspect, select
+from sqlalchemy.orm import object_session, Session
+from sqlalchemy.orm.base import NO_VALUE
+from sqlalchemy.pool import StaticPool
 
 from . import model as db_schema
-from .dbform import DBForm
+from .dbform import FormDataCache
+from .engine_registry import EngineRegistry
 from .db_utils import DELETE as DELETE_
-from .model import get_model, DBVersion
+from .model import get_model, DBVersion, UPGRADES
+from ..instrumentation import metrics
+from ..task import TaskStatus
 
 
-__all__ = ['create_sqlite_db', 'SQLiteDB']
+__all__ = ['create_sqlite_db', 'engine_registry', 'PRAGMA_PROFILES', 'SQLiteDB']
+
+# Connection tuning: The selected profile is applied to every new DBAPI
+# connection (SQLAlchemy "connect" event). "None" keeps the SQLite defaults.
+#  - "safe": SQLite defaults but explicit (rollback journal, full fsync)
+#  - "bulk": WAL journal (fewer fsyncs, readers do not block the writer) and
+#            larger caches. WAL requires a local file system (no network
+#            shares) and creates "-wal"/"-shm" files next to the DB.
+PRAGMA_PROFILES = {
+    'safe': (
+        ('journal_mode', 'DELETE'),
+        ('synchronous', 'FULL'),
+    ),
+    'bulk': (
+        ('journal_mode', 'WAL'),
+        ('synchronous', 'NORMAL'),
+        ('mmap_size', 256 * 1024 * 1024),
+        # negative value: size in KiB (instead of pages)
+        ('cache_size', -64 * 1024),
+        ('temp_store', 'MEMORY'),
+    ),
+}
 
 def create_sqlite_db(tasks=(), ignored_warnings=(), filename='', model=None):
     create_file = not (not filename)
     db = SQLiteDB.create_new_db(filename, create_file=create_file, model=model)
     for task in tasks:
         db.session.add(task)
+    warning_rows = []
     for warning in ignored_warnings:
         if isinstance(warning, tuple):
-            form_index, field_name, error_key, field_value = warning
-            db_form = DBForm(db.session, form_index, db.model)
-            warning = db_form.add_ignored_warning(field_name, error_key, field_value)
+            warning_rows.append(warning)
+            continue
         db.session.add(warning)
+    if warning_rows:
+        db.bulk_ignore_warnings(warning_rows)
     db.commit()
     return db
 
 
 class SQLiteDB(object):
     DELETE = DELETE_
-    def __init__(self, metadata, session, model, *, log=None, ignore_db_version=False):
-        self.metadata = metadata
+    def __init__(self, metadata, session, model, *, log=None, ignore_db_version=False,
+                 defer_version_check=False, engine_registry=None):
+        # "model" might be None with "defer_version_check": The model is
+        # detected on first access (see ".model").
+        self._model = model
+        self._metadata = metadata
         self.session = session
         self._engine = self.session.bind
-        self.model = model
+        # registry which provided the engine (see ".close()")
+        self._engine_registry = engine_registry
+        # source file for in-memory DBs (see ".open_in_memory()")
+        self.filename = None
         self.log = l_(log)
+        # see ".preload_form_data()"
+        self.form_cache = None
 
         # for performance reasons SQLAlchemy does not track if a session needs
         # a DB change (at least there is no API) so we have to do the recording
         # ourself using events (also see http://stackoverflow.com/q/16256777/138526)
         self._was_flushed = False
+        # Modified attributes of persistent instances: "{InstanceState: set(key)}".
+        # Recorded by attribute events so ".is_dirty()" does not have to check
+        # the attribute history of all instances in "session.dirty".
+        self._modified_attrs = {}
         self._listeners = [
             ('after_flush', self._on_flush),
             ('after_commit', self._on_commit),
+            ('after_rollback', self._on_rollback),
+            ('persistent_to_detached', self._on_detach),
+            ('detached_to_persistent', self._on_attach),
+            ('after_begin', self._on_begin),
         ]
+        # "defer_version_check": check the DB version when the session
+        # accesses the DB for the first time (see "._on_begin()")
+        self._version_checked = ignore_db_version or (not defer_version_check)
         self._register_listeners()
-        if not ignore_db_version:
+        if model is not None:
+            _enable_change_tracking(model)
+        if not ignore_db_version and not defer_version_check:
             self._ensure_db_version_matches_model(self.session, self.model, self.log)
 
+    @property
+    def model(self):
+        if self._model is None:
+            with self._engine.connect() as connection:
+                self._detect_model(connection)
+        return self._model
+
+    @model.setter
+    def model(self, model):
+        self._model = model
+
+    @property
+    def metadata(self):
+        if self._metadata is None:
+            self._metadata = self.model.metadata
+        return self._metadata
+
+    @metadata.setter
+    def metadata(self, metadata):
+        self._metadata = metadata
+
+    def _detect_model(self, connection):
+        model, version_is_known = _model_for_db(connection)
+        _enable_change_tracking(model)
+        self._model = model
+        if version_is_known:
+            self._version_checked = True
+
     def _ensure_db_version_matches_model(self, session, model, log):
-        connection = session.connection()
-        version_table_name = DBVersion.__table__.name
-        if not self._engine.dialect.has_table(connection, version_table_name):
-            msg = 'DB version table "%s" does not exist!' % version_table_name
-            log.error(msg)
+        try:
+            _check_db_version(session.connection(), model, log)
+        except ValueError:
             # close all open files to prevent problems in Windows if the file
             # is opened again
             self.close()
-            raise ValueError(msg)
-        db_version = session.query(DBVersion).first()
-        if db_version.version_id != model.id:
-            msg = 'DB version mismatch %s (DB) vs. %s (model)' % (db_version.version_id, model.id)
-            log.error(msg)
-            # Windows, see above
-            self.close()
-            raise ValueError(msg)
+            raise
 
     @classmethod
-    def create_new_db(cls, filename='', *, create_file, log=None, model=None):
-        db = cls.init_with_file(filename, create=True, log=log, model=model)
+    def create_new_db(cls, filename='', *, create_file, log=None, model=None, profile=None,
+                      revision=db_schema.DEFAULT_REVISION):
+        """
+        Create a new DB with the given model revision. The default revision
+        can be opened by all deployed rdblib versions, pass "revision=LATEST"
+        to create a DB with the per-form indexes ("v202610").
+        """
+        if model is None:
+            model = get_model(revision)
+        db = cls.init_with_file(filename, create=True, log=log, model=model, profile=profile)
         engine = db.session.bind
         DBVersion.metadata.create_all(bind=engine)
         db.metadata.create_all(bind=engine)
@@ -80,9 +160,21 @@ class SQLiteDB(object):
         return db
 
     @classmethod
-    def init_with_file(cls, filename, *, create=False, log=None, model=None):
+    @metrics.timed('sqlite.open')
+    def init_with_file(cls, filename, *, create=False, log=None, model=None, upgrade=False, profile=None,
+                       defer_version_check=False):
+        """
+        Open the given SQLite file.
+
+        If no model is given the model revision is detected from the DB
+        (falling back to the latest revision). "upgrade=True" upgrades the DB
+        schema to the latest revision (if possible, see
+        "SQLiteDB.upgrade_schema()").
+        "profile" selects the connection tuning (see "PRAGMA_PROFILES").
+        "defer_version_check=True" detects the model/checks the DB version on
+        first access (instead of opening a connection immediately).
+        """
         log = l_(log)
-        model_ = model or get_model(db_schema.LATEST)
 
         if filename:
             # Of course these conditions are racy but they will likely catch
@@ -98,24 +190,166 @@ class SQLiteDB(object):
             path_uri = os.path.abspath(filename)
         else:
             path_uri = ''
-        db_uri = 'sqlite:///' + path_uri
-        echo = False
-        # echo = 'debug' # for full debugging output (including results
-        engine = create_engine(db_uri, echo=echo)
-        metadata = model_.metadata
+        if filename:
+            # reuse engines for files (an in-memory DB exists only as long as
+            # its engine/connection)
+            registry = engine_registry
+            engine = registry.acquire(path_uri, profile=profile)
+        else:
+            registry = None
+            engine = _create_engine(path_uri, profile=profile)
+        db = cls._init_with_engine(engine, create=create, log=log, model=model,
+            defer_version_check=defer_version_check, engine_registry=registry)
+        log.info('opened SQlite db "%s"', logged_filename)
+        if upgrade and (db.model.id != db_schema.LATEST):
+            db.upgrade_schema(db_schema.LATEST)
+        return db
+
+    @classmethod
+    @metrics.timed('sqlite.load_in_memory')
+    def open_in_memory(cls, filename, *, log=None, model=None):
+        """
+        Copy the given SQLite file into an in-memory DB (sqlite3 backup API).
+
+        Commits do not touch the file system (no fsync) so this is meant for
+        heavy (validation) passes. Nothing is written back to the file unless
+        ".snapshot()" is called.
+        """
+        log = l_(log)
+        if not os.path.exists(filename):
+            raise IOError('DB file "%s" does not exist' % filename)
+        # all threads must use the same connection (otherwise each thread
+        # would get its own, empty in-memory DB)
+        engine = create_engine('sqlite://', poolclass=StaticPool,
+            connect_args={'check_same_thread': False})
+        source = sqlite3.connect(filename)
+        try:
+            raw_connection = engine.raw_connection()
+            try:
+                source.backup(raw_connection.driver_connection)
+            finally:
+                raw_connection.close()
+        finally:
+            source.close()
+        db = cls._init_with_engine(engine, create=False, log=log, model=model)
+        db.filename = os.path.abspath(filename)
+        log.info('loaded SQlite db "%s" into memory', filename)
+        return db
+
+    @classmethod
+    def _init_with_engine(cls, engine, *, create, log, model, defer_version_check=False, engine_registry=None):
+        registry = engine_registry
+        # the detected model matches the stored DB version already
+        version_is_known = create
+        try:
+            if model is not None:
+                model_ = model
+            elif create:
+                model_ = get_model(db_schema.DEFAULT_REVISION)
+            elif defer_version_check:
+                # detected on first access (see "SQLiteDB.model")
+                model_ = None
+            else:
+                with engine.connect() as connection:
+                    model_, version_is_known = _model_for_db(connection)
+        except Exception:
+            if registry is not None:
+                registry.release(engine)
+            raise
+        metadata = model_.metadata if (model_ is not None) else None
         session = Session(bind=engine)
+        return SQLiteDB(metadata, session, model_, log=log, ignore_db_version=version_is_known,
+            defer_version_check=defer_version_check, engine_registry=registry)
 
-        log.info('opened SQlite db "%s"', logged_filename)
-        return SQLiteDB(metadata, session, model_, log=log, ignore_db_version=create)
+    @metrics.timed('sqlite.snapshot')
+    def snapshot(self, filename=None):
+        """
+        Write the complete DB to the given file (default: the file loaded by
+        ".open_in_memory()"). All pending changes are committed first.
+
+        The data is written to a temporary file in the target directory which
+        then replaces the target file (atomic rename) so the target file is
+        never left in a partially written state. The file mode of an existing
+        target file is kept. DBs opened for the target file see the new data
+        after their current transaction.
+        """
+        if filename is None:
+            filename = self.filename
+        if not filename:
+            raise ValueError('no file name given for DB snapshot')
+        self.commit()
+        target_exists = os.path.exists(filename)
+        if target_exists:
+            # SQLite would apply a leftover WAL (e.g. "bulk" profile) to the
+            # new file.
+            _checkpoint_wal(filename)
+        target_dir = os.path.dirname(os.path.abspath(filename))
+        fd, tmp_path = tempfile.mkstemp(dir=target_dir, prefix=os.path.basename(filename) + '.', suffix='.tmp')
+        os.close(fd)
+        try:
+            target = sqlite3.connect(tmp_path)
+            try:
+                self.session.connection().connection.driver_connection.backup(target)
+            finally:
+                target.close()
+            if target_exists:
+                # "mkstemp()" creates the file with mode 0600
+                shutil.copymode(filename, tmp_path)
+            with open(tmp_path, 'rb+') as tmp_fp:
+                os.fsync(tmp_fp.fileno())
+            os.replace(tmp_path, filename)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        for suffix in ('-wal', '-shm'):
+            if os.path.exists(filename + suffix):
+                os.unlink(filename + suffix)
+        # The registry might keep an engine for the file (used by other
+        # "SQLiteDB" instances) with pooled connections to the replaced file.
+        engine_registry.dispose(filename)
+        _fsync_directory(target_dir)
+        self.log.info('stored snapshot of SQLite db in "%s"', filename)
+
+    def upgrade_schema(self, revision=db_schema.LATEST):
+        """
+        Upgrade the DB schema to the given model revision (opt-in, existing
+        databases are never upgraded automatically).
+
+        Only upgrades listed in "model.UPGRADES" are supported (these do not
+        modify the stored data). All pending changes are committed first.
+        """
+        if self.model.id == revision:
+            return
+        upgradable_revisions = UPGRADES.get(revision, ())
+        if self.model.id not in upgradable_revisions:
+            msg = 'can not upgrade DB from %s to %s' % (self.model.id, revision)
+            raise ValueError(msg)
+        new_model = get_model(revision)
+        self.commit()
+        connection = self.session.connection()
+        for table in new_model.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=connection, checkfirst=True)
+        db_version = self.session.query(DBVersion).one()
+        db_version.version_id = new_model.id
+        self.commit()
+        # ORM instances of the old model classes must not be mixed with the
+        # new model.
+        self.session.expunge_all()
+        self.log.info('upgraded DB schema from %s to %s', self.model.id, new_model.id)
+        self.model = new_model
+        self.metadata = new_model.metadata
+        _enable_change_tracking(new_model)
 
     # --- connection handling -------------------------------------------------
     def is_dirty(self):
         if self._was_flushed:
             return True
-        elif self.session.new or self.session.deleted:
+        elif self._modified_attrs:
             return True
-        has_modified_items = len([x for x in self.session.dirty if self.session.is_modified(x)]) > 0
-        if has_modified_items:
+        # both sets only contain pending (unflushed) additions/deletions
+        elif self.session.new or self.session.deleted:
             return True
         return False
 
@@ -130,22 +364,96 @@ class SQLiteDB(object):
         self._register_listeners()
 
     def _register_listeners(self):
+        self.session.info[_SESSION_KEY] = self
         for key in self._listeners:
             event.listen(self.session, *key)
 
+    def _on_begin(self, session, transaction, connection):
+        if self._model is None:
+            self._detect_model(connection)
+        if self._version_checked:
+            return
+        _check_db_version(connection, self.model, self.log)
+        self._version_checked = True
+
     def _on_flush(self, session, flush_context):
         self._was_flushed = True
+        self._modified_attrs.clear()
         assert session == self.session
 
     def _on_commit(self, session):
         self._was_flushed = False
+        self._modified_attrs.clear()
         assert session == self.session
 
+    def _on_rollback(self, session):
+        self._modified_attrs.clear()
+        # new ORM instances in the cache were expunged by the rollback
+        self.form_cache = None
+
+    def _on_detach(self, session, instance):
+        self._modified_attrs.pop(inspect(instance), None)
+
+    def _on_attach(self, session, instance):
+        state = inspect(instance)
+        if state.modified:
+            self._modified_attrs[state] = set(state.committed_state)
+
+    def _on_attribute_set(self, state, key, value, oldvalue):
+        if not state.persistent:
+            # pending/deleted instances are tracked via "session.new"/"session.deleted"
+            return
+        # "committed_state" contains the original value after the first change
+        committed_value = state.committed_state.get(key, oldvalue)
+        modified_keys = self._modified_attrs.get(state)
+        if (committed_value is not NO_VALUE) and _is_equal(state, key, value, committed_value):
+            # value was reset to the original value: not modified anymore
+            # (same as "session.is_modified()")
+            if modified_keys:
+                modified_keys.discard(key)
+                if not modified_keys:
+                    del self._modified_attrs[state]
+            return
+        self._modified_attrs.setdefault(state, set()).add(key)
+
+    def _on_attribute_modified(self, state, key):
+        # in-place changes of mutable values (e.g. JSON dicts)
+        if state.persistent:
+            self._modified_attrs.setdefault(state, set()).add(key)
+
+    def _on_expire(self, state, keys):
+        if keys is None:
+            self._modified_attrs.pop(state, None)
+            return
+        modified_keys = self._modified_attrs.get(state)
+        if modified_keys:
+            modified_keys.difference_update(keys)
+            if not modified_keys:
+                del self._modified_attrs[state]
+
     def commit(self):
         assert (self.session is not None)
-        self.session.commit()
+        form_cache = self.form_cache
+        expire_on_commit = self.session.expire_on_commit
+        if form_cache is not None:
+            # The preloaded instances match the committed state. Expiring them
+            # would trigger one SELECT per instance on the next access.
+            self.session.expire_on_commit = False
+        try:
+            with metrics.span('sqlite.commit'):
+                self.session.commit()
+        finally:
+            self.session.expire_on_commit = expire_on_commit
+        if (form_cache is not None) and expire_on_commit:
+            self._expire_uncached_instances(form_cache)
         self._was_flushed = False
 
+    def _expire_uncached_instances(self, form_cache):
+        cached_ids = set(id(instance) for instance in form_cache.instances())
+        for instance in list(self.session.identity_map.values()):
+            if id(instance) not in cached_ids:
+                self.session.expire(instance)
+
     def rollback(self):
         assert (self.session is not None)
         self.session.rollback()
@@ -159,8 +467,16 @@ class SQLiteDB(object):
             self.rollback()
         for key in self._listeners:
             event.remove(self.session, *key)
+        self.session.info.pop(_SESSION_KEY, None)
         self.session.close()
         self.session = None
+        self.form_cache = None
+        self._modified_attrs.clear()
+        if self._engine_registry is not None:
+            # closes the pooled connections (if the DB file is not used
+            # elsewhere) but keeps the engine for reuse
+            self._engine_registry.release(self._engine)
+            self._engine_registry = None
 
     save = commit
 
@@ -172,3 +488,206 @@ class SQLiteDB(object):
 
     def query(self, orm_class):
         return self.session.query(orm_class)
+
+    def preload_form_data(self):
+        """Load all tasks, ignored warnings and form settings (three queries)
+        so DBForm instances can use the cache instead of querying the DB for
+        each form. The cache is reloaded after bulk inserts (see
+        ".bulk_add_tasks()")."""
+        self.form_cache = FormDataCache.load(self.session, self.model)
+        return self.form_cache
+
+    # --- bulk operations -----------------------------------------------------
+    def bulk_add_tasks(self, rows):
+        """
+        Insert many tasks with a single (executemany) statement, bypassing the
+        ORM. Each row is a dict with the Task attributes ("form_index" and
+        "type_" are required).
+        Returns the number of inserted tasks.
+        """
+        task_rows = []
+        for row in rows:
+            task_rows.append({
+                'form_index': row['form_index'],
+                'type_':      row['type_'],
+                'field_name': row.get('field_name'),
+                'status':     row.get('status', TaskStatus.NEW),
+                'data':       row.get('data') or {},
+            })
+        return self._bulk_insert(self.model.Task, task_rows)
+
+    def bulk_ignore_warnings(self, rows):
+        """
+        Add many ignored warnings (tuples "(form_index, field_name, error_key,
+        field_value)" or dicts with these keys). Warnings which are already
+        stored (or duplicated in <rows>) are skipped (same as
+        "DBForm.add_ignored_warning()").
+
+        Existing warnings are fetched with a single query instead of one query
+        per warning. An "INSERT OR IGNORE" would require a unique constraint
+        which existing databases do not have (and SQLite does not consider
+        NULL values as duplicates).
+        Returns the number of inserted warnings.
+        """
+        IgnoredWarning = self.model.IgnoredWarning
+        key_names = ('form_index', 'field_name', 'error_key', 'field_value')
+        new_keys = []
+        for row in rows:
+            key = tuple(row[name] for name in key_names) if isinstance(row, dict) else tuple(row)
+            new_keys.append(key)
+        if not new_keys:
+            return 0
+
+        form_indexes = set(key[0] for key in new_keys)
+        key_columns = [getattr(IgnoredWarning, name) for name in key_names]
+        query = self.session.query(*key_columns).filter(IgnoredWarning.form_index.in_(form_indexes))
+        known_keys = set(tuple(row) for row in query)
+        warning_rows = []
+        for key in new_keys:
+            if key in known_keys:
+                continue
+            known_keys.add(key)
+            warning_rows.append(dict(zip(key_names, key), data={}))
+        return self._bulk_insert(IgnoredWarning, warning_rows)
+
+    def _bulk_insert(self, orm_class, rows):
+        if not rows:
+            return 0
+        self.session.execute(orm_class.__table__.insert(), rows)
+        # Core statements do not trigger the ORM flush events but the
+        # session contains uncommitted changes now.
+        self._was_flushed = True
+        if self.form_cache is not None:
+            # the inserted rows bypass the ORM (not in the cache)
+            self.preload_form_data()
+        return len(rows)
+
+
+# --- change tracking (see "SQLiteDB.is_dirty()") -----------------------------
+_SESSION_KEY = 'srw.sqlite_db'
+
+def _enable_change_tracking(model):
+    """Register attribute/instance events for all model classes (only once
+    per class). The events are dispatched to the SQLiteDB instance of the
+    session the ORM instance belongs to."""
+    for orm_class in model.values():
+        if not hasattr(orm_class, '__mapper__'):
+            continue
+        if orm_class.__dict__.get('_srw_change_tracking'):
+            continue
+        mapper = orm_class.__mapper__
+        for prop in mapper.column_attrs:
+            attribute = getattr(orm_class, prop.key)
+            event.listen(attribute, 'set', _on_set)
+            event.listen(attribute, 'modified', _on_modified)
+        event.listen(orm_class, 'expire', _on_expire)
+        event.listen(orm_class, 'refresh', _on_refresh)
+        orm_class._srw_change_tracking = True
+
+def _db_for(instance):
+    session = object_session(instance)
+    if session is None:
+        return None
+    return session.info.get(_SESSION_KEY)
+
+def _on_set(target, value, oldvalue, initiator):
+    db = _db_for(target)
+    if db is not None:
+        db._on_attribute_set(inspect(target), initiator.key, value, oldvalue)
+
+def _on_modified(target, initiator):
+    db = _db_for(target)
+    if db is not None:
+        db._on_attribute_modified(inspect(target), initiator.key)
+
+def _on_expire(target, attrs):
+    db = _db_for(target)
+    if db is not None:
+        db._on_expire(inspect(target), attrs)
+
+def _on_refresh(target, context, attrs):
+    db = _db_for(target)
+    if db is not None:
+        db._on_expire(inspect(target), attrs)
+
+def _is_equal(state, key, value, other):
+    column_property = state.mapper.column_attrs[key]
+    column_type = column_property.columns[0].type
+    try:
+        return column_type.compare_values(value, other)
+    except Exception:
+        return False
+
+
+def _check_db_version(connection, model, log):
+    version_table_name = DBVersion.__table__.name
+    if not connection.dialect.has_table(connection, version_table_name):
+        msg = 'DB version table "%s" does not exist!' % version_table_name
+        log.error(msg)
+        raise ValueError(msg)
+    version_id = connection.execute(select(DBVersion.version_id)).scalar()
+    if version_id != model.id:
+        msg = 'DB version mismatch %s (DB) vs. %s (model)' % (version_id, model.id)
+        log.error(msg)
+        raise ValueError(msg)
+
+def _model_for_db(connection):
+    """Return the model matching the revision stored in the DB (or the latest
+    model if the revision is unknown so "_ensure_db_version_matches_model()"
+    can report the problem) and a flag if the stored revision is known."""
+    version_id = None
+    if connection.dialect.has_table(connection, DBVersion.__table__.name):
+        version_id = connection.execute(select(DBVersion.version_id)).scalar()
+    if version_id is None:
+        return get_model(db_schema.LATEST), False
+    try:
+        return get_model(version_id), True
+    except ValueError:
+        return get_model(db_schema.LATEST), False
+
+def _checkpoint_wal(filename):
+    """Merge a leftover WAL file into <filename>, raises an IOError if the DB
+    is still used by another connection."""
+    if not os.path.exists(filename + '-wal'):
+        return
+    connection = sqlite3.connect(filename)
+    try:
+        busy, _, _ = connection.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchone()
+    finally:
+        connection.close()
+    if busy:
+        raise IOError('DB file "%s" is in use (can not checkpoint WAL)' % filename)
+
+def _fsync_directory(path):
+    # make the rename durable (not supported on Windows)
+    if os.name == 'nt':
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _create_engine(path_uri, *, profile=None):
+    db_uri = 'sqlite:///' + path_uri
+    echo = False
+    # echo = 'debug' # for full debugging output (including results
+    engine = create_engine(db_uri, echo=echo)
+    if profile is not None:
+        _set_pragma_profile(engine, profile)
+    return engine
+
+engine_registry = EngineRegistry(_create_engine)
+
+def _set_pragma_profile(engine, profile):
+    if profile not in PRAGMA_PROFILES:
+        profile_list = ', '.join(PRAGMA_PROFILES)
+        raise ValueError('Unknown profile %r -- should be one of %s' % (profile, profile_list))
+    pragmas = PRAGMA_PROFILES[profile]
+
+    def _on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma, value in pragmas:
+            cursor.execute('PRAGMA %s = %s' % (pragma, value))
+        cursor.close()
+    event.listen(engine, 'connect', _on_connect)
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+from sqlalchemy import and_, bindparam, select
+from sqlalchemy.orm import defer
+
+
+__all__ = ['cached_select', 'null_attrs']
+
+# (ORM class, filter attributes, NULL attributes, first only, deferred attributes)
+#     -> SELECT statement
+_statements = {}
+
+def cached_select(orm_class, attr_names, *, first=False, deferred=(), null_attrs=()):
+    """
+    Return a SELECT statement for <orm_class> which filters all <attr_names>
+    for equality (bound parameters named like the attributes). The
+    <deferred> attributes are only loaded when accessed.
+
+    Attributes in <null_attrs> are filtered with "IS NULL" instead (a bound
+    parameter never matches NULL), see "null_attrs()".
+
+    Statements are built once per filter combination so SQLAlchemy does not
+    need to construct the query (and compute its cache key for the compiled
+    SQL cache) for every call.
+    """
+    key = (orm_class, attr_names, null_attrs, first, deferred)
+    statement = _statements.get(key)
+    if statement is None:
+        statement = _build_select(orm_class, attr_names, null_attrs, first, deferred)
+        _statements[key] = statement
+    return statement
+
+def null_attrs(params):
+    """Return the (sorted) names of all <params> with a None value."""
+    return tuple(sorted(name for name, value in params.items() if value is None))
+
+def _build_select(orm_class, attr_names, null_attrs, first, deferred):
+    statement = select(orm_class)
+    if deferred:
+        statement = statement.options(*[defer(getattr(orm_class, attr_name)) for attr_name in deferred])
+    conditions = []
+    for attr_name in attr_names:
+        column = getattr(orm_class, attr_name)
+        if attr_name in null_attrs:
+            conditions.append(column.is_(None))
+        else:
+            conditions.append(column == bindparam(attr_name))
+    if conditions:
+        statement = statement.where(and_(*conditions))
+    if first:
+        statement = statement.limit(1)
+    return statement
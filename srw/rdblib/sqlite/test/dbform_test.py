@@ -3,12 +3,12 @@ from __future__ import division, absolute_import, print_function, unicode_litera
 
 from pythonic_testcase import *
 
-from sqlalchemy import and_
+from sqlalchemy import and_, event, inspect
 
-from srw.rdblib import Batch, DataBunch
+from srw.rdblib import Batch, DataBunch, TaskStatus, TaskType
 from srw.rdblib.cdb import create_cdb_with_dummy_data
 from srw.rdblib.ibf.testutil import create_ibf
-from .. import create_sqlite_db, DELETE
+from .. import create_sqlite_db, DBForm, DELETE
 
 
 class DBFormTest(PythonicTestCase):
@@ -56,6 +56,114 @@ class DBFormTest(PythonicTestCase):
         form.store_setting(key, value=DELETE)
         assert_none(form.get_setting(key), message='setting should be gone now')
 
+    def test_can_use_preloaded_form_data(self):
+        ignored_warnings = ((1, 'BAR', 'error', 'value'),)
+        batch = self._create_batch(nr_forms=2, ignored_warnings=ignored_warnings)
+        batch.db_form(0).add_task(type_=TaskType.VERIFICATION, field_name='FOO')
+        batch.db_form(1).add_task(type_=TaskType.VERIFICATION, field_name='BAR')
+        batch.db_form(1).store_setting('foo', '42')
+        batch.commit()
+
+        batch.preload_db()
+        statements = []
+        engine = batch.db.session.get_bind()
+        collect_sql = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(engine, 'before_cursor_execute', collect_sql)
+        self.addCleanup(event.remove, engine, 'before_cursor_execute', collect_sql)
+
+        form0 = batch.db_form(0)
+        form1 = batch.db_form(1)
+        assert_equals(('FOO',), tuple(t.field_name for t in form0.tasks()))
+        assert_length(1, form1.new_tasks(type_=TaskType.VERIFICATION))
+        assert_length(0, form0.ignored_warnings())
+        assert_equals((('BAR', 'error', 'value'),), form1.ignored_warnings(as_ignore_key=True))
+        assert_equals('42', form1.get_setting('foo'))
+        assert_none(form0.get_setting('foo'))
+        assert_length(0, statements, message='all data should be served from cache')
+
+        # cache is updated when adding data via DBForm
+        form0.add_task(type_=TaskType.FORM_VALIDATION, field_name='BAR')
+        form0.add_ignored_warning('FOO', 'error', 'x')
+        assert_equals(form1.ignored_warnings()[0], form1.add_ignored_warning('BAR', 'error', 'value'))
+        form1.store_setting('foo', value=DELETE)
+        assert_length(2, form0.tasks())
+        assert_length(1, form0.ignored_warnings())
+        assert_length(1, form1.ignored_warnings())
+        assert_none(form1.get_setting('foo'))
+        batch.commit()
+        form0_uncached = DBForm(batch.db.session, 0, batch.db.model)
+        assert_length(2, form0_uncached.tasks())
+        assert_length(1, form0_uncached.ignored_warnings())
+
+    def test_can_filter_tasks_without_field_name(self):
+        batch = self._create_batch(nr_forms=1)
+        db_form = batch.db_form(0)
+        db_form.add_task(type_=TaskType.FORM_VALIDATION, field_name=None)
+        db_form.add_task(type_=TaskType.VERIFICATION, field_name='FOO')
+        batch.commit()
+        assert_length(1, db_form.tasks(field_name=None))
+        # same result when using the preloaded data
+        batch.preload_db()
+        assert_length(1, batch.db_form(0).tasks(field_name=None))
+
+    def test_can_use_preloaded_form_data_after_commit(self):
+        batch = self._create_batch(nr_forms=20)
+        for form_index in range(20):
+            batch.db_form(form_index).add_task(type_=TaskType.VERIFICATION, field_name='FOO')
+        batch.commit()
+        batch.preload_db()
+        task = batch.db_form(0).tasks()[0]
+        task.status = TaskStatus.CLOSED
+        batch.commit()
+
+        statements = []
+        engine = batch.db.session.get_bind()
+        collect_sql = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(engine, 'before_cursor_execute', collect_sql)
+        self.addCleanup(event.remove, engine, 'before_cursor_execute', collect_sql)
+        for form_index in range(20):
+            db_form = batch.db_form(form_index)
+            assert_equals(('FOO',), tuple(t.field_name for t in db_form.tasks()))
+        nr_new_tasks = sum(len(batch.db_form(i).new_tasks(type_=TaskType.VERIFICATION)) for i in range(20))
+        assert_equals(19, nr_new_tasks)
+        assert_length(0, statements, message='all data should be served from cache')
+
+    def test_drops_preloaded_form_data_after_rollback(self):
+        batch = self._create_batch(nr_forms=1)
+        batch.preload_db()
+        db_form = batch.db_form(0)
+        db_form.add_task(type_=TaskType.VERIFICATION, field_name='FOO')
+        batch.db.rollback()
+        assert_none(batch.db.form_cache)
+        assert_length(0, batch.db_form(0).tasks())
+        assert_length(0, db_form.tasks())
+
+    def test_reloads_preloaded_form_data_after_bulk_inserts(self):
+        batch = self._create_batch(nr_forms=2)
+        batch.preload_db()
+        db_form = batch.db_form(1)
+        batch.db.bulk_add_tasks([{'form_index': 1, 'type_': TaskType.VERIFICATION, 'field_name': 'FOO'}])
+        batch.db.bulk_ignore_warnings([(1, 'FOO', 'some_error', '21')])
+        assert_not_none(batch.db.form_cache)
+        assert_equals(('FOO',), tuple(task.field_name for task in db_form.tasks()))
+        assert_equals((('FOO', 'some_error', '21'),), db_form.ignored_warnings(as_ignore_key=True))
+
+    def test_expires_only_uncached_instances_on_commit(self):
+        batch = self._create_batch(nr_forms=1)
+        batch.db_form(0).add_task(type_=TaskType.VERIFICATION, field_name='FOO')
+        batch.store_setting('foo', 'bar')
+        batch.commit()
+        batch.preload_db()
+        task, = batch.db_form(0).tasks()
+        setting = batch.get_setting('foo', value_only=False)
+        task.status = TaskStatus.CLOSED
+        setting.value = 'baz'
+        batch.commit()
+
+        assert_equals(set(), inspect(task).expired_attributes)
+        assert_contains('value', inspect(setting).expired_attributes)
+        assert_equals('baz', setting.value)
+
     # --- helpers -------------------------------------------------------------
     def _create_batch(self, *, nr_forms=1, tasks=(), ignored_warnings=(), model=None):
         field_names = ('FOO', 'BAR')
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+import os
+
+from pythonic_testcase import *
+from schwarz.fakefs_helpers import TempFS
+
+from .. import engine_registry, EngineRegistry, SQLiteDB
+
+
+class EngineRegistryTest(PythonicTestCase):
+    def setUp(self):
+        self.fs = TempFS.set_up(test=self)
+        self.created = []
+        self.disposed = []
+
+    def test_reuses_engine_for_same_file(self):
+        registry = self._registry()
+        engine = registry.acquire('foo.db')
+        assert_is(engine, registry.acquire(os.path.abspath('foo.db')))
+        assert_is_not(engine, registry.acquire('foo.db', profile='bulk'))
+        assert_length(2, self.created)
+
+    def test_disposes_engine_when_released_by_last_user(self):
+        registry = self._registry()
+        engine = registry.acquire('foo.db')
+        registry.acquire('foo.db')
+        registry.release(engine)
+        assert_length(0, self.disposed)
+        registry.release(engine)
+        assert_equals([engine], self.disposed)
+        assert_is(engine, registry.acquire('foo.db'),
+            message='released engines should be kept for reuse')
+
+    def test_disposes_evicted_engines(self):
+        registry = self._registry(maxsize=1)
+        engine = registry.acquire('foo.db')
+        registry.acquire('bar.db')
+        assert_equals([engine], self.disposed)
+        assert_length(1, registry)
+
+    def test_can_dispose_engines(self):
+        registry = self._registry()
+        foo_engine = registry.acquire('foo.db')
+        registry.acquire('bar.db')
+        registry.dispose('foo.db')
+        assert_equals([foo_engine], self.disposed)
+        assert_length(1, registry)
+
+        registry.dispose()
+        assert_length(2, self.disposed)
+        assert_length(0, registry)
+
+    def test_sqlite_db_uses_shared_engine(self):
+        db_filename = os.path.join(self.fs.root, 'foo.db')
+        db = SQLiteDB.create_new_db(db_filename, create_file=True)
+        engine = db.session.bind
+        db.close()
+        self.addCleanup(engine_registry.dispose, db_filename)
+
+        db = SQLiteDB.init_with_file(db_filename)
+        assert_is(engine, db.session.bind)
+        db.close()
+        assert_equals(0, engine.pool.checkedin(),
+            message='pooled connections should be closed after closing the DB')
+
+    # --- helpers -------------------------------------------------------------
+    def _registry(self, maxsize=10):
+        return EngineRegistry(self._create_engine, maxsize=maxsize)
+
+    def _create_engine(self, path, *, profile=None):
+        engine = FakeEngine(self.disposed)
+        self.created.append(engine)
+        return engine
+
+
+class FakeEngine(object):
+    def __init__(self, disposed):
+        self._disposed = disposed
+
+    def dispose(self):
+        self._disposed.append(self)
@@ -2,12 +2,18 @@
 from __future__ import division, absolute_import, print_function, unicode_literals
 
 import os
+import shutil
+import sqlite3
+import stat
+from unittest import mock
 
 from pythonic_testcase import *
 from schwarz.fakefs_helpers import TempFS
+from sqlalchemy import inspect, text
 
-from srw.rdblib import TaskType
-from .. import create_sqlite_db, DBVersion, SQLiteDB
+from srw.rdblib import TaskStatus, TaskType
+from .. import create_sqlite_db, get_model, DBVersion, SQLiteDB, LATEST
+from .. import sqlite_db
 
 
 
@@ -62,6 +68,65 @@ class SQLiteDBTest(PythonicTestCase):
         assert_false(db.is_dirty(),
             message='empty flush should not mark session as dirty')
 
+    def test_dirty_tracking_matches_attribute_history(self):
+        db = create_sqlite_db()
+        session = db.session
+        Task = db.model.Task
+        session.add_all([Task(form_index=i, type_=TaskType.VERIFICATION) for i in range(3)])
+        db.commit()
+
+        def assert_dirty_state(expected):
+            # reference implementation: check the attribute history of all
+            # instances (previous implementation of ".is_dirty()")
+            is_modified = any(session.is_modified(x) for x in session.dirty)
+            has_changes = bool(session.new or session.deleted or is_modified)
+            assert_equals(expected, has_changes)
+            assert_equals(expected, db.is_dirty())
+
+        task, task2, task3 = session.query(Task).order_by(Task.id).all()
+        assert_dirty_state(False)
+        task.status = task.status
+        assert_dirty_state(False)
+        original_status = task.status
+        task.status = 'foo'
+        assert_dirty_state(True)
+        task.status = original_status
+        assert_dirty_state(False)
+
+        task2.data['foo'] = 'bar'
+        assert_dirty_state(True)
+        db.rollback()
+        assert_dirty_state(False)
+
+        # the rollback expired all attributes so SQLAlchemy can not compare
+        # the new value with the original one
+        task2.data = {}
+        assert_dirty_state(True)
+        db.rollback()
+        assert_equals({}, task2.data)
+        task2.data = {}
+        assert_dirty_state(False)
+        task2.data = {'foo': 'bar'}
+        assert_dirty_state(True)
+        session.expire(task2)
+        assert_dirty_state(False)
+
+        task3.field_name = 'FOO'
+        assert_dirty_state(True)
+        session.expunge(task3)
+        assert_dirty_state(False)
+        session.add(task3)
+        assert_dirty_state(True)
+        db.rollback()
+
+        session.delete(task)
+        assert_dirty_state(True)
+        db.rollback()
+        session.add(Task(form_index=42, type_=TaskType.VERIFICATION))
+        assert_dirty_state(True)
+        db.commit()
+        assert_dirty_state(False)
+
     def test_new_db_should_be_clean(self):
         db = SQLiteDB.create_new_db(create_file=False)
         assert_false(db.is_dirty())
@@ -74,6 +139,7 @@ class SQLiteDBTest(PythonicTestCase):
         assert_true(engine.dialect.has_table(connection, 'dbversion'))
 
         db_version = db.query(DBVersion).one()
+        # readable by all deployed rdblib versions
         assert_equals('v201609', db_version.version_id)
         # close all open files - otherwise Windows won't be able to remove
         # the temp dir
@@ -106,3 +172,215 @@ class SQLiteDBTest(PythonicTestCase):
 
         with assert_raises(ValueError):
             SQLiteDB.init_with_file(db_filename, create=False)
+
+    def test_can_defer_version_check_until_first_db_access(self):
+        db_filename = os.path.join(self.fs.root, 'foo.db')
+        db = SQLiteDB.create_new_db(db_filename, create_file=True)
+        db_version = db.query(DBVersion).one()
+        db_version.version_id = 'v201609'
+        db.commit()
+        db.close()
+
+        db = SQLiteDB.init_with_file(db_filename, model=get_model('v202610'), defer_version_check=True)
+        with assert_raises(ValueError):
+            db.query(db.model.Task).all()
+        db.close()
+
+        db = SQLiteDB.init_with_file(db_filename, model=get_model('v201609'), defer_version_check=True)
+        assert_equals([], db.query(db.model.Task).all())
+        db.close()
+
+    def test_can_defer_model_detection_until_first_db_access(self):
+        db_filename = os.path.join(self.fs.root, 'foo.db')
+        db = SQLiteDB.create_new_db(db_filename, create_file=True, model=get_model('v201609'))
+        db.close()
+
+        detect_model = mock.Mock(wraps=sqlite_db._model_for_db)
+        with mock.patch.object(sqlite_db, '_model_for_db', new=detect_model):
+            db = SQLiteDB.init_with_file(db_filename, defer_version_check=True)
+            assert_equals(0, detect_model.call_count)
+            assert_equals([], db.query(db.model.Task).all())
+            assert_equals(1, detect_model.call_count)
+        assert_equals('v201609', db.model.id)
+        db.close()
+
+        db = SQLiteDB.init_with_file(db_filename, defer_version_check=True)
+        # model detection when the session accesses the DB first
+        assert_equals('v201609', db.session.query(DBVersion).one().version_id)
+        assert_equals('v201609', db.model.id)
+        db.close()
+
+    def test_can_load_db_into_memory_and_store_snapshot(self):
+        db_filename = os.path.join(self.fs.root, 'foo.db')
+        db = SQLiteDB.create_new_db(db_filename, create_file=True)
+        db.session.add(db.model.Task(form_index=0, type_=TaskType.VERIFICATION))
+        db.commit()
+        db.close()
+
+        db = SQLiteDB.open_in_memory(db_filename)
+        assert_length(1, db.query(db.model.Task).all())
+        db.session.add(db.model.Task(form_index=1, type_=TaskType.VERIFICATION))
+        db.commit()
+        assert_equals(1, self._nr_tasks_in_file(db_filename),
+            message='commit must not change the DB file')
+
+        db.session.add(db.model.Task(form_index=2, type_=TaskType.VERIFICATION))
+        db.snapshot()
+        assert_equals(3, self._nr_tasks_in_file(db_filename))
+        assert_equals(['foo.db'], os.listdir(self.fs.root),
+            message='temporary file should be removed')
+        db.close()
+
+    def test_snapshot_keeps_file_mode_and_ignores_leftover_wal(self):
+        db_filename = os.path.join(self.fs.root, 'foo.db')
+        SQLiteDB.create_new_db(db_filename, create_file=True).close()
+        os.chmod(db_filename, 0o640)
+        db = SQLiteDB.open_in_memory(db_filename)
+        db.session.add(db.model.Task(form_index=0, type_=TaskType.VERIFICATION))
+
+        # leftover WAL of the previous file (e.g. after a crash)
+        connection = sqlite3.connect(db_filename)
+        connection.execute('PRAGMA journal_mode = WAL')
+        connection.execute('PRAGMA wal_autocheckpoint = 0')
+        connection.execute('CREATE TABLE foo (bar INTEGER)')
+        connection.commit()
+        shutil.copy(db_filename + '-wal', db_filename + '.wal')
+        connection.close()
+        os.replace(db_filename + '.wal', db_filename + '-wal')
+
+        db.snapshot()
+        db.close()
+        if os.name != 'nt':
+            assert_equals(0o640, stat.S_IMODE(os.stat(db_filename).st_mode))
+        assert_equals(['foo.db'], os.listdir(self.fs.root))
+        assert_equals(1, self._nr_tasks_in_file(db_filename))
+        connection = sqlite3.connect(db_filename)
+        table_names = [row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+        connection.close()
+        assert_not_contains('foo', table_names)
+
+    def test_snapshot_replaces_file_for_dbs_which_are_still_open(self):
+        db_filename = os.path.join(self.fs.root, 'foo.db')
+        SQLiteDB.create_new_db(db_filename, create_file=True).close()
+        db1 = SQLiteDB.init_with_file(db_filename)
+        assert_length(0, db1.session.query(db1.model.Task).all())
+        db1.commit()
+
+        db = SQLiteDB.open_in_memory(db_filename)
+        db.session.add(db.model.Task(form_index=0, type_=TaskType.VERIFICATION))
+        db.snapshot()
+        db.close()
+
+        db2 = SQLiteDB.init_with_file(db_filename)
+        assert_length(1, db2.session.query(db2.model.Task).all())
+        assert_length(1, db1.session.query(db1.model.Task).all())
+        db2.close()
+        db1.close()
+
+    def test_can_create_database_with_indexes_for_per_form_lookups(self):
+        db = SQLiteDB.create_new_db(create_file=False)
+        assert_equals(set(), self._indexed_columns(db, 'tasks'))
+        db.close()
+
+        db = SQLiteDB.create_new_db(create_file=False, revision=LATEST)
+        assert_equals('v202610', db.query(DBVersion).one().version_id)
+        assert_equals({'form_index', 'type_', 'status'}, self._indexed_columns(db, 'tasks'))
+        assert_equals({'form_index', 'field_name', 'error_key'}, self._indexed_columns(db, 'ignored_warnings'))
+        db.close()
+
+    def test_can_open_and_upgrade_db_with_previous_revision(self):
+        db_filename = os.path.join(self.fs.root, 'foo.db')
+        db = SQLiteDB.create_new_db(db_filename, create_file=True, model=get_model('v201609'))
+        db.session.add(db.model.Task(form_index=0, type_=TaskType.VERIFICATION))
+        db.commit()
+        db.close()
+
+        db = SQLiteDB.init_with_file(db_filename)
+        assert_equals('v201609', db.model.id)
+        assert_equals(set(), self._indexed_columns(db, 'tasks'))
+        db.close()
+
+        db = SQLiteDB.init_with_file(db_filename, upgrade=True)
+        assert_equals('v202610', db.model.id)
+        assert_equals('v202610', db.query(DBVersion).one().version_id)
+        assert_equals({'form_index', 'type_', 'status'}, self._indexed_columns(db, 'tasks'))
+        assert_length(1, db.query(db.model.Task).all())
+        db.close()
+
+        with assert_not_raises(ValueError):
+            db = SQLiteDB.init_with_file(db_filename, model=get_model('v202610'))
+        db.close()
+
+    def test_can_apply_pragma_profile(self):
+        db_filename = os.path.join(self.fs.root, 'foo.db')
+        db = SQLiteDB.create_new_db(db_filename, create_file=True, profile='bulk')
+        connection = db.session.connection()
+        assert_equals('wal', connection.execute(text('PRAGMA journal_mode')).scalar())
+        # synchronous=NORMAL
+        assert_equals(1, connection.execute(text('PRAGMA synchronous')).scalar())
+        assert_equals('MEMORY', _temp_store(connection))
+        db.close()
+
+        safe_filename = os.path.join(self.fs.root, 'safe.db')
+        db = SQLiteDB.create_new_db(safe_filename, create_file=True, profile='safe')
+        connection = db.session.connection()
+        assert_equals('delete', connection.execute(text('PRAGMA journal_mode')).scalar())
+        db.close()
+
+    def test_rejects_unknown_pragma_profile(self):
+        with assert_raises(ValueError):
+            SQLiteDB.create_new_db(create_file=False, profile='fast')
+
+    def test_can_add_tasks_in_bulk(self):
+        db = create_sqlite_db()
+        rows = [
+            {'form_index': 0, 'type_': TaskType.VERIFICATION, 'field_name': 'FOO'},
+            {'form_index': 1, 'type_': TaskType.FORM_VALIDATION, 'status': TaskStatus.CLOSED, 'data': {'a': 1}},
+        ]
+        assert_equals(2, db.bulk_add_tasks(rows))
+        assert_true(db.is_dirty())
+        db.commit()
+
+        Task = db.model.Task
+        task0, task1 = db.query(Task).order_by(Task.form_index).all()
+        assert_equals((0, TaskType.VERIFICATION, 'FOO', TaskStatus.NEW, {}),
+            (task0.form_index, task0.type_, task0.field_name, task0.status, task0.data))
+        assert_equals((TaskStatus.CLOSED, {'a': 1}), (task1.status, task1.data))
+        assert_not_none(task0.created)
+
+    def test_can_ignore_warnings_in_bulk_without_duplicates(self):
+        db = create_sqlite_db(ignored_warnings=[(0, 'FOO', 'foo.invalid', 'x')])
+        rows = [
+            (0, 'FOO', 'foo.invalid', 'x'),     # already stored
+            (0, 'FOO', 'foo.invalid', None),
+            (0, 'FOO', 'foo.invalid', None),    # duplicate in input
+            {'form_index': 1, 'field_name': 'BAR', 'error_key': 'bar.missing', 'field_value': ''},
+        ]
+        assert_equals(2, db.bulk_ignore_warnings(rows))
+        db.commit()
+
+        IgnoredWarning = db.model.IgnoredWarning
+        keys = [(w.form_index, w.field_name, w.error_key, w.field_value) for w in db.query(IgnoredWarning)]
+        assert_equals(
+            {(0, 'FOO', 'foo.invalid', 'x'), (0, 'FOO', 'foo.invalid', None), (1, 'BAR', 'bar.missing', '')},
+            set(keys))
+        assert_length(3, keys)
+
+    def _nr_tasks_in_file(self, db_filename):
+        db = SQLiteDB.init_with_file(db_filename)
+        nr_tasks = db.query(db.model.Task).count()
+        db.close()
+        return nr_tasks
+
+    def _indexed_columns(self, db, table_name):
+        inspector = inspect(db.session.connection())
+        column_names = set()
+        for index in inspector.get_indexes(table_name):
+            column_names.update(index['column_names'])
+        return column_names
+
+
+def _temp_store(connection):
+    # 2 = MEMORY
+    value = connection.execute(text('PRAGMA temp_store')).scalar()
+    return {0: 'DEFAULT', 1: 'FILE', 2: 'MEMORY'}[value]
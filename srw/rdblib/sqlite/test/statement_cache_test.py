@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+
+from pythonic_testcase import *
+
+from srw.rdblib import TaskType
+from .. import cached_select, create_sqlite_db, null_attrs
+
+
+class StatementCacheTest(PythonicTestCase):
+    def test_reuses_statement_for_same_filter_combination(self):
+        db = create_sqlite_db()
+        Task = db.model.Task
+        statement = cached_select(Task, ('form_index', 'type_'))
+        assert_is(statement, cached_select(Task, ('form_index', 'type_')))
+        assert_is_not(statement, cached_select(Task, ('form_index',)))
+        assert_is_not(statement, cached_select(Task, ('form_index', 'type_'), first=True))
+
+    def test_can_execute_cached_statement(self):
+        db = create_sqlite_db()
+        Task = db.model.Task
+        db.session.add(Task(form_index=1, type_=TaskType.VERIFICATION))
+        db.session.add(Task(form_index=2, type_=TaskType.VERIFICATION))
+        statement = cached_select(Task, ('form_index',))
+        tasks = db.session.execute(statement, {'form_index': 2}).scalars().all()
+        assert_equals([2], [task.form_index for task in tasks])
+        assert_length(2, db.session.execute(cached_select(Task, ())).scalars().all())
+
+    def test_can_filter_for_null_values(self):
+        db = create_sqlite_db()
+        Task = db.model.Task
+        db.session.add(Task(form_index=1, type_=TaskType.FORM_VALIDATION, field_name=None))
+        db.session.add(Task(form_index=1, type_=TaskType.VERIFICATION, field_name='FOO'))
+        params = {'form_index': 1, 'field_name': None}
+        statement = cached_select(Task, ('field_name', 'form_index'), null_attrs=null_attrs(params))
+        assert_is_not(statement, cached_select(Task, ('field_name', 'form_index')))
+        tasks = db.session.execute(statement, params).scalars().all()
+        assert_equals([TaskType.FORM_VALIDATION], [task.type_ for task in tasks])
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import os
+import threading
+
+from pythonic_testcase import *
+from schwarz.fakefs_helpers import TempFS
+
+from srw.rdblib.cdb import create_cdb_with_dummy_data
+from srw.rdblib.ibf.testutil import create_ibf
+from ..async_batch import AsyncBatch, TaskRow
+from ..mmap_file import MMapFile
+from ..paths import guess_path, DataBunch
+from ..task import TaskStatus, TaskType
+
+
+class AsyncBatchTest(PythonicTestCase):
+    def setUp(self):
+        self.fs = TempFS.set_up(test=self)
+        self.cdb_path = os.path.join(self.fs.root, '00042100.CDB')
+        ibf_path = guess_path(self.cdb_path, type_='ibf')
+        create_cdb_with_dummy_data(nr_forms=2, filename=self.cdb_path, field_names=('FOO',)).close()
+        create_ibf(nr_images=2, filename=ibf_path, create_directory=True).close()
+        self.bunch = DataBunch(self.cdb_path, ibf_path, db=None, ask=None)
+
+    def test_can_access_batch_data(self):
+        async def run():
+            batch = await AsyncBatch.open(self.bunch, create_persistent_db=True)
+            async with batch:
+                tiff_data = await batch.tiff(1)
+                await batch.update_form(1, {'FOO': 'bar'})
+                await batch.commit()
+                form_values = await batch.form(1)
+                tasks = await batch.tasks()
+                expected_tiff = batch.batch.ibf.get_tiff_image(1)
+            assert_true(batch.closed)
+            return tiff_data, expected_tiff, form_values, tasks
+        tiff_data, expected_tiff, form_values, tasks = asyncio.run(run())
+        assert_equals(expected_tiff, tiff_data)
+        assert_equals({'FOO': 'bar'}, form_values)
+        assert_equals([], tasks)
+        # the batch must be closed (no locks)
+        mmap_file = MMapFile(self.cdb_path, access='write')
+        mmap_file.close()
+
+    def test_returns_tasks_which_can_be_used_in_event_loop(self):
+        def add_task(batch):
+            db = batch.db
+            db.session.add(db.Task(1, TaskType.VERIFICATION, field_name='FOO', data={'foo': 42}))
+            db.commit()
+
+        async def run():
+            # in-memory DB: SQLite objects can only be used in one thread
+            batch = await AsyncBatch.open(self.bunch)
+            async with batch:
+                await batch.run(add_task, batch.batch)
+                return await batch.tasks(form_index=1)
+        tasks = asyncio.run(run())
+        assert_length(1, tasks)
+        task = tasks[0]
+        assert_isinstance(task, TaskRow)
+        assert_equals((1, TaskType.VERIFICATION, 'FOO', TaskStatus.NEW),
+            (task.form_index, task.type_, task.field_name, task.status))
+        assert_equals({'foo': 42}, task.data)
+        assert_not_none(task.created)
+
+    def test_runs_all_operations_in_one_thread(self):
+        async def run():
+            batch = await AsyncBatch.open(self.bunch)
+            thread_ids = await asyncio.gather(*[batch.run(threading.get_ident) for _ in range(10)])
+            await batch.close()
+            return thread_ids
+        thread_ids = asyncio.run(run())
+        assert_length(1, set(thread_ids))
+        assert_not_equals(threading.get_ident(), thread_ids[0])
+
+    def test_limits_pending_operations(self):
+        started = []
+        release = threading.Event()
+        def blocking_op(i):
+            started.append(i)
+            release.wait(timeout=5)
+            return i
+
+        async def run():
+            batch = await AsyncBatch.open(self.bunch, max_pending=2)
+            tasks = [asyncio.create_task(batch.run(blocking_op, i)) for i in range(5)]
+            await asyncio.sleep(0.05)
+            # only two operations were submitted to the batch thread
+            is_full = batch._pending.locked()
+            release.set()
+            results = await asyncio.gather(*tasks)
+            await batch.close()
+            return is_full, results
+        is_full, results = asyncio.run(run())
+        assert_true(is_full)
+        assert_equals([0], started[:1])
+        assert_equals([0, 1, 2, 3, 4], results)
+
+    def test_closes_batch_if_caller_is_cancelled(self):
+        async def run():
+            batch = await AsyncBatch.open(self.bunch)
+            release = threading.Event()
+            blocker = asyncio.create_task(batch.run(release.wait, 5))
+            queued = asyncio.create_task(batch.run(threading.get_ident))
+            await asyncio.sleep(0.01)
+            queued.cancel()
+            closing = asyncio.create_task(batch.close())
+            await asyncio.sleep(0.01)
+            closing.cancel()
+            release.set()
+            await blocker
+            with assert_raises(asyncio.CancelledError):
+                await queued
+            with assert_raises(ValueError):
+                await batch.form(0)
+            # wait until the batch thread closed the batch
+            await asyncio.to_thread(batch._executor.shutdown, wait=True)
+        asyncio.run(run())
+        mmap_file = MMapFile(self.cdb_path, access='write')
+        mmap_file.close()
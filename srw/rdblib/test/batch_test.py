@@ -12,7 +12,9 @@ from srw.rdblib.cdb import create_cdb_with_dummy_data
 from srw.rdblib.ibf.testutil import create_ibf
 from .. import TaskStatus, TaskType
 from ..batch import Batch
+from ..batch_form import Source
 from ..sqlite import create_sqlite_db, db_schema, get_model, DELETE
+from ..testutil import create_cdb_and_ibf_file
 
 
 class BatchTest(PythonicTestCase):
@@ -129,6 +131,21 @@ class BatchTest(PythonicTestCase):
         db_form.add_task(type_=TaskType.FORM_VALIDATION, status=TaskStatus.NEW)
         assert_length(1, batch.tasks())
 
+    def test_loads_task_details_on_access(self):
+        batch = self._create_batch(tasks=())
+        batch.db_form(0).add_task(type_=TaskType.FORM_VALIDATION, data={'foo': 'bar'})
+        batch.commit()
+        batch.db.session.expunge_all()
+
+        task, = batch.tasks()
+        assert_not_contains('data', task.__dict__)
+        assert_equals({'foo': 'bar'}, task.data)
+        assert_not_none(task.created)
+
+        batch.db.session.expunge_all()
+        task, = batch.tasks(with_details=True)
+        assert_contains('data', task.__dict__)
+
     def test_can_retrieve_only_selected_tasks(self):
         model = get_model(db_schema.LATEST)
         new_task = model.Task(0, TaskType.FORM_VALIDATION, status=TaskStatus.NEW)
@@ -241,6 +258,105 @@ class BatchTest(PythonicTestCase):
         # the temp dir
         batch.close()
 
+    def test_keeps_only_recently_used_tiff_handlers(self):
+        nr_forms = 3
+        databunch = DataBunch(
+            cdb=create_cdb_with_dummy_data(nr_forms=nr_forms, field_names=('FOO',)),
+            ibf=create_ibf(nr_images=nr_forms, pic_nrs=('1', '2', '3'), fake_tiffs=False),
+            db=create_sqlite_db(),
+            ask=None,
+        )
+        batch = Batch.init_from_bunch(databunch, tiff_handler_cache_size=2)
+        th0 = batch.tiff_handler(0)
+        assert_is(th0, batch.tiff_handler(0))
+        batch.tiff_handler(1)
+        batch.tiff_handler(2)
+
+        assert_length(2, batch.tiff_handlers)
+        assert_is_not(th0, batch.tiff_handler(0))
+        stats = batch.tiff_handlers.stats()
+        assert_equals(1, stats['hits'])
+        assert_equals(4, stats['misses'])
+
+    def test_can_delete_and_undelete_multiple_forms(self):
+        pics = ('12345600100024', '12345600114024', '12345600128024')
+        cdb_path = os.path.join(self.fs.root, '00042100.CDB')
+        create_cdb_and_ibf_file(cdb_path, pic_nrs=pics)
+        bunch = DataBunch(cdb_path, guess_path(cdb_path, type_='ibf'), db=None, ask=None)
+        batch = Batch.init_from_bunch(bunch, create_persistent_db=False, access='write')
+
+        batch.delete_forms([0, 2])
+        batch.close()
+        batch = Batch.init_from_bunch(bunch, create_persistent_db=False, access='write')
+        deletion_state = [batch.batch_form(i).is_deleted(operator=Source.AND) for i in range(3)]
+        assert_equals([True, False, True], deletion_state)
+        assert_equals('DELETED', batch.tiff_handler(0).long_data.rec.page_name)
+
+        batch.undelete_forms([0, 2])
+        batch.close()
+        batch = Batch.init_from_bunch(bunch, create_persistent_db=False, access='write')
+        assert_equals(list(pics), [batch.pic_for_form(i) for i in range(3)])
+        assert_false(batch.batch_form(0).is_deleted())
+        assert_equals(pics[0], batch.tiff_handler(0).long_data.rec.page_name)
+        # close all open files - otherwise Windows won't be able to remove
+        # the temp dir
+        batch.close()
+
+    def test_can_open_batch_for_reading_quickly(self):
+        cdb_path = os.path.join(self.fs.root, '00042100.CDB')
+        batch = self._create_cdbibf_batch(cdb_path, nr_forms=2, create_persistent_db=True)
+        batch.db_form(1).add_task(type_=TaskType.VERIFICATION, field_name='FOO')
+        bunch = batch.bunch
+        batch.close(commit=True)
+
+        batch = Batch.init_from_bunch(bunch, access='read', fast_open=True)
+        assert_equals(2, batch.cdb.count())
+        assert_equals(2, batch.ibf.image_count())
+        assert_length(1, batch.tasks(type_=TaskType.VERIFICATION))
+        # close all open files - otherwise Windows won't be able to remove
+        # the temp dir
+        batch.close()
+
+    def test_can_open_batch_quickly_without_db_file(self):
+        cdb_path = os.path.join(self.fs.root, '00042100.CDB')
+        self._create_cdbibf_batch(cdb_path, nr_forms=2).close()
+        bunch = DataBunch(cdb_path, guess_path(cdb_path, type_='ibf'), db=None, ask=None)
+
+        batch = Batch.init_from_bunch(bunch, fast_open=True)
+        # in-memory DB must be created in the calling thread
+        batch.db_form(1).add_task(type_=TaskType.VERIFICATION, field_name='FOO')
+        assert_length(1, batch.tasks(type_=TaskType.VERIFICATION))
+        batch.close()
+
+    def test_fast_open_does_not_close_db_passed_by_caller(self):
+        cdb_path = os.path.join(self.fs.root, '00042100.CDB')
+        self._create_cdbibf_batch(cdb_path, nr_forms=1).close()
+        db = create_sqlite_db()
+        bunch = DataBunch(cdb_path, os.path.join(self.fs.root, 'missing.IBF'), db=db, ask=None)
+
+        with assert_raises(OSError):
+            Batch.init_from_bunch(bunch, fast_open=True)
+        assert_not_none(db.session)
+        assert_equals([], db.query(db.model.Task).all())
+        db.close()
+
+    def test_can_load_db_into_memory(self):
+        cdb_path = os.path.join(self.fs.root, '00042100.CDB')
+        batch = self._create_cdbibf_batch(cdb_path, nr_forms=1, create_persistent_db=True)
+        bunch = batch.bunch
+        batch.close()
+
+        batch = Batch.init_from_bunch(bunch, db_in_memory=True)
+        batch.db_form(0).add_task(type_=TaskType.VERIFICATION, field_name='FOO')
+        batch.db.snapshot()
+        batch.close()
+
+        batch = Batch.init_from_bunch(bunch)
+        assert_length(1, batch.tasks(type_=TaskType.VERIFICATION))
+        # close all open files - otherwise Windows won't be able to remove
+        # the temp dir
+        batch.close()
+
     # --- helpers -------------------------------------------------------------
 
     def _create_cdbibf_batch(self, cdb_path, nr_forms=1, form0_data=None, create_persistent_db=False):
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+
+from datetime import date as Date
+import json
+import os
+
+from pythonic_testcase import *
+from schwarz.fakefs_helpers import TempFS
+
+from ..batch import Batch
+from ..cdb import open_cdb
+from ..corpus import default_field_names, generate_corpus, generate_corpus_pic, MANIFEST_FILENAME
+from ..ibf import IMAGES_PER_BLOCK
+from ..paths import DataBunch
+from ..tiff import pic_str_from_tiff
+from ..tool import FormBatch
+
+
+class CorpusTest(PythonicTestCase):
+    def setUp(self):
+        self.fs = TempFS.set_up(test=self)
+
+    def test_can_generate_valid_batches(self):
+        nr_forms = IMAGES_PER_BLOCK + 6
+        corpus_batch, = generate_corpus(self.fs.root, 1, nr_forms=nr_forms, seed=42)
+        bunch = DataBunch(corpus_batch.cdb, corpus_batch.ibf, corpus_batch.db, ask=None)
+        batch = Batch.init_from_bunch(bunch, access='read')
+        self.addCleanup(batch.close)
+
+        assert_equals(nr_forms, batch.cdb.count())
+        assert_equals(nr_forms, batch.ibf.image_count())
+        field_names = default_field_names()
+        last_form = batch.form(nr_forms - 1)
+        assert_equals(len(field_names), len(last_form.fields))
+        assert_equals('240000601', last_form['LANR'].value)
+        pic = last_form.cdb_pic_nr
+        assert_equals(pic, batch.ibf.image_entries[nr_forms - 1].rec.codnr)
+        assert_equals(pic, pic_str_from_tiff(batch.ibf.get_tiff_image(nr_forms - 1)))
+        assert_true(len(batch.tasks()) > 0)
+
+    def test_can_generate_corrupted_data(self):
+        corpus_batch, = generate_corpus(self.fs.root, 1, nr_forms=20, corruption_rate=0.5, with_db=False, seed=1)
+        assert_not_equals([], corpus_batch.corrupted_forms)
+        assert_not_equals([], corpus_batch.corrupted_images)
+        assert_none(corpus_batch.db)
+
+        result = open_cdb(corpus_batch.cdb, field_names=default_field_names())
+        assert_false(result)
+        assert_equals(corpus_batch.corrupted_forms[0], result.form_index)
+
+        manifest_path = os.path.join(self.fs.root, MANIFEST_FILENAME)
+        with open(manifest_path) as manifest_fp:
+            manifest = json.load(manifest_fp)
+        batch_info, = manifest['batches']
+        assert_equals(corpus_batch.corrupted_images, batch_info['corrupted_images'])
+
+    def test_generates_unique_pics_for_thousands_of_batches(self):
+        pics = set()
+        for customer_nr in (0, 1, 999, 1000, 1001, 5000):
+            for form_index in (0, 1, 299):
+                pic = generate_corpus_pic(customer_nr, form_index, nr_forms=300)
+                assert_length(14, pic)
+                pics.add(pic)
+        assert_length(18, pics)
+
+    def test_takes_pic_date_from_scan_date(self):
+        pic = generate_corpus_pic(1, 2, nr_forms=300)
+        assert_equals('40100000303024', pic)
+        assert_equals('61000000303024', generate_corpus_pic(1, 2, nr_forms=300, scan_date=Date(2026, 10, 19)))
+
+        corpus_batch, = generate_corpus(self.fs.root, 1, nr_forms=1, with_db=False, scan_date=Date(2025, 3, 1))
+        form_batch = FormBatch(corpus_batch.cdb, access='read')
+        self.addCleanup(form_batch.close)
+        assert_equals('50300000001024', form_batch.forms[0].cdb_pic_nr)
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+import importlib
+import subprocess
+import sys
+from types import ModuleType
+
+from pythonic_testcase import *
+
+import srw.rdblib
+import srw.rdblib.cli
+
+
+# expensive imports which are only needed for SQLite/TIFF creation/formatting
+EXPENSIVE_PACKAGES = ('babel', 'PIL', 'sqlalchemy')
+
+def imported_modules(statement):
+    """Return the names of all modules imported by <statement> (in a new
+    Python process, based on "python -X importtime")."""
+    cmd = [sys.executable, '-X', 'importtime', '-c', statement]
+    proc = subprocess.run(cmd, stderr=subprocess.PIPE, check=True, universal_newlines=True)
+    module_names = set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or ('self [us]' in line):
+            continue
+        # "import time: <self us> | <cumulative us> | <module name>"
+        module_name = line.split('|')[2].strip()
+        module_names.add(module_name)
+    return module_names
+
+
+class ImportTimeTest(PythonicTestCase):
+    def test_cdb_and_ibf_code_does_not_import_expensive_packages(self):
+        statement = '; '.join([
+            'import srw.rdblib',
+            'import srw.rdblib.cdb',
+            'import srw.rdblib.ibf',
+            'import srw.rdblib.tiff',
+            'import srw.rdblib.tool',
+            'from srw.rdblib.cli import delete_image_main, find_broken_form_main',
+        ])
+        modules = imported_modules(statement)
+        assert_contains('srw.rdblib.cdb.cdb_check', modules)
+        expensive_modules = [name for name in modules if name.split('.')[0] in EXPENSIVE_PACKAGES]
+        assert_equals([], expensive_modules)
+
+    def test_lazy_exports_match_modules(self):
+        for package in (srw.rdblib, srw.rdblib.cli):
+            for module_name, names in package._LAZY_EXPORTS.items():
+                module = importlib.import_module(module_name, package.__name__)
+                public_names = {
+                    name for name, value in vars(module).items()
+                    if not name.startswith('_') and not isinstance(value, ModuleType)
+                }
+                exported_names = set(getattr(module, '__all__', public_names))
+                expected_names = exported_names | ({'db_schema'} if module_name == '.sqlite' else set())
+                assert_equals(expected_names, set(names), message=module_name)
+
+    def test_can_access_lazy_attributes(self):
+        from srw.rdblib.batch import Batch
+        from srw.rdblib.sqlite import SQLiteDB
+        assert_is(Batch, srw.rdblib.Batch)
+        assert_is(SQLiteDB, srw.rdblib.SQLiteDB)
+        assert_contains('Batch', dir(srw.rdblib))
+        assert_contains('Batch', srw.rdblib.__all__)
+        with assert_raises(AttributeError):
+            srw.rdblib.does_not_exist
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+
+import os
+import socket
+
+from pythonic_testcase import *
+from schwarz.fakefs_helpers import TempFS
+
+from ..instrumentation import (configure_metrics, instrumented_main, metrics as global_metrics,
+    InMemorySink, Metrics, PrometheusTextfileSink, StatsDSink, METRICS_ENV)
+from ..mmap_file import MMapFile
+
+
+class MetricsTest(PythonicTestCase):
+    def test_ignores_metrics_without_sinks(self):
+        metrics = Metrics()
+        assert_false(metrics.enabled)
+        metrics.incr('foo')
+        metrics.observe('bar', 0.5)
+        with metrics.span('baz') as span:
+            pass
+        assert_not_none(span.duration, message='duration should be available for logging')
+
+    def test_aggregates_metrics_in_memory(self):
+        sink = InMemorySink()
+        metrics = Metrics([sink])
+        metrics.incr('foo')
+        metrics.incr('foo', 2)
+        metrics.observe('bar', 0.5)
+        metrics.observe('bar', 1.5)
+
+        assert_equals({'foo': 3}, sink.counters)
+        histogram = sink.histograms['bar']
+        assert_equals(2, histogram.count)
+        assert_almost_equals(2.0, histogram.total)
+        assert_equals(0.5, histogram.min)
+        assert_equals(1.5, histogram.max)
+
+    def test_records_spans_and_timed_functions(self):
+        sink = InMemorySink()
+        metrics = Metrics([sink])
+        with metrics.span('foo'):
+            pass
+
+        @metrics.timed('bar')
+        def bar(value):
+            return value
+        assert_equals(42, bar(42))
+        assert_equals({'foo', 'bar'}, set(sink.histograms))
+
+    def test_can_remove_sinks(self):
+        metrics = Metrics()
+        sink = metrics.add_sink(InMemorySink())
+        assert_true(metrics.enabled)
+        metrics.remove_sink(sink)
+        assert_false(metrics.enabled)
+
+    def test_can_modify_sinks_while_recording_metrics(self):
+        metrics = Metrics()
+        class SelfRemovingSink(InMemorySink):
+            def counter(self, name, value):
+                metrics.remove_sink(self)
+                super().counter(name, value)
+        first = metrics.add_sink(SelfRemovingSink())
+        second = metrics.add_sink(InMemorySink())
+
+        metrics.incr('foo')
+        assert_equals({'foo': 1}, first.counters)
+        assert_equals({'foo': 1}, second.counters)
+        assert_equals([second], metrics.sinks)
+
+    def test_can_write_prometheus_textfile(self):
+        fs = TempFS.set_up(test=self)
+        prom_path = os.path.join(fs.root, 'srw.prom')
+        sink = PrometheusTextfileSink(prom_path)
+        metrics = Metrics([sink])
+        metrics.incr('tiff_handler.parsed', 3)
+        metrics.observe('mmap_file.open', 0.002)
+        metrics.flush()
+
+        with open(prom_path, 'r') as prom_fp:
+            lines = prom_fp.read().splitlines()
+        assert_contains('srw_tiff_handler_parsed_total 3', lines)
+        assert_contains('srw_mmap_file_open_seconds_bucket{le="0.001"} 0', lines)
+        assert_contains('srw_mmap_file_open_seconds_bucket{le="0.005"} 1', lines)
+        assert_contains('srw_mmap_file_open_seconds_bucket{le="+Inf"} 1', lines)
+        assert_contains('srw_mmap_file_open_seconds_count 1', lines)
+        assert_equals(['srw.prom'], os.listdir(fs.root))
+
+    def test_can_send_metrics_to_statsd(self):
+        server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.addCleanup(server.close)
+        server.bind(('127.0.0.1', 0))
+        server.settimeout(2)
+        host, port = server.getsockname()
+        metrics = Metrics([StatsDSink(host, port)])
+
+        metrics.incr('foo', 2)
+        assert_equals(b'srw.foo:2|c', server.recv(1024))
+        metrics.observe('bar', 0.25)
+        assert_equals(b'srw.bar:250.000|ms', server.recv(1024))
+
+    def test_can_configure_sinks_from_string(self):
+        metrics = Metrics()
+        sinks = configure_metrics('log, memory,prometheus:/tmp/foo.prom,statsd:localhost:9125', metrics=metrics)
+        assert_length(4, sinks)
+        assert_equals(sinks, metrics.sinks)
+        assert_equals('/tmp/foo.prom', sinks[2].path)
+        assert_equals(('localhost', 9125), sinks[3].address)
+
+        with assert_raises(ValueError):
+            configure_metrics('foo', metrics=Metrics())
+
+    def test_instrumented_main_uses_environment_variable(self):
+        fs = TempFS.set_up(test=self)
+        prom_path = os.path.join(fs.root, 'srw.prom')
+        previous_value = os.environ.get(METRICS_ENV)
+        os.environ[METRICS_ENV] = 'prometheus:' + prom_path
+        self.addCleanup(_restore_env, METRICS_ENV, previous_value)
+
+        @instrumented_main('foo')
+        def foo_main(argv):
+            global_metrics.incr('foo.called')
+            return 0
+        assert_equals(0, foo_main([]))
+        assert_false(global_metrics.enabled)
+        with open(prom_path, 'r') as prom_fp:
+            prom_text = prom_fp.read()
+        assert_contains('srw_foo_called_total 1', prom_text.splitlines())
+        assert_true('srw_cli_foo_seconds_count 1' in prom_text)
+
+    def test_mmap_file_records_open_and_lock_duration(self):
+        fs = TempFS.set_up(test=self)
+        path = os.path.join(fs.root, 'foo.bin')
+        with open(path, 'wb') as fp:
+            fp.write(b'\x00' * 100)
+        sink = global_metrics.add_sink(InMemorySink())
+        self.addCleanup(global_metrics.remove_sink, sink)
+
+        MMapFile(path, access='read').close()
+        assert_equals(1, sink.histograms['mmap_file.open'].count)
+        assert_equals(1, sink.histograms['mmap_file.lock'].count)
+
+
+def _restore_env(name, value):
+    if value is None:
+        os.environ.pop(name, None)
+    else:
+        os.environ[name] = value
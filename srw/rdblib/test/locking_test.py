@@ -1,15 +1,18 @@
 # -*- coding: utf-8 -*-
 from __future__ import division, absolute_import, print_function, unicode_literals
 
+import asyncio
 import os
 import subprocess
 import sys
 import tempfile
+import threading
 import time
 
 from pythonic_testcase import *
 
-from ..locking import acquire_lock, is_windows, unlock
+from ..instrumentation import metrics, InMemorySink
+from ..locking import acquire_lock, acquire_lock_async, is_windows, unlock
 
 
 def unlink_with_retry(filename, tries=10):
@@ -70,6 +73,57 @@ class LockingTest(PythonicTestCase):
             fp.close()
         self.assert_is_unlocked(temp_name)
 
+    def test_can_wait_for_lock_with_timeout(self):
+        if is_windows:
+            self.skipTest('Windows does not allow opening the file twice')
+        sink = metrics.add_sink(InMemorySink())
+        self.addCleanup(metrics.remove_sink, sink)
+        fp, other_fp = self._open_locked_file()
+
+        start = time.monotonic()
+        assert_false(acquire_lock(fp, raise_on_error=False, timeout=0.05))
+        assert_true(time.monotonic() - start >= 0.05)
+        with assert_raises(OSError):
+            acquire_lock(fp, timeout=0.01)
+        assert_equals(2, sink.counters['locking.failed'])
+
+        threading.Timer(0.05, unlock, args=(other_fp,)).start()
+        assert_true(acquire_lock(fp, timeout=5))
+        assert_equals(3, sink.counters['locking.contended'])
+        assert_equals(3, sink.histograms['locking.wait'].count)
+        unlock(fp)
+
+    def test_can_wait_for_lock_without_blocking_event_loop(self):
+        if is_windows:
+            self.skipTest('Windows does not allow opening the file twice')
+        fp, other_fp = self._open_locked_file()
+
+        async def release_lock():
+            await asyncio.sleep(0.05)
+            unlock(other_fp)
+            return 'released'
+
+        async def run():
+            return await asyncio.gather(
+                acquire_lock_async(fp, timeout=5),
+                release_lock(),
+            )
+        # "release_lock()" can only run if "acquire_lock_async()" does not
+        # block the event loop.
+        assert_equals([True, 'released'], asyncio.run(run()))
+        unlock(fp)
+        assert_true(asyncio.run(acquire_lock_async(other_fp)))
+
+    def _open_locked_file(self):
+        self.tempfp = tempfile.NamedTemporaryFile(mode='w', delete=False)
+        self.tempfp.close()
+        other_fp = open(self.tempfp.name)
+        self.addCleanup(other_fp.close)
+        acquire_lock(other_fp)
+        fp = open(self.tempfp.name)
+        self.addCleanup(fp.close)
+        return fp, other_fp
+
     def assert_is_locked(self, filename, exclusive_lock=True, message=None):
         is_locked = self.is_locked(filename, exclusive_lock=exclusive_lock)
         assert_true(is_locked, message=(message or 'file %r should be locked' % filename))
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+
+from pythonic_testcase import *
+
+from ..lru_cache import LRUCache
+
+
+class LRUCacheTest(PythonicTestCase):
+    def test_evicts_least_recently_used_item(self):
+        cache = LRUCache(maxsize=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        assert_equals(1, cache.get('a'))
+        cache.put('c', 3)
+
+        assert_equals(2, len(cache))
+        assert_contains('a', cache)
+        assert_not_contains('b', cache)
+        assert_equals(1, cache.evictions)
+
+    def test_counts_hits_and_misses(self):
+        cache = LRUCache(maxsize=2)
+        assert_none(cache.get('a'))
+        cache.put('a', 1)
+        assert_equals(1, cache.get('a'))
+        assert_equals(1, cache.get('a'))
+
+        stats = cache.stats()
+        assert_equals(2, stats['hits'])
+        assert_equals(1, stats['misses'])
+        assert_equals(1, stats['size'])
+
+    def test_can_disable_caching(self):
+        cache = LRUCache(maxsize=0)
+        cache.put('a', 1)
+        assert_equals(0, len(cache))
+
+    def test_can_use_unbounded_cache(self):
+        cache = LRUCache(maxsize=None)
+        for i in range(1000):
+            cache.put(i, i)
+        assert_equals(1000, len(cache))
+        assert_equals(0, cache.evictions)
+
+    def test_calls_eviction_callback(self):
+        evicted = []
+        cache = LRUCache(maxsize=1, on_evict=lambda key, value: evicted.append((key, value)))
+        cache.put('a', 1)
+        cache.put('b', 2)
+        assert_equals([('a', 1)], evicted)
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+from concurrent.futures import ThreadPoolExecutor
+import os
+
+from pythonic_testcase import *
+from schwarz.fakefs_helpers import TempFS
+
+from ..cdb import create_cdb_with_dummy_data
+from ..ibf import ImageBatch
+from ..ibf.testutil import create_ibf
+from ..mapping_pool import MappingPool
+from ..mmap_file import MMapFile
+from ..tool import FormBatch
+from ..utils import filecontent
+
+
+class MappingPoolTest(PythonicTestCase):
+    def setUp(self):
+        self.fs = TempFS.set_up(test=self)
+        self.path = os.path.join(self.fs.root, 'foo.bin')
+        with open(self.path, 'wb') as fp:
+            fp.write(b'hallo')
+        self.pool = MappingPool()
+
+    def test_shares_mapping_until_last_view_is_closed(self):
+        view1 = self.pool.open(self.path)
+        view2 = self.pool.open(self.path)
+        assert_is(view1.mapping, view2.mapping)
+        assert_equals(1, len(self.pool))
+        assert_equals(b'hallo', filecontent(view2)[:])
+        assert_equals(b'ha', filecontent(view2, size=2))
+
+        mmap_file = view1.mapping
+        view1.close()
+        view1.close()
+        assert_true(view1.closed)
+        assert_false(mmap_file.closed)
+        with assert_raises(ValueError):
+            view1.mapping
+
+        view2.close()
+        assert_true(mmap_file.closed)
+        assert_equals(0, len(self.pool))
+
+    def test_holds_shared_lock_while_mapping_is_used(self):
+        if os.name == 'nt':
+            self.skipTest('flock() semantics differ on Windows')
+        view = self.pool.open(self.path)
+        with assert_raises(OSError):
+            MMapFile(self.path, access='write')
+        # readers can still access the file
+        MMapFile(self.path, access='read').close()
+
+        view.close()
+        MMapFile(self.path, access='write').close()
+
+    def test_uses_new_mapping_for_modified_file(self):
+        view1 = self.pool.open(self.path)
+        with open(self.path + '.new', 'wb') as fp:
+            fp.write(b'world!')
+        os.replace(self.path + '.new', self.path)
+
+        view2 = self.pool.open(self.path)
+        assert_is_not(view1.mapping, view2.mapping)
+        assert_equals(b'hallo', view1.mapping[:])
+        assert_equals(b'world!', view2.mapping[:])
+        assert_equals(2, len(self.pool))
+        view1.close()
+        view2.close()
+        assert_equals(0, len(self.pool))
+
+    def test_can_share_mappings_between_threads(self):
+        def read_file(_):
+            view = self.pool.open(self.path)
+            content = view.mapping[:]
+            return view, content
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(read_file, range(20)))
+        views = [view for view, content in results]
+        assert_equals({b'hallo'}, set(content for view, content in results))
+        assert_equals(1, len({id(view.mapping) for view in views}))
+        for view in views:
+            view.close()
+        assert_equals(0, len(self.pool))
+
+    def test_can_open_image_and_form_batches_with_pool(self):
+        ibf_path = os.path.join(self.fs.root, '00000001.IBF')
+        create_ibf(nr_images=2, filename=ibf_path).close()
+        ibf1 = ImageBatch(ibf_path, access='read', mapping_pool=self.pool)
+        ibf2 = ImageBatch(ibf_path, access='read', mapping_pool=self.pool)
+        assert_equals(ibf1.get_tiff_image(1), ibf2.get_tiff_image(1))
+        assert_equals(1, len(self.pool))
+        ibf1.close()
+        ibf2.close()
+
+        cdb_path = os.path.join(self.fs.root, '00000001.CDB')
+        cdb_fp = create_cdb_with_dummy_data(nr_forms=2, filename=cdb_path, field_names=('FOO',))
+        cdb_fp.close()
+        form_batch = FormBatch(cdb_path, access='read', mapping_pool=self.pool)
+        assert_length(2, form_batch.forms)
+        assert_equals(cdb_path, form_batch.batch_filename)
+        form_batch.close()
+        assert_equals(0, len(self.pool))
@@ -2,13 +2,16 @@
 from __future__ import division, absolute_import, print_function, unicode_literals
 
 import io
+import mmap
 import os
 import tempfile
+from unittest import mock
 
 from ddt import ddt as DataDrivenTestCase, data
 from pythonic_testcase import *
 import six
 
+from ..locking import has_range_locks
 from ..mmap_file import MMapFile
 
 
@@ -38,3 +41,55 @@ class MMapFileTest(PythonicTestCase):
         with assert_raises(ValueError):
             mm[0] = 0
         assert_equals('halXh', open(self.temp_fname).read())
+
+    @data('sequential', 'random', 'willneed')
+    def test_can_pass_access_pattern(self, access_pattern):
+        mm = MMapFile(self.temp_fname, 'read', access_pattern=access_pattern, fadvise=True)
+        assert_equals(b'hallo', mm[:])
+        mm.close()
+
+    def test_rejects_unknown_access_pattern(self):
+        with assert_raises(ValueError):
+            MMapFile(self.temp_fname, 'read', access_pattern='foo')
+
+    def test_ignores_failing_access_hints(self):
+        if not hasattr(mmap, 'MADV_RANDOM'):
+            self.skipTest('madvise() not available')
+        # invalid flag: "madvise()" raises an OSError
+        with mock.patch.object(mmap, 'MADV_RANDOM', 9999):
+            mm = MMapFile(self.temp_fname, 'read', access_pattern='random')
+        assert_equals(b'hallo', mm[:])
+        mm.close()
+
+    def test_can_use_byte_range_locks(self):
+        if not has_range_locks:
+            self.skipTest('byte-range locks are not supported on this platform')
+        mm = MMapFile(self.temp_fname, 'write', byte_range_locks=True)
+        assert_true(mm.byte_range_locks)
+        # other writers must use byte-range locks as well
+        with assert_raises(OSError):
+            MMapFile(self.temp_fname, 'write')
+        other = MMapFile(self.temp_fname, 'write', byte_range_locks=True)
+        mm.lock_range(0, 2)
+        # the lock belongs to the open file (not to the process)
+        with assert_raises(OSError):
+            other.lock_range(0, 2)
+        mm[0:2] = b'HA'
+        mm.unlock_range(0, 2)
+        other.close()
+        mm.close()
+        assert_equals('HAllo', open(self.temp_fname).read())
+
+        with assert_raises(ValueError):
+            MMapFile(self.temp_fname, 'read', byte_range_locks=True)
+        mm = MMapFile(self.temp_fname, 'write')
+        with assert_raises(ValueError):
+            mm.lock_range(0, 2)
+        mm.close()
+
+    def test_rejects_byte_range_locks_if_not_supported(self):
+        with mock.patch('srw.rdblib.mmap_file.has_range_locks', new=False):
+            with mock.patch('srw.rdblib.mmap_file.io.open') as open_:
+                with assert_raises(ValueError):
+                    MMapFile(self.temp_fname, 'write', byte_range_locks=True)
+        assert_false(open_.called)
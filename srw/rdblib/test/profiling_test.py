@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+
+from contextlib import redirect_stderr
+from io import StringIO
+import os
+import pstats
+import tracemalloc
+
+from pythonic_testcase import *
+from schwarz.fakefs_helpers import TempFS
+
+from ..instrumentation import instrumented_main, metrics, Metrics
+from ..profiling import pop_profiling_options, profile_call, PhaseTimingsSink
+
+
+class ProfilingTest(PythonicTestCase):
+    def setUp(self):
+        self.fs = TempFS.set_up(test=self)
+
+    def test_can_remove_profiling_options_from_argv(self):
+        assert_equals((['foo', 'bar'], None, False), pop_profiling_options(['foo', 'bar']))
+        assert_equals((['foo'], 'cprofile', True), pop_profiling_options(['foo', '--profile', '--timings']))
+        assert_equals((['foo'], 'tracemalloc', False), pop_profiling_options(['foo', '--profile=tracemalloc']))
+        assert_equals((['foo', '--', '--timings'], None, False), pop_profiling_options(['foo', '--', '--timings']))
+        with assert_raises(ValueError):
+            pop_profiling_options(['foo', '--profile=bar'])
+
+    def test_can_collect_phase_timings(self):
+        sink = PhaseTimingsSink()
+        metrics_ = Metrics([sink])
+        with metrics_.span('cli.foo'):
+            with metrics_.span('mmap_file.open'):
+                with metrics_.span('mmap_file.lock'):
+                    pass
+            with metrics_.span('cdb.commit'):
+                pass
+
+        seconds = sink.phase_seconds
+        assert_almost_equals(sink.total, sum(seconds.values()))
+        assert_true(all(value >= 0 for value in seconds.values()))
+        assert_true(seconds['open'] > 0)
+        assert_true(seconds['lock'] > 0)
+        assert_true(seconds['flush'] > 0)
+        assert_equals(0, seconds['parse'])
+        report_lines = sink.format_report().splitlines()
+        assert_length(1 + 5 + 1, report_lines)
+
+    def test_can_profile_with_cprofile(self):
+        profile_path = os.path.join(self.fs.root, 'foo.pstats')
+        summary = StringIO()
+        result = profile_call(lambda: sum(range(100)), 'cprofile', profile_path=profile_path, stream=summary)
+
+        assert_equals(4950, result)
+        assert_true(pstats.Stats(profile_path).total_calls > 0)
+        assert_true('foo.pstats' in summary.getvalue())
+
+    def test_can_profile_with_tracemalloc(self):
+        profile_path = os.path.join(self.fs.root, 'foo.tracemalloc')
+        summary = StringIO()
+        result = profile_call(lambda: [b'x' * 1000 for _ in range(100)], 'tracemalloc',
+            profile_path=profile_path, stream=summary)
+
+        assert_length(100, result)
+        assert_false(tracemalloc.is_tracing())
+        snapshot = tracemalloc.Snapshot.load(profile_path)
+        assert_not_equals(0, len(snapshot.traces))
+        assert_true('foo.tracemalloc' in summary.getvalue())
+
+    def test_instrumented_main_handles_profiling_options(self):
+        calls = []
+        @instrumented_main('foo')
+        def foo_main(argv):
+            calls.append(argv)
+            with metrics.span('mmap_file.open'):
+                pass
+            return 0
+
+        stderr = StringIO()
+        cwd = os.getcwd()
+        os.chdir(self.fs.root)
+        self.addCleanup(os.chdir, cwd)
+        with redirect_stderr(stderr):
+            assert_equals(0, foo_main(['foo', '--timings', '--profile', 'bar']))
+
+        assert_equals([['foo', 'bar']], calls)
+        assert_false(metrics.enabled)
+        assert_true('Laufzeit nach Phasen' in stderr.getvalue())
+        profile_files = os.listdir(self.fs.root)
+        assert_length(1, profile_files)
+        assert_true(profile_files[0].startswith('foo-'))
+        assert_true(profile_files[0].endswith('.pstats'))
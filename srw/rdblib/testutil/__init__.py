@@ -10,6 +10,7 @@ from ..batch import Batch
 from ..cdb import create_cdb_with_form_values, CDBFile, CDBForm
 from ..ibf.testutil import create_ibf
 from ..lib import AttrDict, PIC
+from ..lru_cache import LRUCache
 from ..paths import assemble_new_path, guess_path, DataBunch
 from ..sqlite import create_sqlite_db
 from .bindiff import colorized_diff
@@ -75,7 +76,8 @@ def ibf_mock(pics):
         return data
     return AttrDict(
         image_entries=[_create_entry(pic) for pic in pics],
-        update_entry = lambda x: None
+        update_entry = lambda x, flush=True: None,
+        flush = lambda: None,
     )
 
 def fake_tiff_handler(pic):
@@ -113,7 +115,10 @@ def batch_with_pic_forms(pics, *, model=None):
     )
     batch = Batch.init_from_bunch(databunch, create_persistent_db=False, access='read')
     batch.ibf = ibf_mock(pics)
-    batch._tiff_handlers = [fake_tiff_handler(pic) for pic in pics]
+    # unbounded cache: evicted fake handlers could not be recreated
+    batch._tiff_handlers = LRUCache(maxsize=None)
+    for form_index, pic in enumerate(pics):
+        batch._tiff_handlers.put(form_index, fake_tiff_handler(pic))
     return batch
 
 
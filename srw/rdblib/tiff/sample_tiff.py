@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+"""
+Walther TIFFs based on the sample scan shipped with rdblib ("dummy.tiff"),
+e.g. for synthetic batches (see "corpus") and tests.
+"""
+
+from pathlib import Path
+
+from .tiff_file import TiffFile
+from .tiff_util import get_tiff_img_data
+from .walther_tiff import WaltherTiff
+
+
+__all__ = ['create_dual_page_tiff_file', 'path_sample_tiff']
+
+def path_sample_tiff():
+    tiff_path = Path(__file__).parent / 'dummy.tiff'
+    return tiff_path.resolve()
+
+def create_dual_page_tiff_file(pic_str):
+    # both pages use the image data of the first page of the sample scan
+    tiff_data, _ = get_tiff_img_data(path_sample_tiff())
+    width, height = tiff_data.width, tiff_data.height
+    tiff_img1 = WaltherTiff.create(width=width, height=height, img_data=tiff_data.img_data, pic=pic_str)
+    tiff_img2 = WaltherTiff.create(width=width, height=height, img_data=tiff_data.img_data, pic=pic_str)
+    tiff_file = TiffFile(tiff_images=[tiff_img1, tiff_img2])
+    return tiff_file
@@ -12,7 +12,7 @@ class TiffTag:
     def __init__(self, tag_id, tag_value):
         self.tag_id = tag_id
         self.tag_value = tag_value
-        self._writer = BinaryFormat(self.spec)
+        self._encoder = tag_encoder(tag_id)
 
     spec = (
         ('tag_id',            'H'),    # well-known IDs defined in the TIFF specification, see TiffTags
@@ -23,42 +23,63 @@ class TiffTag:
 
     @property
     def size(self):
-        return self._writer.size
+        return TAG_SIZE
 
     def to_bytes(self, long_offset=0):
-        tag_type = TiffTags[self.tag_id].type
-        field_size = FieldType.data_for(tag_type).get('bytes')
-        is_len_field = (field_size is len)
-        if is_len_field or (field_size > 4):
-            nr_values = len(self.tag_value) if is_len_field else 1
-            extra_values = ()
-            data_or_offset = long_offset
-            if tag_type == FT.ASCII:
-                long_spec = '%ds' % nr_values
-            elif tag_type == FT.RATIONAL:
-                long_spec = 'ii'
-                # just assume we only have to deal with integers here (denominator = 1)
-                extra_values = (1,)
-            else:
-                raise NotImplementedError('tag_type: %r' % FieldType.constant_for(tag_type))
-            long_data = struct.pack('<' + long_spec, self.tag_value, *extra_values)
-        else:
+        return self._encoder.encode(self.tag_value, long_offset=long_offset)
+
+
+class TagEncoder:
+    """Serializes values for a single tag id.
+
+    All lookups which only depend on the tag id (field type, size class,
+    struct for the "long" data) are done once when the encoder is created so
+    encoding a tag value only requires one or two "pack()" calls.
+    """
+    def __init__(self, tag_id):
+        self.tag_id = tag_id
+        self.tag_type = TiffTags[tag_id].type
+        field_size = FieldType.data_for(self.tag_type).get('bytes')
+        self.is_len_field = (field_size is len)
+        self.is_long = self.is_len_field or (field_size > 4)
+        self.long_struct = None
+        self.extra_values = ()
+        if self.tag_type == FT.RATIONAL:
+            self.long_struct = struct.Struct('<ii')
+            # just assume we only have to deal with integers here (denominator = 1)
+            self.extra_values = (1,)
+        elif self.is_long and (self.tag_type != FT.ASCII):
+            raise NotImplementedError('tag_type: %r' % FieldType.constant_for(self.tag_type))
+
+    def encode(self, tag_value, long_offset=0):
+        if not self.is_long:
             # nr_values = 1 is a simplification which matches our legacy
             # software
+            tag_bytes = _tag_struct.pack(self.tag_id, self.tag_type, 1, tag_value)
+            return tag_bytes, b''
+
+        if self.is_len_field:
+            # ASCII: "struct.pack('%ds' % len(value), value)" would just
+            # return the (byte) value itself.
+            nr_values = len(tag_value)
+            long_data = bytes(tag_value)
+        else:
             nr_values = 1
-            data_or_offset = self.tag_value
-            long_data = b''
+            long_data = self.long_struct.pack(tag_value, *self.extra_values)
+        tag_bytes = _tag_struct.pack(self.tag_id, self.tag_type, nr_values, long_offset)
+        return tag_bytes, long_data
 
-        tag_attrs = {
-            'tag_id': self.tag_id,
-            'tag_type': tag_type,
-            'nr_values': nr_values,
-            'data': data_or_offset,
-        }
-        return self._writer.to_bytes(tag_attrs), long_data
 
+_tag_struct = struct.Struct(BinaryFormat(TiffTag.spec).format_string)
+_tag_encoders = {}
 
+def tag_encoder(tag_id):
+    encoder = _tag_encoders.get(tag_id)
+    if encoder is None:
+        encoder = TagEncoder(tag_id)
+        _tag_encoders[tag_id] = encoder
+    return encoder
 
-# 12 bytes
-TAG_SIZE = BinaryFormat(TiffTag.spec).size
 
+# 12 bytes
+TAG_SIZE = _tag_struct.size
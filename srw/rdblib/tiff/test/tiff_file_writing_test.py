@@ -7,7 +7,7 @@ from pythonic_testcase import *
 
 from srw.rdblib.binary_format import BinaryFormat
 from ..tag_specification import FT
-from ..tiff_file import TiffFile, TiffImage
+from ..tiff_file import sort_by_list, TiffFile, TiffImage
 from ..testutil import (adapt_values, calc_offset, ifd_data, load_tiff_dummy_img,
     tag_StripByteCounts, tag_StripOffsets, star_extract as _se)
 from ..tiff_util import pad_tiff_bytes
@@ -75,3 +75,8 @@ class TiffWritingTest(PythonicTestCase):
         assert_equals(img.size, pillow_img.size)
         assert_equals(2, pillow_img.n_frames)
 
+
+    def test_sort_by_list_uses_ordering_and_default_position(self):
+        ordering = (282, 283)
+        assert_equals([282, 283, 256, 269], sort_by_list([269, 283, 256, 282], ordering, default=9999))
+        assert_equals([256, 269, 282, 283], sort_by_list([269, 283, 256, 282], ordering, default=-1))
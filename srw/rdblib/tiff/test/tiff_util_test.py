@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+
+from io import BytesIO
+
+from PIL import Image
+from pythonic_testcase import *
+
+from ..tag_specification import TIFF_TAG as TT
+from ..testutil import create_dual_page_tiff_file, load_tiff_dummy_bytes
+from ..tiff_file import TiffFile
+from ..tiff_util import get_tiff_img_data, parse_tiff_tags
+
+
+
+class TiffUtilTest(PythonicTestCase):
+    def test_can_extract_image_data_without_decoding(self):
+        tiff_bytes = load_tiff_dummy_bytes()
+        data1, data2 = get_tiff_img_data(BytesIO(tiff_bytes))
+
+        pillow_img = Image.open(BytesIO(tiff_bytes))
+        for tiff_data in (data1, data2):
+            tags = dict(pillow_img.tag_v2.items())
+            assert_equals(tags[TT.ImageWidth], tiff_data.width)
+            assert_equals(tags[TT.ImageLength], tiff_data.height)
+            img_offset, = tags[TT.StripOffsets]
+            img_size, = tags[TT.StripByteCounts]
+            assert_isinstance(tiff_data.img_data, memoryview)
+            assert_equals(tiff_bytes[img_offset:img_offset+img_size], tiff_data.img_data)
+            if pillow_img.tell() == 0:
+                pillow_img.seek(1)
+
+    def test_returns_single_tiff_data_for_single_page_tiff(self):
+        tiff_file = create_dual_page_tiff_file('12345')
+        single_page_file = TiffFile(tiff_images=tiff_file.tiff_images[:1])
+        tiff_data = get_tiff_img_data(single_page_file.to_bytes())
+
+        expected_img = tiff_file.tiff_images[0]
+        assert_equals(expected_img.tags[TT.ImageWidth], tiff_data.width)
+        assert_equals(expected_img.img_data, tiff_data.img_data)
+
+    def test_can_parse_tiff_tags(self):
+        tiff_file = create_dual_page_tiff_file('12345')
+        tags1, tags2 = parse_tiff_tags(tiff_file.to_bytes())
+
+        assert_equals(27, len(tags1))
+        assert_equals((200,), tags1[TT.XResolution])
+        assert_equals('12345', tags1[TT.PageName].rstrip('\x00'))
+        assert_equals(tags1[TT.PageName], tags2[TT.PageName])
+        assert_not_equals(tags1[TT.StripOffsets], tags2[TT.StripOffsets])
+
+    def test_rejects_non_tiff_data(self):
+        with assert_raises(ValueError):
+            parse_tiff_tags(b'GIF89a' + b'\x00' * 10)
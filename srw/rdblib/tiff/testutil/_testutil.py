@@ -1,12 +1,12 @@
 # -*- coding: utf-8 -*-
 
 from collections import namedtuple
-from pathlib import Path
 import struct
 
 from srw.rdblib.binary_format import BinaryFormat
 from ..tag_specification import FT, TIFF_TAG as TT
 from ..tags import TiffTag, TAG_SIZE
+from ..sample_tiff import path_sample_tiff
 from ..tiff_util import get_tiff_img_data
 from ..walther_tiff import inject_pic_in_tiff
 
@@ -73,9 +73,7 @@ def ifd_data(nr_tags, tag_data, long_data=None):
 
 
 def path_dummy_tiff():
-    rdblib_tiff_path = Path(__file__).parent
-    tiff_data_path = rdblib_tiff_path / 'dummy.tiff'
-    return tiff_data_path.resolve()
+    return path_sample_tiff()
 
 # support for pyfakefs
 def blend_in_tiff_dummy(fs):
@@ -2,8 +2,6 @@
 from io import BytesIO
 import os
 
-from PIL import Image
-
 from ..lib import PIC
 from .tag_specification import TIFF_TAG as TT
 
@@ -39,6 +37,10 @@ def is_pillow_img(obj):
     return hasattr(obj, 'im')
 
 def _build_pillow_img_from_data(path_or_bytes):
+    # pillow is only required to read the TIFF tags so other users of the
+    # tiff code do not have to pay the import cost.
+    from PIL import Image
+
     if is_pillow_img(path_or_bytes):
         pillow_img = path_or_bytes
         return pillow_img
@@ -3,7 +3,7 @@ from collections import OrderedDict
 from io import BytesIO
 import struct
 
-from .tags import TiffTag, TAG_SIZE
+from .tags import tag_encoder, TAG_SIZE
 from .tag_specification import TIFF_TAG as TT
 from ..binary_format import BinaryFormat
 
@@ -80,16 +80,9 @@ class TiffImage:
             # StripByteCounts (= length of image for our limited case)
             tags[TT.StripByteCounts] = len(self.img_data)
         nr_tags = len(tags)
-        ifd_spec = (
-            ('nr_tags',           'H'),
-            ('tag_data',          '%ds' % (nr_tags * TAG_SIZE)),
-            ('next_ifd',          'i'),
-        )
-        ifd_writer = BinaryFormat(ifd_spec)
-        ifd_size = ifd_writer.size
-
-        tag_data_bytes = b''
-        long_data = b''
+        ifd_size = _nr_tags_struct.size + (nr_tags * TAG_SIZE) + _next_ifd_struct.size
+
+        long_data = []
         long_offset = offset + ifd_size
 
         tag_id_bytes = {}
@@ -105,9 +98,9 @@ class TiffImage:
             if (tag_id == TT.StripOffsets) and (value_strip_offsets is TT.AUTO):
                 continue
             tag_value = tags[tag_id]
-            tag_bytes, tag_long_data = TiffTag(tag_id, tag_value).to_bytes(long_offset=long_offset)
+            tag_bytes, tag_long_data = tag_encoder(tag_id).encode(tag_value, long_offset=long_offset)
             tag_id_bytes[tag_id] = tag_bytes
-            long_data += tag_long_data
+            long_data.append(tag_long_data)
             long_offset += len(tag_long_data)
 
         img_pre_padding = b''
@@ -117,28 +110,25 @@ class TiffImage:
             strip_offset = long_offset + 6
             nr_pad_bytes = strip_offset - long_offset
             img_pre_padding = nr_pad_bytes * b'\x00'
-            tag_bytes, tag_long_data = TiffTag(273, strip_offset).to_bytes()
+            tag_bytes, tag_long_data = tag_encoder(TT.StripOffsets).encode(strip_offset)
             assert (not tag_long_data)
             tag_id_bytes[TT.StripOffsets] = tag_bytes
 
         # the legacy software uses an arbitrary ordering of tags so we just
         # use the order as specified by the caller.
-        for tag_id in tags:
-            tag_bytes = tag_id_bytes[tag_id]
-            tag_data_bytes += tag_bytes
+        tag_data_bytes = b''.join([tag_id_bytes[tag_id] for tag_id in tags])
 
         offset_next_ifd = 0
         if not is_last_image:
             # long_offset was incremented when tag values were serialized above
             offset_end_of_long_data = long_offset
-            offset_next_ifd = offset_end_of_long_data + len(img_pre_padding + self.img_data)
-        ifd_values = {
-            'nr_tags': nr_tags,
-            'tag_data': tag_data_bytes,
-            'next_ifd': offset_next_ifd,
-        }
-        ifd_bytes = ifd_writer.to_bytes(ifd_values)
-        fp.write(ifd_bytes + long_data + img_pre_padding + self.img_data)
+            offset_next_ifd = offset_end_of_long_data + len(img_pre_padding) + len(self.img_data)
+        fp.write(_nr_tags_struct.pack(nr_tags))
+        fp.write(tag_data_bytes)
+        fp.write(_next_ifd_struct.pack(offset_next_ifd))
+        fp.write(b''.join(long_data))
+        fp.write(img_pre_padding)
+        fp.write(self.img_data)
 
     def to_bytes(self, **tiff_args):
         buffer = BytesIO()
@@ -147,8 +137,15 @@ class TiffImage:
         return buffer.read()
 
 
+# "ifd" structure: nr_tags + tag data + next_ifd
+_nr_tags_struct = struct.Struct('<H')
+_next_ifd_struct = struct.Struct('<i')
+
+
 def sort_by_list(values, ordering, default=-1):
-    index_of = lambda v: ordering.index(v) if (v in ordering) else default
-    sort_keys = [index_of(v) for v in values]
+    # single pass over "ordering" so the sort itself only needs dict lookups
+    # (".index()" for every value would be quadratic)
+    position = {v: idx for (idx, v) in enumerate(ordering)}
+    sort_keys = [position.get(v, default) for v in values]
     return [v for (_, v) in sorted(zip(sort_keys, values))]
 
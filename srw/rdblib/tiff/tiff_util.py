@@ -1,14 +1,12 @@
-
 from collections import namedtuple
-from io import BytesIO
-
-from PIL import Image
+from fractions import Fraction
+import struct
 
-from .tag_specification import TIFF_TAG as TT
+from .tag_specification import FT, TIFF_TAG as TT
 from srw.rdblib.utils import pad_bytes
 
 
-__all__ = ['get_tiff_img_data', 'pad_tiff_bytes']
+__all__ = ['get_tiff_img_data', 'pad_tiff_bytes', 'parse_tiff_tags', 'tiff_data_from_tags']
 
 def pad_tiff_bytes(value, length):
     data = b''
@@ -25,24 +23,27 @@ def pad_tiff_bytes(value, length):
 
 def get_tiff_img_data(tiff_path_or_fp):
     """Return the actual tiff image data (without tiff tags and other tiff
-    metadata for a given 2-page tiff file with tags)."""
-    if hasattr(tiff_path_or_fp, 'read'):
+    metadata for a given 2-page tiff file with tags).
+
+    The image data is returned as a memoryview slice of the TIFF bytes: The
+    (G4 compressed) pixel data is never decoded.
+    """
+    if isinstance(tiff_path_or_fp, (bytes, bytearray, memoryview)):
+        tiff_bytes = tiff_path_or_fp
+    elif hasattr(tiff_path_or_fp, 'read'):
         tiff_fp = tiff_path_or_fp
         tiff_bytes = tiff_fp.read()
         tiff_fp.seek(0)
     else:
         tiff_path = tiff_path_or_fp
-        with tiff_path.open('rb') as tiff_fp:
+        with open(tiff_path, 'rb') as tiff_fp:
             tiff_bytes = tiff_fp.read()
-        tiff_fp = BytesIO(tiff_bytes)
 
+    tiff_buffer = memoryview(tiff_bytes)
     _data = []
-    with Image.open(tiff_fp) as tiff_img:
-        img_count = tiff_img.n_frames
-        for img_idx in range(img_count):
-            tiff_img.seek(img_idx)
-            _tiff_data = _tiff_img_data(tiff_img, tiff_bytes)
-            _data.append(_tiff_data)
+    for tags in parse_tiff_tags(tiff_buffer):
+        _tiff_data = tiff_data_from_tags(tags, tiff_buffer)
+        _data.append(_tiff_data)
 
     if len(_data) == 1:
         return _data[0]
@@ -51,8 +52,9 @@ def get_tiff_img_data(tiff_path_or_fp):
 
 TiffData = namedtuple('TiffData', ('width', 'height', 'img_data'))
 
-def _tiff_img_data(tiff_img, tiff_bytes):
-    tags = dict(zip(tiff_img.tag_v2.keys(), tiff_img.tag_v2.values()))
+def tiff_data_from_tags(tags, tiff_bytes):
+    """Return the TiffData for a single page based on the page's tags (as
+    returned by "parse_tiff_tags()")."""
     strip_offsets = tags[TT.StripOffsets]
     assert len(strip_offsets) == 1
     img_offset, = strip_offsets
@@ -60,8 +62,88 @@ def _tiff_img_data(tiff_img, tiff_bytes):
     assert len(strip_byte_counts) == 1
     size, = strip_byte_counts
 
-    width = tags[TT.ImageWidth]
-    height = tags[TT.ImageLength]
+    width, = tags[TT.ImageWidth]
+    height, = tags[TT.ImageLength]
     img_data = tiff_bytes[img_offset:img_offset + size]
     return TiffData(width, height, img_data)
 
+
+# ----------------------------------------------------------------------------
+# minimal IFD walker: Pillow would parse (and partially decode) much more than
+# we need just to find the strip offsets so we parse the IFD structure
+# ourselves.
+_BYTE_ORDERS = {
+    b'II': '<',
+    b'MM': '>',
+}
+
+# struct format for all supported field types, RATIONAL is two LONGs
+_FIELD_FORMATS = {
+    FT.BYTE:     'B',
+    FT.ASCII:    's',
+    FT.SHORT:    'H',
+    FT.LONG:     'I',
+    FT.RATIONAL: 'II',
+}
+
+def parse_tiff_tags(tiff_bytes):
+    """Return a list of tag dicts (one dict per TIFF page).
+
+    Numeric tag values are always returned as tuples (RATIONAL values as
+    "Fraction" instances). ASCII values are returned as strings with the final
+    NUL byte removed (same as Pillow). Tags with unsupported field types are
+    skipped.
+    """
+    byte_order = _BYTE_ORDERS.get(bytes(tiff_bytes[:2]))
+    if byte_order is None:
+        raise ValueError('not a TIFF file (byte order marker: %r)' % bytes(tiff_bytes[:2]))
+    version, ifd_offset = struct.unpack_from(byte_order + 'HI', tiff_bytes, 2)
+    if version != 42:
+        raise ValueError('unsupported TIFF version %r' % version)
+
+    ifd_struct = struct.Struct(byte_order + 'H')
+    tag_struct = struct.Struct(byte_order + 'HHI4s')
+    next_ifd_struct = struct.Struct(byte_order + 'I')
+    pages = []
+    seen_offsets = set()
+    while ifd_offset != 0:
+        if ifd_offset in seen_offsets:
+            raise ValueError('circular IFD reference at offset %d' % ifd_offset)
+        seen_offsets.add(ifd_offset)
+        nr_tags, = ifd_struct.unpack_from(tiff_bytes, ifd_offset)
+        tags = {}
+        tag_offset = ifd_offset + ifd_struct.size
+        for _ in range(nr_tags):
+            tag_id, tag_type, nr_values, raw_value = tag_struct.unpack_from(tiff_bytes, tag_offset)
+            tag_offset += tag_struct.size
+            if tag_type not in _FIELD_FORMATS:
+                continue
+            tags[tag_id] = _parse_tag_value(tiff_bytes, byte_order, tag_type, nr_values, raw_value)
+        pages.append(tags)
+        ifd_offset, = next_ifd_struct.unpack_from(tiff_bytes, tag_offset)
+    return pages
+
+def _parse_tag_value(tiff_bytes, byte_order, tag_type, nr_values, raw_value):
+    field_format = _FIELD_FORMATS[tag_type]
+    if tag_type == FT.ASCII:
+        value_format = '%ds' % nr_values
+    else:
+        value_format = field_format * nr_values
+    value_format = byte_order + value_format
+    value_size = struct.calcsize(value_format)
+    if value_size <= 4:
+        values = struct.unpack_from(value_format, raw_value)
+    else:
+        data_offset, = struct.unpack(byte_order + 'I', raw_value)
+        values = struct.unpack_from(value_format, tiff_bytes, data_offset)
+
+    if tag_type == FT.ASCII:
+        str_value = values[0].decode('latin1')
+        return str_value[:-1] if str_value.endswith('\x00') else str_value
+    elif tag_type == FT.RATIONAL:
+        numerators = values[0::2]
+        denominators = values[1::2]
+        return tuple(
+            (Fraction(n, d) if d else None) for n, d in zip(numerators, denominators)
+        )
+    return values
@@ -4,10 +4,12 @@ classes for dealing with prescription-files
 """
 from __future__ import division, absolute_import, print_function, unicode_literals
 
+from contextlib import contextmanager
 import os
 import warnings
 
 from ..cdb import CDBFormat
+from ..instrumentation import metrics
 from ..mmap_file import MMapFile
 from ..meta import WithBinaryMeta
 from ..utils import filecontent
@@ -27,7 +29,8 @@ class FormHeader(WithBinaryMeta):
 
 class FormBatch(object):
 
-    def __init__(self, batch_file, delay_load=False, access='write', log=None, field_names=None):
+    def __init__(self, batch_file, delay_load=False, access='write', log=None, field_names=None,
+                 *, mapping_pool=None, byte_range_locks=False, lock_timeout=None):
         assert delay_load == False
         if field_names is not None:
             # The FormBatch class does not check anymore for broken CDB files
@@ -40,7 +43,16 @@ class FormBatch(object):
         if not hasattr(batch_file, 'close'):
             # the regular case, given a file name.
             batch_filename = batch_file
-            self.mmap_file = MMapFile(batch_filename, access=access, log=log)
+            if mapping_pool is not None:
+                # share the (read-only) mapping, see "MappingPool"
+                assert access == 'read'
+                self.mmap_file = mapping_pool.open(batch_filename, log=log)
+            else:
+                # "byte_range_locks": only lock the modified forms (and the
+                # batch header while writing it) so several processes can
+                # edit different forms of the same CDB, see "Form.lock()".
+                self.mmap_file = MMapFile(batch_filename, access=access, log=log,
+                    lock_timeout=lock_timeout, byte_range_locks=byte_range_locks)
         else:
             # an already opened file, mostly meant for testing.
             # XXX should be cleaned: access is always passed, but ignored.
@@ -48,25 +60,56 @@ class FormBatch(object):
 
         self.form_batch_header = None
         self.forms = None
+        self.lock_timeout = lock_timeout
 
-        self.load_form_batch_header()
-        self._load_delayed = delay_load
-        self.load_forms()
+        with metrics.span('cdb.load_forms'):
+            self.load_form_batch_header()
+            self._load_delayed = delay_load
+            self.load_forms()
 
     def commit(self):
-        for form in self.forms:
-            if form.is_dirty():
-                form.write_back()
+        with metrics.span('cdb.commit'):
+            dirty_forms = [form for form in self.forms if form.is_dirty()]
+            write_header = self.byte_range_locks and self.form_batch_header.is_dirty()
+            # acquire all locks before writing anything so a locking error
+            # does not leave a partially written commit
+            with self._batch_header_lock(write_header):
+                self._lock_forms(dirty_forms)
+                for form in dirty_forms:
+                    form.write_back()
+                    metrics.incr('cdb.forms_written')
+                if write_header:
+                    self._write_batch_header()
+
+    def _lock_forms(self, forms):
+        locked_forms = []
+        try:
+            for form in forms:
+                if not form.is_locked:
+                    form.lock(timeout=self.lock_timeout)
+                    locked_forms.append(form)
+        except:
+            for form in locked_forms:
+                form.unlock()
+            raise
 
     def close(self, commit=False):
         if commit:
             self.commit()
         self.mmap_file.close()
 
+    def flush(self):
+        with metrics.span('cdb.flush'):
+            self.mmap_file.flush()
+
     @property
     def filecontent(self):
         return filecontent(self.mmap_file)
 
+    @property
+    def byte_range_locks(self):
+        return getattr(self.mmap_file, 'byte_range_locks', False)
+
     @property
     def batch_filename(self):
         return self.mmap_file.name
@@ -84,6 +127,39 @@ class FormBatch(object):
     def load_form_batch_header(self):
         self.form_batch_header = FormBatchHeader(self.filecontent)
 
+    def write_batch_header(self, flush=True):
+        with self._batch_header_lock(self.byte_range_locks):
+            self._write_batch_header(flush=flush)
+
+    @contextmanager
+    def _batch_header_lock(self, lock):
+        if not lock:
+            yield
+            return
+        record_size = self.form_batch_header.record_size
+        self.mmap_file.lock_range(0, record_size, timeout=self.lock_timeout)
+        try:
+            yield
+        finally:
+            self.mmap_file.unlock_range(0, record_size)
+
+    def _write_batch_header(self, flush=True):
+        header = self.form_batch_header
+        data = header._get_binary()
+        buffer = self.filecontent
+        if not isinstance(buffer, bytes):
+            # mmap'd file
+            buffer[0:len(data)] = data
+        else:
+            # in testing "buffer" is a plain file-like object...
+            fp = self.mmap_file
+            fp.seek(0)
+            fp.write(data)
+            fp.seek(0)
+        if flush:
+            self.mmap_file.flush()
+        header.edited_fields.clear()
+
     def load_forms(self):
         self.forms = LazyList()
         offset = self.form_batch_header.record_size
@@ -209,6 +285,7 @@ class Form(object):
         self.form_header = None
         self.fields = None
         self._fields_loaded = False
+        self.is_locked = False
 
         self._field_names = []
         self.field_offsets = []
@@ -243,6 +320,43 @@ class Form(object):
     def cdb_pic_nr(self):
         return self.form_header.rec.imprint_line_short
 
+    def lock(self, timeout=None):
+        ''' lock the form data if the CDB was opened with "byte_range_locks"
+        (otherwise the whole file is locked already)
+
+        Lock the form before modifying it so concurrent edits by other
+        processes are not lost: The form data is reloaded after locking
+        (unsaved changes are applied to the reloaded data). The lock is held
+        until "unlock()" is called or the CDB is closed.
+        '''
+        if self.is_locked or not self.parent.byte_range_locks:
+            return
+        self.parent.mmap_file.lock_range(self.offset, self.record_size, timeout=timeout)
+        self.is_locked = True
+        self._reload()
+
+    def unlock(self):
+        if not self.is_locked:
+            return
+        self.parent.mmap_file.unlock_range(self.offset, self.record_size)
+        self.is_locked = False
+
+    def _reload(self):
+        header_edits = _edited_values(self.form_header)
+        field_edits = {}
+        if self._fields_loaded:
+            for field_name, field in self.fields.items():
+                if field.is_dirty():
+                    field_edits[field_name] = _edited_values(field)
+        self._field_names = []
+        self.field_offsets = []
+        self.load_form_header()
+        self.load_form_fields()
+        if header_edits:
+            self.form_header.update_rec(**header_edits)
+        for field_name, edits in field_edits.items():
+            self.fields[field_name].update_rec(**edits)
+
     def load_form_header(self):
         self.form_header = FormHeader(self.filecontent, self.offset)
         self.record_size = self.form_header.record_size
@@ -284,8 +398,12 @@ class Form(object):
             offset += field.record_size
         self._fields_loaded = True
 
-    def write_back(self):
-        ''' write the form data and header back to file and update the structure '''
+    def write_back(self, flush=True):
+        ''' write the form data and header back to file and update the structure
+
+        If "flush" is False the caller is responsible for flushing the
+        underlying file.
+        '''
         buffer = self.filecontent
         written = False
         # for user editable fields, we check first and then write back.
@@ -324,7 +442,7 @@ class Form(object):
             self.form_header.edited_fields.clear()
             written = True
 
-        if written:
+        if written and flush:
             self.parent.mmap_file.flush()
 
     def __getitem__(self, key):
@@ -337,3 +455,6 @@ class Form(object):
     def __ne__(self, other):
         return not(self == other)
 
+
+def _edited_values(binary_struct):
+    return dict((key, getattr(binary_struct.rec, key)) for key in binary_struct.edited_fields)
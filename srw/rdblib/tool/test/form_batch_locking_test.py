@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+
+import os
+import subprocess
+import sys
+
+from pythonic_testcase import *
+from schwarz.fakefs_helpers import TempFS
+
+from ...cdb import create_cdb_with_dummy_data
+from ...locking import has_range_locks
+from ...mmap_file import MMapFile
+from ..cdb_tool import FormBatch
+
+
+def can_lock_form_in_other_process(cdb_path, form_index):
+    code = (
+        'import sys;'
+        'from srw.rdblib.tool import FormBatch;'
+        'form_batch = FormBatch(sys.argv[1], byte_range_locks=True);'
+        'form = form_batch.forms[int(sys.argv[2])] if (sys.argv[2] != "header") else None;'
+        'form.lock() if form else form_batch.mmap_file.lock_range(0, form_batch.form_batch_header.record_size);'
+    )
+    cmd = [sys.executable, '-c', code, cdb_path, str(form_index)]
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    if proc.returncode and ('BlockingIOError' not in proc.stderr) and ('PermissionError' not in proc.stderr):
+        raise AssertionError(proc.stderr)
+    return (proc.returncode == 0)
+
+
+class FormBatchLockingTest(PythonicTestCase):
+    def setUp(self):
+        if not has_range_locks:
+            self.skipTest('byte-range locks are not supported on this platform')
+        self.fs = TempFS.set_up(test=self)
+        self.cdb_path = os.path.join(self.fs.root, '00000001.CDB')
+        cdb_fp = create_cdb_with_dummy_data(nr_forms=2, filename=self.cdb_path, field_names=('FOO', 'BAR'))
+        cdb_fp.close()
+
+    def test_locks_only_modified_forms(self):
+        form_batch = FormBatch(self.cdb_path, byte_range_locks=True)
+        self.addCleanup(form_batch.close)
+        # other processes must not get an exclusive lock for the whole file
+        with assert_raises(OSError):
+            MMapFile(self.cdb_path, access='write')
+        assert_true(can_lock_form_in_other_process(self.cdb_path, 0))
+
+        form = form_batch.forms[0]
+        form.lock()
+        assert_true(form.is_locked)
+        assert_false(can_lock_form_in_other_process(self.cdb_path, 0))
+        assert_true(can_lock_form_in_other_process(self.cdb_path, 1))
+        assert_true(can_lock_form_in_other_process(self.cdb_path, 'header'))
+
+        form.unlock()
+        assert_false(form.is_locked)
+        assert_true(can_lock_form_in_other_process(self.cdb_path, 0))
+
+    def test_commit_locks_modified_forms_and_writes_header(self):
+        form_batch = FormBatch(self.cdb_path, byte_range_locks=True)
+        form_batch.forms[1]['FOO'].value = 'baz'
+        form_batch.form_batch_header.update_rec(recognized_forms=2)
+        form_batch.commit()
+        assert_false(form_batch.forms[0].is_locked)
+        assert_true(form_batch.forms[1].is_locked)
+        assert_false(form_batch.form_batch_header.is_dirty())
+        assert_false(can_lock_form_in_other_process(self.cdb_path, 1))
+        # the header is only locked while writing it
+        assert_true(can_lock_form_in_other_process(self.cdb_path, 'header'))
+        form_batch.close()
+
+        form_batch = FormBatch(self.cdb_path, access='read')
+        assert_equals('baz', form_batch.forms[1]['FOO'].value)
+        assert_equals(2, form_batch.form_batch_header.rec.recognized_forms)
+        form_batch.close()
+
+    def test_reloads_form_data_after_locking(self):
+        form_batch = FormBatch(self.cdb_path, byte_range_locks=True)
+        self.addCleanup(form_batch.close)
+        other_batch = FormBatch(self.cdb_path, byte_range_locks=True)
+        other_batch.forms[0]['FOO'].value = 'changed'
+        other_batch.close(commit=True)
+
+        form = form_batch.forms[0]
+        assert_not_equals('changed', form['FOO'].value)
+        form.lock()
+        assert_equals('changed', form['FOO'].value)
+        assert_equals(['FOO', 'BAR'], form.field_names)
+
+    def test_keeps_form_locks_if_file_is_opened_again_in_same_process(self):
+        form_batch = FormBatch(self.cdb_path, byte_range_locks=True)
+        self.addCleanup(form_batch.close)
+        form_batch.forms[0].lock()
+
+        FormBatch(self.cdb_path, byte_range_locks=True).close()
+        FormBatch(self.cdb_path, access='read').close()
+        with open(self.cdb_path, 'rb') as fp:
+            fp.read()
+        assert_false(can_lock_form_in_other_process(self.cdb_path, 0))
+
+    def test_commit_reloads_form_data_and_keeps_changes(self):
+        form_batch = FormBatch(self.cdb_path, byte_range_locks=True)
+        self.addCleanup(form_batch.close)
+        form_batch.forms[0]['FOO'].value = 'foo'
+        other_batch = FormBatch(self.cdb_path, byte_range_locks=True)
+        other_batch.forms[0]['BAR'].value = 'bar'
+        other_batch.close(commit=True)
+
+        form_batch.commit()
+        assert_equals('bar', form_batch.forms[0]['BAR'].value)
+        read_batch = FormBatch(self.cdb_path, access='read')
+        self.addCleanup(read_batch.close)
+        assert_equals('foo', read_batch.forms[0]['FOO'].value)
+        assert_equals('bar', read_batch.forms[0]['BAR'].value)
+
+    def test_commit_writes_nothing_if_a_form_is_locked(self):
+        form_batch = FormBatch(self.cdb_path, byte_range_locks=True)
+        self.addCleanup(form_batch.close)
+        previous_value = form_batch.forms[0]['FOO'].value
+        form_batch.forms[0]['FOO'].value = 'foo'
+        form_batch.forms[1]['FOO'].value = 'foo'
+        other_batch = FormBatch(self.cdb_path, byte_range_locks=True)
+        self.addCleanup(other_batch.close)
+        other_batch.forms[1].lock()
+
+        with assert_raises(OSError):
+            form_batch.commit()
+        assert_false(form_batch.forms[0].is_locked)
+        assert_true(form_batch.forms[0].is_dirty())
+        read_batch = FormBatch(self.cdb_path, access='read')
+        self.addCleanup(read_batch.close)
+        assert_equals(previous_value, read_batch.forms[0]['FOO'].value)
+
+    def test_commit_does_not_write_batch_header_without_byte_range_locks(self):
+        form_batch = FormBatch(self.cdb_path)
+        previous_count = form_batch.form_batch_header.rec.recognized_forms
+        form_batch.form_batch_header.update_rec(recognized_forms=previous_count + 1)
+        form_batch.close(commit=True)
+
+        form_batch = FormBatch(self.cdb_path, access='read')
+        assert_equals(previous_count, form_batch.form_batch_header.rec.recognized_forms)
+        form_batch.close()
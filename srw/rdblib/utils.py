@@ -7,12 +7,17 @@ import os
 from schwarz.log_utils import l_
 
 from .lib import AttrDict
+from .mapping_pool import SharedMapping
 from .paths import get_path_from_instance
 
 
 __all__ = ['create_backup', 'filecontent', 'pad_bytes']
 
 def filecontent(mmap_or_filelike, size=-1):
+    if isinstance(mmap_or_filelike, SharedMapping):
+        mapping = mmap_or_filelike.mapping
+        # the file position is shared by all users of the mapping
+        return mapping if (size == -1) else mapping[:size]
     if isinstance(mmap_or_filelike, mmap.mmap):
         if size == -1:
             return mmap_or_filelike